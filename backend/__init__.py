@@ -1,7 +1,7 @@
 """
 Backend initialization module
 """
-from .app import app, socketio
+from .app import app, socketio, init_app
 from .config import Config
 from .database import init_db, get_db_session
 from .models import Meeting, ActionItem, Participant
@@ -9,6 +9,7 @@ from .models import Meeting, ActionItem, Participant
 __all__ = [
     'app',
     'socketio',
+    'init_app',
     'Config',
     'init_db',
     'get_db_session',
@@ -4,48 +4,22 @@ Extracts action items from meeting transcripts using LangGraph
 """
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-from config import Config
-from openai import OpenAI
+from llm_providers import get_llm_provider
 import json
 import re
 
-# Optional: Only needed if using Claude API
-try:
-    from anthropic import Anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
-    Anthropic = None
+PRIORITIES = ('high', 'medium', 'low')
+EXTRACTION_TEMPERATURE = 0.2
+EXTRACTION_MAX_TOKENS = 2000
+EXTRACTION_SYSTEM_PROMPT = "You are an expert at extracting action items from meeting transcripts. Always respond with valid JSON."
 
 
 class ActionItemExtractorAgent:
     """Agent responsible for extracting action items from meetings"""
     
     def __init__(self):
-        self.use_local = Config.USE_LOCAL_MODEL
-        
-        if not self.use_local:
-            # Initialize OpenAI client (can be used for official OpenAI or Euron.one)
-            if Config.USE_EURON_API and Config.EURON_API_KEY:
-                # Use Euron.one API with OpenAI-compatible client
-                self.openai_client = OpenAI(
-                    api_key=Config.EURON_API_KEY,
-                    base_url=Config.EURON_API_BASE
-                )
-                self.model_name = Config.EURON_MODEL
-            elif Config.OPENAI_API_KEY:
-                # Use official OpenAI API
-                self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
-                self.model_name = "gpt-4-turbo-preview"
-            else:
-                self.openai_client = None
-                self.model_name = None
-            
-            # Optional: Anthropic/Claude support (only if installed)
-            if ANTHROPIC_AVAILABLE and Config.ANTHROPIC_API_KEY:
-                self.anthropic_client = Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-            else:
-                self.anthropic_client = None
+        # Shared with the other agents (see llm_providers)
+        self.provider = get_llm_provider()
     
     def extract(self, transcript_data, summary=None) -> List[Dict]:
         """Extract action items from transcript and summary"""
@@ -53,15 +27,22 @@ class ActionItemExtractorAgent:
         
         prompt = self._create_extraction_prompt(transcript_text, summary)
         
-        if self.openai_client:
-            action_items = self._extract_openai(prompt)
-        elif self.anthropic_client:
-            action_items = self._extract_anthropic(prompt)
+        if self.provider and self._fits_context(prompt):
+            action_items = self._extract_llm(prompt)
         else:
             action_items = self._extract_fallback(transcript_text)
         
         return action_items
     
+    def _fits_context(self, prompt):
+        """Whether prompt and completion fit a local model's context window"""
+        if self.provider.context_tokens is None:
+            return True
+        if self.provider.count_tokens(prompt) + EXTRACTION_MAX_TOKENS <= self.provider.context_tokens:
+            return True
+        print("WARNING: Transcript too long for the local model's context, using keyword extraction")
+        return False
+    
     def _create_extraction_prompt(self, transcript, summary=None):
         """Create prompt for action item extraction"""
         context = f"Transcript:\n{transcript}"
@@ -98,46 +79,14 @@ Example output format:
 
 Action Items (JSON array):"""
     
-    def _extract_openai(self, prompt) -> List[Dict]:
-        """Extract action items using OpenAI API (official or Euron.one)"""
-        try:
-            response = self.openai_client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are an expert at extracting action items from meeting transcripts. Always respond with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=2000
-            )
-            
-            content = response.choices[0].message.content
-            action_items = self._parse_action_items(content)
-            return action_items
-        
-        except Exception as e:
-            print(f"AI action item extraction error: {e}")
-            return []
-    
-    def _extract_anthropic(self, prompt) -> List[Dict]:
-        """Extract action items using Claude"""
-        try:
-            response = self.anthropic_client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=2000,
-                temperature=0.2,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            content = response.content[0].text
-            action_items = self._parse_action_items(content)
-            return action_items
-        
-        except Exception as e:
-            print(f"Anthropic action item extraction error: {e}")
+    def _extract_llm(self, prompt) -> List[Dict]:
+        """Extract action items using the configured LLM provider"""
+        content = self.provider.complete(prompt, EXTRACTION_MAX_TOKENS, EXTRACTION_TEMPERATURE,
+                                         EXTRACTION_SYSTEM_PROMPT)
+        if not content:
+            print("AI action item extraction error: no response")
             return []
+        return self._parse_action_items(content)
     
     def _parse_action_items(self, content: str) -> List[Dict]:
         """Parse action items from LLM response"""
@@ -147,20 +96,7 @@ Action Items (JSON array):"""
             if json_match:
                 json_str = json_match.group(0)
                 action_items = json.loads(json_str)
-                
-                # Validate and normalize
-                normalized_items = []
-                for item in action_items:
-                    normalized_item = {
-                        'description': item.get('description', ''),
-                        'assignee': item.get('assignee'),
-                        'due_date': self._parse_due_date(item.get('due_date')),
-                        'priority': item.get('priority', 'medium').lower()
-                    }
-                    if normalized_item['description']:
-                        normalized_items.append(normalized_item)
-                
-                return normalized_items
+                return self.normalize_action_items(action_items)
             else:
                 return []
         
@@ -168,6 +104,30 @@ Action Items (JSON array):"""
             print(f"Error parsing action items JSON: {e}")
             return []
     
+    def normalize_action_items(self, action_items) -> List[Dict]:
+        """Validate and normalize action items parsed from an LLM response
+        
+        Entries that are not objects or have no description are dropped;
+        unknown priorities become medium.
+        """
+        normalized_items = []
+        for item in action_items if isinstance(action_items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            description = item.get('description')
+            if not isinstance(description, str) or not description.strip():
+                continue
+            priority = str(item.get('priority') or 'medium').lower()
+            assignee = item.get('assignee')
+            due_date = item.get('due_date')
+            normalized_items.append({
+                'description': description.strip(),
+                'assignee': assignee if isinstance(assignee, str) and assignee.strip() else None,
+                'due_date': self._parse_due_date(due_date) if isinstance(due_date, str) else None,
+                'priority': priority if priority in PRIORITIES else 'medium'
+            })
+        return normalized_items
+    
     def _parse_due_date(self, due_date_str):
         """Parse due date string"""
         if not due_date_str:
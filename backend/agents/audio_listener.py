@@ -2,187 +2,285 @@
 Audio Listener Agent
 Captures audio from the system microphone
 """
-import sounddevice as sd
 import soundfile as sf
-import numpy as np
 import threading
 import time
-from datetime import datetime
-from pathlib import Path
 from config import Config
+from recording_session import RecordingSession, list_input_devices
+from vad import SpeechChunker, VoiceActivityDetector
+from transcription_queue import TranscriptionWorkerPool, ChunkDropped
+from live_transcript import LiveTranscript
+from agents.transcription import FallbackTranscript
 
 
 class AudioListenerAgent:
     """Agent responsible for capturing audio during meetings"""
     
-    def __init__(self, socketio, transcription_agent=None):
+    def __init__(self, socketio, transcription_agent=None, live_agent=None):
         self.socketio = socketio
         self.transcription_agent = transcription_agent
+        # Streams captions when available; the chunked path is the fallback
+        self.live_agent = live_agent
+        # Shared by every recording so transcription load is bounded process-wide
+        self.transcription_pool = (
+            TranscriptionWorkerPool(transcription_agent) if transcription_agent else None
+        )
         self.active_recordings = {}
-        self.sample_rate = Config.SAMPLE_RATE
-        self.channels = Config.CHANNELS
-        self.chunk_duration = 10  # seconds for live transcription
+        self.chunk_threads = {}
+        # Live chunk results kept to build the final transcript
+        self.live_transcripts = {}
+        self.chunk_duration = Config.LIVE_TRANSCRIPTION_INTERVAL  # seconds for live transcription
     
-    def start_recording(self, meeting_id):
-        """Start recording audio for a meeting"""
+    def start_recording(self, meeting_id, device=None):
+        """Start recording audio for a meeting
+        
+        Args:
+            meeting_id: Meeting being recorded
+            device: Input device index or name (defaults to the system default);
+                different meetings can record from different devices at once
+        """
         print(f"Starting audio recording for meeting {meeting_id}")
         
-        # Initialize recording buffer
-        self.active_recordings[meeting_id] = {
-            'audio_data': [],
-            'stream': None,
-            'recording': True,
-            'chunk_buffer': [],
-            'last_chunk_time': time.time()
-        }
-        
-        # Callback for audio stream
-        def audio_callback(indata, frames, time_info, status):
-            if status:
-                print(f"Audio callback status: {status}")
-            if meeting_id in self.active_recordings and self.active_recordings[meeting_id]['recording']:
-                self.active_recordings[meeting_id]['audio_data'].append(indata.copy())
-                self.active_recordings[meeting_id]['chunk_buffer'].append(indata.copy())
-        
-        # Start audio stream
-        stream = sd.InputStream(
-            samplerate=self.sample_rate,
-            channels=self.channels,
-            callback=audio_callback,
-            dtype=np.float32
-        )
-        stream.start()
-        self.active_recordings[meeting_id]['stream'] = stream
+        if meeting_id in self.active_recordings:
+            raise ValueError(f"Meeting {meeting_id} is already recording")
+        
+        session = RecordingSession(meeting_id, device=device)
+        if self.transcription_pool and Config.LIVE_TRANSCRIPT_REUSE:
+            self.live_transcripts[meeting_id] = LiveTranscript(meeting_id, session.sample_rate)
+        if self.live_agent and self.live_agent.is_available():
+            # Hooked up before capture starts so the stream begins at frame 0
+            language = (self.transcription_agent.get_meeting_language(meeting_id)
+                        if self.transcription_agent else None)
+            stream = self.live_agent.open_stream(
+                meeting_id, session.sample_rate, self.live_transcripts.get(meeting_id), language
+            )
+            session.pipeline.on_audio = lambda samples: self.live_agent.push_audio(stream, samples)
+        try:
+            session.start()
+        except Exception:
+            # Nothing was captured: drop the stream and live transcript again
+            if self.live_agent:
+                self.live_agent.close_stream(meeting_id)
+            self.live_transcripts.pop(meeting_id, None)
+            raise
+        self.active_recordings[meeting_id] = session
         
         # Start chunked transcription thread
         chunk_thread = threading.Thread(
             target=self._process_chunks,
-            args=(meeting_id,),
+            args=(session,),
             daemon=True
         )
         chunk_thread.start()
+        self.chunk_threads[meeting_id] = chunk_thread
         
         # Emit status
         self.socketio.emit('audio_status', {
             'meeting_id': meeting_id,
-            'status': 'recording'
+            'status': 'recording',
+            'device': session.device_name,
+            'live_mode': 'streaming' if self._is_streaming(meeting_id) else 'chunked'
         })
     
-    def _process_chunks(self, meeting_id):
+    def _is_streaming(self, meeting_id):
+        return self.live_agent is not None and self.live_agent.is_streaming(meeting_id)
+    
+    def _process_chunks(self, session):
         """Process audio chunks for live transcription"""
+        meeting_id = session.meeting_id
         print(f"[LIVE] Starting chunk processor for meeting {meeting_id}")
         
-        while meeting_id in self.active_recordings and self.active_recordings[meeting_id]['recording']:
-            time.sleep(self.chunk_duration)
-            
-            if meeting_id not in self.active_recordings:
-                break
-            
-            recording_data = self.active_recordings[meeting_id]
+        # With VAD, poll often and let the chunker decide where chunks end;
+        # without it, transcribe whatever was captured every chunk_duration
+        chunker = None
+        position = 0
+        live_transcript = self.live_transcripts.get(meeting_id)
+        poll_interval = self.chunk_duration
+        if Config.VAD_ENABLED:
+            chunker = SpeechChunker(
+                session.sample_rate,
+                min_chunk_seconds=Config.VAD_MIN_CHUNK_SECONDS,
+                max_chunk_seconds=Config.VAD_MAX_CHUNK_SECONDS,
+                pause_ms=Config.VAD_PAUSE_MS,
+                detector=VoiceActivityDetector(
+                    session.sample_rate,
+                    min_energy_db=Config.VAD_ENERGY_THRESHOLD_DB
+                )
+            )
+            poll_interval = 0.5
+        
+        while session.recording:
+            time.sleep(poll_interval)
             
             # Check if we have buffered audio
-            if recording_data['chunk_buffer']:
+            if session.buffer.available('live'):
                 try:
                     # Get chunk data
-                    chunk_data = np.concatenate(recording_data['chunk_buffer'], axis=0)
-                    recording_data['chunk_buffer'] = []  # Clear buffer
-                    
-                    # Save chunk to temp file
-                    temp_filename = f"chunk_{meeting_id}_{int(time.time())}.wav"
-                    temp_filepath = Config.AUDIO_DIR / temp_filename
-                    
-                    sf.write(str(temp_filepath), chunk_data, self.sample_rate)
-                    
-                    print(f"[LIVE] Saved chunk: {temp_filename} ({len(chunk_data)} samples)")
-                    
-                    # Transcribe directly if transcription agent is available
-                    if self.transcription_agent:
-                        try:
-                            print(f"[LIVE] Transcribing chunk...")
-                            transcript_result = self.transcription_agent.transcribe(str(temp_filepath))
-                            
-                            if transcript_result and transcript_result.get('text'):
-                                chunk_text = transcript_result['text'].strip()
-                                
-                                if chunk_text:
-                                    print(f"[LIVE] Chunk transcribed: {chunk_text[:100]}...")
-                                    
-                                    # Emit to frontend via socketio
-                                    self.socketio.emit('live_transcript_update', {
-                                        'meeting_id': meeting_id,
-                                        'text': chunk_text
-                                    })
-                                    print(f"[LIVE] Emitted to frontend")
-                                else:
-                                    print(f"[LIVE] Chunk was empty")
-                            else:
-                                print(f"[LIVE] No transcript result")
-                            
-                            # Clean up chunk file
-                            import os
-                            if os.path.exists(str(temp_filepath)):
-                                os.remove(str(temp_filepath))
-                                
-                        except Exception as e:
-                            print(f"[LIVE] Error transcribing chunk: {e}")
-                            import traceback
-                            traceback.print_exc()
+                    captured = session.buffer.read('live')
+                    if self._is_streaming(meeting_id):
+                        # Captions come from the stream; only keep the timeline in step
+                        position += len(captured)
+                        if chunker:
+                            chunker.stream_position = position
+                        if live_transcript:
+                            live_transcript.add_seen(len(captured))
+                        continue
+                    if chunker:
+                        chunks = [(chunk.samples, chunk.spans) for chunk in chunker.feed(captured)]
                     else:
-                        # Fallback: emit event (but this doesn't work from threads)
-                        self.socketio.emit('audio_chunk_ready', {
-                            'meeting_id': meeting_id,
-                            'chunk_file': str(temp_filepath)
-                        })
-                    
+                        chunks = [(captured, [(0, position, len(captured))])]
+                    position += len(captured)
+                    for chunk_data, spans in chunks:
+                        self._transcribe_chunk(session, chunk_data, spans)
+                    if live_transcript:
+                        live_transcript.add_seen(len(captured))
                 except Exception as e:
                     print(f"[LIVE] Error processing chunk: {e}")
         
+        if self._is_streaming(meeting_id):
+            if live_transcript:
+                live_transcript.add_seen(session.buffer.available('live'))
+        # Caption the speech captured since the last pause
+        elif chunker:
+            try:
+                captured = session.buffer.read('live')
+                chunker.feed(captured)
+                tail = chunker.flush()
+                if tail is not None:
+                    self._transcribe_chunk(session, tail.samples, tail.spans)
+                if live_transcript:
+                    live_transcript.add_seen(len(captured))
+                
+                skipped = chunker.frames_dropped / max(chunker.frames_seen, 1)
+                print(f"[LIVE] VAD skipped {skipped:.0%} of audio as silence")
+            except Exception as e:
+                print(f"[LIVE] Error processing final chunk: {e}")
+        
         print(f"[LIVE] Chunk processor stopped for meeting {meeting_id}")
     
+    def _transcribe_chunk(self, session, chunk_data, spans=None):
+        """Queue one live chunk for transcription
+        
+        Args:
+            spans: (chunk_frame, stream_frame, frames) runs placing the chunk
+                in the recording
+        """
+        meeting_id = session.meeting_id
+        # Transcribe directly from memory if transcription agent is available
+        if self.transcription_pool:
+            print(f"[LIVE] Queueing chunk ({len(chunk_data)} samples)...")
+            live_transcript = self.live_transcripts.get(meeting_id)
+            if live_transcript and spans:
+                live_transcript.chunk_submitted(spans)
+            self.transcription_pool.submit(
+                meeting_id,
+                chunk_data,
+                session.sample_rate,
+                self._on_chunk_transcribed,
+                spans=spans
+            )
+        else:
+            # Fallback: hand a chunk file to the audio_chunk_ready handler
+            # (but this doesn't work from threads)
+            temp_filename = f"chunk_{meeting_id}_{int(time.time() * 1000)}.wav"
+            temp_filepath = Config.AUDIO_DIR / temp_filename
+            sf.write(str(temp_filepath), chunk_data, session.sample_rate)
+            print(f"[LIVE] Saved chunk: {temp_filename} ({len(chunk_data)} samples)")
+            
+            self.socketio.emit('audio_chunk_ready', {
+                'meeting_id': meeting_id,
+                'chunk_file': str(temp_filepath)
+            })
+    
+    def _on_chunk_transcribed(self, job, transcript_result, error, queue_wait=0.0, processing_time=0.0):
+        """Push a transcribed live chunk to the frontend (runs on a worker thread)"""
+        live_transcript = self.live_transcripts.get(job.meeting_id)
+        if live_transcript:
+            if error or transcript_result is None or isinstance(transcript_result, FallbackTranscript):
+                live_transcript.chunk_failed(job.spans)
+            else:
+                live_transcript.chunk_transcribed(job.spans, transcript_result, fast=job.fast)
+        
+        if isinstance(error, ChunkDropped):
+            return
+        if error:
+            print(f"[LIVE] Error transcribing chunk: {error}")
+            return
+        
+        if transcript_result and transcript_result.get('text'):
+            chunk_text = transcript_result['text'].strip()
+            
+            if chunk_text:
+                print(f"[LIVE] Chunk transcribed: {chunk_text[:100]}...")
+                
+                # Emit to frontend via socketio
+                self.socketio.emit('live_transcript_update', {
+                    'meeting_id': job.meeting_id,
+                    'text': chunk_text,
+                    'queue_wait': round(queue_wait, 3),
+                    'processing_time': round(processing_time, 3)
+                })
+                print(f"[LIVE] Emitted to frontend")
+            else:
+                print(f"[LIVE] Chunk was empty")
+        else:
+            print(f"[LIVE] No transcript result")
+    
+    def get_queue_stats(self):
+        """Live transcription queue metrics"""
+        if not self.transcription_pool:
+            return {}
+        return self.transcription_pool.get_stats()
+    
     def stop_recording(self, meeting_id):
         """Stop recording and save audio file"""
-        if meeting_id not in self.active_recordings:
+        session = self.active_recordings.pop(meeting_id, None)
+        if session is None:
             return None
         
         print(f"Stopping audio recording for meeting {meeting_id}")
+        filepath = session.stop()
         
-        recording_data = self.active_recordings[meeting_id]
-        recording_data['recording'] = False
-        
-        # Stop stream
-        if recording_data['stream']:
-            recording_data['stream'].stop()
-            recording_data['stream'].close()
+        # Let the last live chunks finish so their text can be reused
+        chunk_thread = self.chunk_threads.pop(meeting_id, None)
+        if chunk_thread:
+            chunk_thread.join()
+        if self.live_agent:
+            # Waits for the stream's last final results
+            self.live_agent.close_stream(meeting_id)
+        if meeting_id in self.live_transcripts:
+            if not self.transcription_pool.wait_for_meeting(meeting_id, Config.LIVE_REUSE_WAIT_SECONDS):
+                print(f"[LIVE] Live transcription still busy for meeting {meeting_id}, "
+                      f"unfinished chunks will be re-transcribed")
         
-        # Concatenate audio data
-        if recording_data['audio_data']:
-            audio_array = np.concatenate(recording_data['audio_data'], axis=0)
-            
-            # Save to file
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"meeting_{meeting_id}_{timestamp}.wav"
-            filepath = Config.AUDIO_DIR / filename
-            
-            sf.write(str(filepath), audio_array, self.sample_rate)
+        if filepath:
             print(f"Audio saved to {filepath}")
             
-            # Clean up
-            del self.active_recordings[meeting_id]
-            
             # Emit status
             self.socketio.emit('audio_status', {
                 'meeting_id': meeting_id,
                 'status': 'saved',
-                'file': str(filepath)
+                'file': filepath
             })
             
-            return str(filepath)
+            return filepath
         
         return None
     
+    def take_live_transcript(self, meeting_id):
+        """Hand over a stopped meeting's live transcript (None if not kept)"""
+        return self.live_transcripts.pop(meeting_id, None)
+    
     def get_recording_status(self, meeting_id):
         """Get status of a recording"""
         if meeting_id in self.active_recordings:
             return 'recording'
         return 'stopped'
-
+    
+    def get_session_stats(self):
+        """Capture statistics for every active recording"""
+        return [session.get_stats() for session in list(self.active_recordings.values())]
+    
+    def list_devices(self):
+        """Input devices that can be recorded from"""
+        return list_input_devices()
@@ -5,107 +5,282 @@ Provides real-time transcription during recording using Deepgram streaming
 
 import asyncio
 import json
+import math
 import threading
+from urllib.parse import urlencode
+import numpy as np
 from config import Config
 
 try:
-    from deepgram import (
-        DeepgramClient,
-        DeepgramClientOptions,
-        LiveTranscriptionEvents,
-        LiveOptions,
-    )
+    # websockets 14+ client API (additional_headers)
+    from websockets.asyncio.client import connect as websocket_connect
+    from websockets.exceptions import ConnectionClosed
     DEEPGRAM_STREAMING_AVAILABLE = True
 except ImportError:
     DEEPGRAM_STREAMING_AVAILABLE = False
     print("WARNING: Deepgram streaming not available for live transcription")
 
+# Audio buffered while the connection opens, in seconds
+STREAM_QUEUE_SECONDS = 30
+
+
+class StreamingSession:
+    """State of one meeting's streaming connection.
+
+    ``sent_frames`` counts audio handed to the stream and
+    ``finalized_frames`` how far Deepgram has returned final results, both
+    in frames of the canonical recording stream.
+    """
+
+    def __init__(self, meeting_id, sample_rate, live_transcript=None, language=None):
+        self.meeting_id = meeting_id
+        self.sample_rate = sample_rate
+        self.language = language
+        self.live_transcript = live_transcript
+        self.queue = None
+        self.future = None
+        self.sent_frames = 0
+        self.finalized_frames = 0
+        self.failed = False
+        self.closing = False
+        self.closed = False
+
 
 class LiveTranscriptionAgent:
-    """Handles live transcription during recording"""
-    
+    """Handles live transcription during recording.
+
+    All websocket I/O runs on one background asyncio event loop thread.
+    The audio pipeline hands canonical 16 kHz blocks to ``push_audio``,
+    which crosses into the loop with ``call_soon_threadsafe`` and a
+    bounded ``asyncio.Queue`` per meeting. Interim results are emitted as
+    ``live_transcript_interim`` and finals as ``live_transcript_update``,
+    the same event the chunked path uses. When a stream cannot be opened
+    or fails, it is marked failed and the caller falls back to chunked
+    transcription.
+    """
+
     def __init__(self, socketio):
         self.socketio = socketio
         self.active_sessions = {}
-        self.deepgram_client = None
-        
-        if DEEPGRAM_STREAMING_AVAILABLE and Config.DEEPGRAM_API_KEY:
-            try:
-                config = DeepgramClientOptions(
-                    options={"keepalive": "true"}
-                )
-                self.deepgram_client = DeepgramClient(Config.DEEPGRAM_API_KEY, config)
-                print("Live transcription agent initialized with Deepgram streaming")
-            except Exception as e:
-                print(f"Error initializing Deepgram streaming: {e}")
-    
+        self._connections = {}
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+
     def is_available(self):
         """Check if live transcription is available"""
-        return DEEPGRAM_STREAMING_AVAILABLE and self.deepgram_client is not None
-    
-    async def start_live_transcription(self, meeting_id, audio_stream):
-        """Start live transcription for a meeting"""
+        return (DEEPGRAM_STREAMING_AVAILABLE and Config.LIVE_STREAMING_ENABLED and
+                bool(Config.DEEPGRAM_API_KEY))
+
+    def _ensure_loop(self):
+        """Start the background event loop thread on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="live-transcription-loop",
+                    daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def open_stream(self, meeting_id, sample_rate, live_transcript=None, language=None):
+        """Start streaming a meeting; returns its session, or None if unavailable
+
+        language is the meeting's pinned language; None lets Deepgram use its default.
+        """
         if not self.is_available():
-            print("Live transcription not available")
+            return None
+
+        loop = self._ensure_loop()
+        session = StreamingSession(meeting_id, sample_rate, live_transcript, language)
+        self.active_sessions[meeting_id] = session
+        session.future = asyncio.run_coroutine_threadsafe(
+            self.start_live_transcription(meeting_id, session), loop
+        )
+        return session
+
+    def is_streaming(self, meeting_id):
+        """Whether a meeting's captions currently come from the stream"""
+        session = self.active_sessions.get(meeting_id)
+        return session is not None and not session.failed
+
+    def push_audio(self, session, samples):
+        """Queue canonical float32 samples for the stream; thread-safe"""
+        if session.failed or session.closed:
+            return
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype('<i2').tobytes()
+        session.sent_frames += len(samples)
+        self._loop.call_soon_threadsafe(self._enqueue, session, pcm)
+
+    def _enqueue(self, session, data):
+        """Runs on the loop: hand audio to the sender, failing over if it backs up"""
+        if session.failed:
+            return
+        if session.queue is None:
+            session.queue = asyncio.Queue(maxsize=STREAM_QUEUE_SECONDS * 20)
+        try:
+            session.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self._fail(session, "stream fell too far behind")
+
+    def _wake_sender(self, session):
+        """Runs on the loop: discard queued audio and let the sender finish"""
+        if session.queue is None:
+            return
+        while not session.queue.empty():
+            session.queue.get_nowait()
+        session.queue.put_nowait(None)
+
+    def _fail(self, session, reason):
+        """Runs on the loop: stop streaming a meeting and hand its audio back to the chunked path"""
+        if session.failed:
             return
-        
+        session.failed = True
+        self._wake_sender(session)
+        print(f"[LIVE] Streaming failed for meeting {session.meeting_id} ({reason}), "
+              f"using chunked transcription")
+        if session.live_transcript and session.sent_frames > session.finalized_frames:
+            session.live_transcript.chunk_failed([
+                (0, session.finalized_frames, session.sent_frames - session.finalized_frames)
+            ])
+        self.socketio.emit('audio_status', {
+            'meeting_id': session.meeting_id,
+            'status': 'recording',
+            'live_mode': 'chunked'
+        })
+
+    def _stream_url(self, sample_rate, language=None):
+        params = {
+            'model': 'nova-2',
+            'encoding': 'linear16',
+            'sample_rate': sample_rate,
+            'channels': 1,
+            'smart_format': 'true',
+            'punctuate': 'true',
+            'interim_results': 'true'
+        }
+        if language:
+            params['language'] = language
+        return f"{Config.DEEPGRAM_STREAMING_URL}?{urlencode(params)}"
+
+    async def start_live_transcription(self, meeting_id, session):
+        """Open the stream, then forward queued audio until the session closes"""
+        if session.queue is None:
+            session.queue = asyncio.Queue(maxsize=STREAM_QUEUE_SECONDS * 20)
         try:
-            # Set up Deepgram streaming connection
-            dg_connection = self.deepgram_client.listen.asynclive.v("1")
-            
-            # Event handlers
-            async def on_message(self, result, **kwargs):
-                sentence = result.channel.alternatives[0].transcript
-                if len(sentence) > 0:
-                    # Emit partial transcript to frontend
-                    self.socketio.emit('live_transcript', {
-                        'meeting_id': meeting_id,
-                        'text': sentence,
-                        'is_final': result.is_final
-                    })
-            
-            async def on_error(self, error, **kwargs):
-                print(f"Live transcription error: {error}")
-            
-            # Register event handlers
-            dg_connection.on(LiveTranscriptionEvents.Transcript, on_message)
-            dg_connection.on(LiveTranscriptionEvents.Error, on_error)
-            
-            # Configure streaming options
-            options = LiveOptions(
-                model="nova-2",
-                language="en",
-                smart_format=True,
-                punctuate=True,
-                interim_results=True
+            connection = await websocket_connect(
+                self._stream_url(session.sample_rate, session.language),
+                additional_headers={'Authorization': f"Token {Config.DEEPGRAM_API_KEY}"},
+                open_timeout=10
             )
-            
-            # Start connection
-            await dg_connection.start(options)
-            
-            # Store session
-            self.active_sessions[meeting_id] = dg_connection
-            
-            print(f"Live transcription started for meeting {meeting_id}")
-            
         except Exception as e:
-            print(f"Error starting live transcription: {e}")
-    
+            self._fail(session, f"cannot connect: {e}")
+            return
+
+        self._connections[meeting_id] = connection
+        print(f"Live transcription started for meeting {meeting_id}")
+        receiver = asyncio.ensure_future(self._receive_results(session, connection))
+        try:
+            while True:
+                data = await session.queue.get()
+                if data is None:
+                    break
+                await self.send_audio_chunk(meeting_id, data)
+            if not session.failed:
+                session.closing = True
+                await self.stop_live_transcription(meeting_id)
+                # Deepgram sends the last finals, then closes the socket
+                await asyncio.wait_for(receiver, timeout=Config.LIVE_REUSE_WAIT_SECONDS)
+        except Exception as e:
+            self._fail(session, str(e))
+        finally:
+            receiver.cancel()
+            self._connections.pop(meeting_id, None)
+            await connection.close()
+
+        if not session.failed and session.live_transcript and session.sent_frames > session.finalized_frames:
+            # Audio sent but never finalized is transcribed again at the end
+            session.live_transcript.chunk_failed([
+                (0, session.finalized_frames, session.sent_frames - session.finalized_frames)
+            ])
+
     async def send_audio_chunk(self, meeting_id, audio_data):
         """Send audio chunk for live transcription"""
-        if meeting_id in self.active_sessions:
-            try:
-                await self.active_sessions[meeting_id].send(audio_data)
-            except Exception as e:
-                print(f"Error sending audio chunk: {e}")
-    
+        connection = self._connections.get(meeting_id)
+        if connection is not None:
+            await connection.send(audio_data)
+
     async def stop_live_transcription(self, meeting_id):
-        """Stop live transcription for a meeting"""
-        if meeting_id in self.active_sessions:
-            try:
-                await self.active_sessions[meeting_id].finish()
-                del self.active_sessions[meeting_id]
-                print(f"Live transcription stopped for meeting {meeting_id}")
-            except Exception as e:
-                print(f"Error stopping live transcription: {e}")
+        """Ask Deepgram to flush its final results and close the stream"""
+        connection = self._connections.get(meeting_id)
+        if connection is not None:
+            await connection.send(json.dumps({'type': 'CloseStream'}))
+
+    async def _receive_results(self, session, connection):
+        """Emit interim and final captions as they arrive"""
+        try:
+            async for message in connection:
+                result = json.loads(message)
+                if result.get('type') == 'Results':
+                    self._handle_result(session, result)
+        except ConnectionClosed:
+            pass
+        if not session.closing:
+            self._fail(session, "connection closed")
+
+    def _handle_result(self, session, result):
+        alternative = result['channel']['alternatives'][0]
+        text = alternative.get('transcript', '').strip()
+        start = result.get('start', 0.0)
+        duration = result.get('duration', 0.0)
+
+        if not result.get('is_final'):
+            if text:
+                self.socketio.emit('live_transcript_interim', {
+                    'meeting_id': session.meeting_id,
+                    'text': text
+                })
+            return
+
+        start_frame = int(round(start * session.sample_rate))
+        frames = int(round(duration * session.sample_rate))
+        session.finalized_frames = max(session.finalized_frames, start_frame + frames)
+        if not text:
+            return
 
+        self.socketio.emit('live_transcript_update', {
+            'meeting_id': session.meeting_id,
+            'text': text,
+            'is_final': True,
+            'start': start,
+            'end': start + duration
+        })
+        if session.live_transcript and frames:
+            # Deepgram confidence (0-1) on the same scale as Whisper's log-probability
+            confidence = alternative.get('confidence', 1.0)
+            session.live_transcript.chunk_transcribed(
+                [(0, start_frame, frames)],
+                {'segments': [{
+                    'start': 0.0,
+                    'end': duration,
+                    'text': text,
+                    'avg_logprob': math.log(max(confidence, 1e-6))
+                }]},
+                track_cuts=False
+            )
+
+    def close_stream(self, meeting_id, timeout=None):
+        """Flush and close a meeting's stream; waits for the final results"""
+        session = self.active_sessions.pop(meeting_id, None)
+        if session is None:
+            return
+        if not session.failed:
+            self._loop.call_soon_threadsafe(self._enqueue, session, None)
+        try:
+            session.future.result(timeout=timeout or Config.LIVE_REUSE_WAIT_SECONDS)
+        except Exception as e:
+            print(f"[LIVE] Stream for meeting {meeting_id} did not close cleanly: {e}")
+        session.closed = True
+        print(f"Live transcription stopped for meeting {meeting_id}")
@@ -0,0 +1,256 @@
+"""
+Meeting Analysis Agent
+Produces the summary and the action items in one structured LLM call
+"""
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Completion tokens added to the summary's for the action item list
+ACTION_ITEM_TOKENS = 800
+
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def parse_analysis(content) -> Optional[Dict]:
+    """The JSON object in an LLM response, or None if it cannot be read
+
+    Tolerates text or code fences around the object, trailing commas and
+    output cut off at the token limit (the cut value is dropped).
+    """
+    if not content:
+        return None
+    start = content.find('{')
+    if start < 0:
+        return None
+    text = content[start:]
+    decoder = json.JSONDecoder()
+    for candidate in [text] + _close_truncated(text):
+        for attempt in (candidate, _TRAILING_COMMA.sub(r'\1', candidate)):
+            try:
+                value, _ = decoder.raw_decode(attempt)
+            except ValueError:
+                continue
+            if isinstance(value, dict):
+                return value
+    return None
+
+
+def _close_truncated(text):
+    """Ways to complete a cut-off JSON document, most complete first"""
+    closers = []
+    in_string = escaped = False
+    cuts = []
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            closers.append('}' if char == '{' else ']')
+        elif char in '}]':
+            if closers:
+                closers.pop()
+            if not closers:
+                return [text[:index + 1]]
+        elif char == ',':
+            cuts.append((index, ''.join(reversed(closers))))
+
+    tail = text[:-1] if escaped else text
+    candidates = [tail + ('"' if in_string else '') + ''.join(reversed(closers))]
+    # Back up to the last complete values when the cut fell inside a key or number
+    for index, closing in reversed(cuts[-3:]):
+        candidates.append(text[:index] + closing)
+    return candidates
+
+
+def validate_analysis(data) -> List[str]:
+    """Schema problems in a parsed analysis; empty when it is usable
+
+    Individual action items are normalized, not rejected, so only the
+    top-level shape is checked here.
+    """
+    if not isinstance(data, dict):
+        return ['the response is not a JSON object']
+    problems = []
+    summary = data.get('summary')
+    if not isinstance(summary, str) or not summary.strip():
+        problems.append('"summary" must be a non-empty string')
+    if not isinstance(data.get('action_items'), list):
+        problems.append('"action_items" must be an array')
+    return problems
+
+
+class _JsonFieldStream:
+    """Decodes one string field of a JSON object while the object streams in
+
+    Fed raw response text; passes the decoded field value to on_delta.
+    """
+
+    def __init__(self, key, on_delta):
+        self._start = re.compile(r'"%s"\s*:\s*"' % re.escape(key))
+        self._on_delta = on_delta
+        self._buffer = ''
+        self._position = None
+        self._done = False
+
+    def feed(self, piece):
+        if self._done:
+            return
+        self._buffer += piece
+        if self._position is None:
+            match = self._start.search(self._buffer)
+            if not match:
+                return
+            self._position = match.end()
+
+        buffer = self._buffer
+        decoded = []
+        index = self._position
+        while index < len(buffer):
+            char = buffer[index]
+            if char == '"':
+                self._done = True
+                break
+            if char != '\\':
+                decoded.append(char)
+                index += 1
+                continue
+            # Escapes are decoded once they have fully arrived
+            if index + 1 >= len(buffer):
+                break
+            if buffer[index + 1] != 'u':
+                decoded.append(_ESCAPES.get(buffer[index + 1], buffer[index + 1]))
+                index += 2
+                continue
+            if index + 6 > len(buffer):
+                break
+            try:
+                code = int(buffer[index + 2:index + 6], 16)
+            except ValueError:
+                code = 0
+            # A surrogate pair arrives as two \u escapes
+            length = 12 if 0xD800 <= code < 0xDC00 else 6
+            if index + length > len(buffer):
+                break
+            try:
+                decoded.append(json.loads(f'"{buffer[index:index + length]}"'))
+            except ValueError:
+                pass
+            index += length
+        self._position = index
+        if decoded:
+            self._on_delta(''.join(decoded))
+
+
+class MeetingAnalysisAgent:
+    """Agent that summarizes a meeting and extracts its action items in one pass
+
+    Uses the summarizer's LLM backend and map-reduce for long transcripts,
+    and the extractor's action item normalization. Whatever the combined
+    response does not provide falls back to the separate summarize and
+    extract calls.
+    """
+
+    def __init__(self, summarizer, action_item_extractor):
+        self.summarizer = summarizer
+        self.action_item_extractor = action_item_extractor
+
+    def is_available(self):
+        return self.summarizer.is_available()
+
+    def analyze(self, transcript_data, on_delta=None) -> Tuple[Optional[str], List[Dict]]:
+        """Summary and action items for a transcript
+
+        Args:
+            on_delta: Optional callable(text) receiving the summary as it
+                is generated
+
+        Returns:
+            (summary, action_items)
+        """
+        transcript_text = transcript_data.get('text', '') if isinstance(transcript_data, dict) else transcript_data
+        max_tokens = self.summarizer.max_summary_tokens() + ACTION_ITEM_TOKENS
+
+        source, from_notes = self.summarizer.prepare_source(
+            transcript_text, self._create_analysis_prompt(''), max_tokens
+        )
+        data = None
+        if source is not None:
+            stream = _JsonFieldStream('summary', on_delta).feed if on_delta else None
+            content = self.summarizer.generate(
+                self._create_analysis_prompt(source, from_notes), max_tokens, stream
+            )
+            data = parse_analysis(content)
+            problems = validate_analysis(data)
+            if problems and content:
+                print(f"WARNING: Combined analysis response invalid ({'; '.join(problems)}), asking for a repair")
+                data = parse_analysis(self.summarizer.generate(
+                    self._create_repair_prompt(content, problems), max_tokens
+                ))
+
+        data = data if isinstance(data, dict) else {}
+        summary = data.get('summary')
+        if not isinstance(summary, str) or not summary.strip():
+            print("WARNING: Combined analysis gave no summary, summarizing separately")
+            summary = self.summarizer.summarize(transcript_data)
+
+        action_items = data.get('action_items')
+        if isinstance(action_items, list):
+            action_items = self.action_item_extractor.normalize_action_items(action_items)
+        else:
+            print("WARNING: Combined analysis gave no action items, extracting separately")
+            action_items = self.action_item_extractor.extract(transcript_data, summary)
+        return summary, action_items
+
+    def _create_analysis_prompt(self, transcript, from_notes=False):
+        """Create prompt for the combined summary and action item response"""
+        source = "notes taken on consecutive parts of a meeting" if from_notes else "meeting transcript"
+        heading = "Meeting Notes (in order)" if from_notes else "Meeting Transcript"
+        return f"""You are an expert meeting analyst. Analyze the following {source} and respond with ONE JSON object, and nothing else, in exactly this format:
+
+{{
+  "summary": "Markdown summary of the meeting",
+  "action_items": [
+    {{
+      "description": "Clear description of what needs to be done",
+      "assignee": "Who is responsible, or null",
+      "due_date": "YYYY-MM-DD, or null",
+      "priority": "high, medium or low"
+    }}
+  ]
+}}
+
+The "summary" must be a COMPREHENSIVE, DETAILED markdown summary with these sections:
+1. **Meeting Overview** - purpose, context, tone and flow
+2. **Main Topics Discussed** - every major topic, with 2-3 sentences of detail each
+3. **Key Points and Insights** - facts, metrics, concerns, opportunities
+4. **Decisions Made** - each decision, who made it and why
+5. **Action Items and Next Steps** - tasks, owners, deadlines, dependencies
+6. **Discussion Details** - questions and answers, viewpoints, debates, consensus
+7. **Participants and Contributions** - who spoke, their roles and contributions
+8. **Follow-up Items** - future meetings, information needed, open questions
+
+"action_items" must list ALL action items from the meeting (an empty array if there are none).
+
+{heading}:
+{transcript}
+
+JSON:"""
+
+    def _create_repair_prompt(self, content, problems):
+        """Create prompt asking the model to fix an invalid combined response"""
+        return f"""The following response was supposed to be a single JSON object with a "summary" string and an "action_items" array of objects (description, assignee, due_date, priority), but it is invalid: {'; '.join(problems)}.
+
+Return the corrected JSON object only, keeping all of its content.
+
+Response:
+{content}
+
+Corrected JSON:"""
@@ -5,6 +5,7 @@ Handles local model initialization and offline operations
 import os
 from pathlib import Path
 from config import Config
+from model_registry import model_registry
 
 
 class OfflineProcessingAgent:
@@ -19,24 +20,24 @@ class OfflineProcessingAgent:
             self._init_offline_mode()
     
     def _init_offline_mode(self):
-        """Initialize offline processing capabilities"""
+        """Initialize offline processing capabilities
+        
+        Models come from the shared registry, so nothing is loaded here and
+        the transcription and summarizer agents reuse the same instances.
+        """
         try:
             # Initialize local LLM
             if os.path.exists(Config.LOCAL_MODEL_PATH):
-                from llama_cpp import Llama
-                self.local_llm = Llama(
-                    model_path=Config.LOCAL_MODEL_PATH,
-                    n_ctx=4096,
-                    n_threads=4
-                )
-                print("✓ Local LLM loaded successfully")
+                import llama_cpp  # noqa: F401
+                self.local_llm = model_registry.llama(Config.LOCAL_MODEL_PATH)
+                print("✓ Local LLM available")
             else:
                 print(f"⚠ Local model not found at {Config.LOCAL_MODEL_PATH}")
             
             # Initialize Whisper
-            import whisper
-            self.whisper_model = whisper.load_model("base")
-            print("✓ Whisper model loaded successfully")
+            import whisper  # noqa: F401
+            self.whisper_model = model_registry.whisper(Config.WHISPER_MODEL_SIZE)
+            print("✓ Whisper available")
             
             self.is_offline_ready = True
             print("✓ Offline mode is ready")
@@ -61,7 +62,8 @@ class OfflineProcessingAgent:
         if not self.whisper_model:
             raise RuntimeError("Whisper model not initialized")
         
-        result = self.whisper_model.transcribe(audio_file)
+        with self.whisper_model.use() as model:
+            result = model.transcribe(audio_file)
         return {
             'text': result['text'],
             'segments': result.get('segments', []),
@@ -80,12 +82,13 @@ Transcript:
 
 Summary:"""
         
-        response = self.local_llm(
-            prompt,
-            max_tokens=500,
-            temperature=0.3,
-            stop=["Transcript:", "User:"]
-        )
+        with self.local_llm.use() as llm:
+            response = llm(
+                prompt,
+                max_tokens=500,
+                temperature=0.3,
+                stop=["Transcript:", "User:"]
+            )
         
         return response['choices'][0]['text'].strip()
     
@@ -101,12 +104,13 @@ Transcript:
 
 Action Items:"""
         
-        response = self.local_llm(
-            prompt,
-            max_tokens=300,
-            temperature=0.2,
-            stop=["Transcript:", "User:"]
-        )
+        with self.local_llm.use() as llm:
+            response = llm(
+                prompt,
+                max_tokens=300,
+                temperature=0.2,
+                stop=["Transcript:", "User:"]
+            )
         
         # Parse response
         action_text = response['choices'][0]['text'].strip()
@@ -127,15 +131,16 @@ Action Items:"""
         return action_items
     
     def get_model_info(self):
-        """Get information about loaded models"""
-        return {
-            'local_llm': {
-                'loaded': self.local_llm is not None,
-                'path': Config.LOCAL_MODEL_PATH if self.local_llm else None
-            },
-            'whisper': {
-                'loaded': self.whisper_model is not None,
-                'model': 'base' if self.whisper_model else None
-            }
+        """Get information about shared models and their memory use"""
+        info = model_registry.get_info()
+        info['local_llm'] = {
+            'available': self.local_llm is not None,
+            'loaded': self.local_llm is not None and self.local_llm.loaded,
+            'path': Config.LOCAL_MODEL_PATH if self.local_llm else None
         }
-
+        info['whisper'] = {
+            'available': self.whisper_model is not None,
+            'loaded': self.whisper_model is not None and self.whisper_model.loaded,
+            'model': self.whisper_model.name if self.whisper_model else None
+        }
+        return info
@@ -2,83 +2,146 @@
 Summarizer Agent
 Generates meeting summaries using LLMs
 """
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
-from openai import OpenAI
+from llm_providers import get_llm_provider
+from summary_chunking import pack, split_transcript
 
-# Optional: Only needed if using Claude API
-try:
-    from anthropic import Anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
-    Anthropic = None
+# Completion tokens for a chunk's notes, and for the final summary on
+# models other than OpenAI's
+CHUNK_NOTES_TOKENS = 500
+SUMMARY_TOKENS = 1500
+OPENAI_SUMMARY_TOKENS = 2500
+# Slack for tokenizer differences between the prompt pieces
+PROMPT_MARGIN_TOKENS = 64
+SUMMARY_TEMPERATURE = 0.3
+SUMMARY_SYSTEM_PROMPT = "You are an expert meeting analyst who provides comprehensive, detailed summaries. Always be thorough and include specific details, quotes, and context."
 
 
 class SummarizerAgent:
     """Agent responsible for summarizing meeting transcripts"""
     
     def __init__(self):
-        self.use_local = Config.USE_LOCAL_MODEL
-        self.use_euron = Config.USE_EURON_API
+        # Shared with the other agents (see llm_providers)
+        self.provider = get_llm_provider()
+    
+    def summarize(self, transcript_data, on_delta=None):
+        """Generate a comprehensive meeting summary
+        
+        A transcript too long for one prompt is split into chunks that are
+        summarized concurrently (map) and merged into the summary (reduce).
+        
+        Args:
+            on_delta: Optional callable(text) receiving the summary as it
+                is generated; the full summary is still returned
+        """
+        transcript_text = transcript_data.get('text', '') if isinstance(transcript_data, dict) else transcript_data
+        
+        if not self.is_available():
+            return self._fallback_summary(transcript_text)
+        
+        source, from_notes = self.prepare_source(transcript_text, self._create_summary_prompt(''))
+        if source is None:
+            return None
+        return self.generate(self._create_summary_prompt(source, from_notes), on_delta=on_delta)
+    
+    def is_available(self):
+        """Whether an LLM provider is configured"""
+        return self.provider is not None
+    
+    def prepare_source(self, transcript, template, max_tokens=None):
+        """Text a final prompt is built from, as (text, from_notes)
         
-        if self.use_local:
-            self._init_local_model()
-        else:
-            # Initialize OpenAI client (can be used for official OpenAI or Euron.one)
-            if Config.USE_EURON_API and Config.EURON_API_KEY:
-                # Use Euron.one API with OpenAI-compatible client
-                self.openai_client = OpenAI(
-                    api_key=Config.EURON_API_KEY,
-                    base_url=Config.EURON_API_BASE
-                )
-                self.model_name = Config.EURON_MODEL
-                print(f"OK: Using Euron.one API with model: {self.model_name}")
-            elif Config.OPENAI_API_KEY:
-                # Use official OpenAI API
-                self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
-                self.model_name = "gpt-4-turbo-preview"
-                print("OK: Using official OpenAI API")
-            else:
-                self.openai_client = None
-                self.model_name = None
-            
-            # Optional: Anthropic/Claude support (only if installed)
-            if ANTHROPIC_AVAILABLE and Config.ANTHROPIC_API_KEY:
-                self.anthropic_client = Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-            else:
-                self.anthropic_client = None
+        The transcript itself when it fits in the prompt template next to
+        a max_tokens completion, else merged notes on its chunks; text is
+        None when every chunk failed.
+        """
+        count_tokens = self.provider.count_tokens
+        budget = self._prompt_token_budget(count_tokens, template, max_tokens)
+        if count_tokens(transcript) <= budget:
+            return transcript, False
+        return self._summarize_map_reduce(transcript, budget, count_tokens), True
     
-    def _init_local_model(self):
-        """Initialize local LLM model"""
-        try:
-            from llama_cpp import Llama
-            self.local_model = Llama(
-                model_path=Config.LOCAL_MODEL_PATH,
-                n_ctx=4096,
-                n_threads=4
-            )
-        except Exception as e:
-            print(f"Error loading local model: {e}")
-            self.use_local = False
+    def generate(self, prompt, max_tokens=None, on_delta=None):
+        """Run a prompt on the configured provider, streaming when on_delta is given"""
+        return self.provider.complete(prompt, max_tokens or self.max_summary_tokens(),
+                                      SUMMARY_TEMPERATURE, SUMMARY_SYSTEM_PROMPT, on_delta)
     
-    def summarize(self, transcript_data):
-        """Generate a comprehensive meeting summary"""
-        transcript_text = transcript_data.get('text', '') if isinstance(transcript_data, dict) else transcript_data
+    def max_summary_tokens(self):
+        """Completion tokens for a full summary on the configured provider"""
+        return OPENAI_SUMMARY_TOKENS if self.provider.kind == 'openai' else SUMMARY_TOKENS
+    
+    def _prompt_token_budget(self, count_tokens, template, max_tokens=None):
+        """Transcript tokens one prompt built from template may carry"""
+        context_tokens = self.provider.context_tokens
+        if context_tokens is None:
+            return Config.SUMMARY_CHUNK_TOKENS
+        completion_tokens = max_tokens or self.max_summary_tokens()
+        return context_tokens - completion_tokens - count_tokens(template) - PROMPT_MARGIN_TOKENS
+    
+    def _summarize_map_reduce(self, transcript, budget, count_tokens):
+        """Summarize chunks concurrently; their merged notes, or None if all failed"""
+        chunks = split_transcript(transcript, budget, count_tokens)
+        print(f"Summarizing long transcript in {len(chunks)} chunks")
+        notes = self._summarize_parts([
+            self._create_chunk_prompt(chunk, index + 1, len(chunks))
+            for index, chunk in enumerate(chunks)
+        ])
         
-        prompt = self._create_summary_prompt(transcript_text)
+        # Very long meetings: merge neighbouring notes until they fit one prompt
+        while len(notes) > 1 and count_tokens('\n\n'.join(notes)) > budget:
+            groups = pack(notes, budget, count_tokens)
+            if len(groups) == len(notes):
+                break
+            print(f"Merging {len(notes)} chunk summaries into {len(groups)}")
+            notes = self._summarize_parts([self._create_merge_prompt('\n\n'.join(group)) for group in groups])
         
-        if self.use_local:
-            return self._summarize_local(prompt)
-        elif self.openai_client:
-            return self._summarize_openai(prompt)
-        elif self.anthropic_client:
-            return self._summarize_anthropic(prompt)
-        else:
-            return self._fallback_summary(transcript_text)
+        return '\n\n'.join(notes) if notes else None
     
-    def _create_summary_prompt(self, transcript):
-        """Create prompt for summarization"""
-        return f"""You are an expert meeting analyst and summarizer. Analyze the following meeting transcript and provide a COMPREHENSIVE, DETAILED summary.
+    def _summarize_parts(self, prompts):
+        """Run chunk prompts concurrently; the notes that came back, in order"""
+        # The provider caps concurrency too (one at a time for a local model)
+        workers = max(1, min(Config.SUMMARY_MAP_WORKERS, len(prompts), self.provider.max_concurrent))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda prompt: self.generate(prompt, CHUNK_NOTES_TOKENS), prompts))
+        notes = [result.strip() for result in results if result and result.strip()]
+        if len(notes) < len(results):
+            print(f"WARNING: {len(results) - len(notes)} of {len(results)} chunk summaries failed")
+        return notes
+    
+    def _create_chunk_prompt(self, transcript, part, parts):
+        """Create prompt for the notes on one chunk of a long transcript"""
+        return f"""You are an expert meeting analyst. Below is part {part} of {parts} of a meeting transcript. Write concise notes on this part only, keeping:
+- Topics discussed, with important facts, numbers and short quotes
+- Decisions made and who made them
+- Tasks assigned, with owners and deadlines
+- Open questions, concerns and differing viewpoints
+- Who said what, where speakers are identifiable
+
+Transcript (part {part} of {parts}):
+{transcript}
+
+Notes:"""
+    
+    def _create_merge_prompt(self, notes):
+        """Create prompt that condenses notes on consecutive transcript chunks"""
+        return f"""You are an expert meeting analyst. Below are notes on consecutive parts of one meeting. Combine them into one set of concise notes, in order, keeping every decision, task (with owner and deadline), important fact and open question.
+
+Notes:
+{notes}
+
+Combined notes:"""
+    
+    def _create_summary_prompt(self, transcript, from_notes=False):
+        """Create prompt for summarization
+        
+        Args:
+            from_notes: The text is notes on consecutive parts of the meeting
+                (map-reduce) rather than the transcript itself
+        """
+        source = "notes taken on consecutive parts of a meeting" if from_notes else "meeting transcript"
+        heading = "Meeting Notes (in order)" if from_notes else "Meeting Transcript"
+        return f"""You are an expert meeting analyst and summarizer. Analyze the following {source} and provide a COMPREHENSIVE, DETAILED summary.
 
 Your summary should be thorough and include:
 
@@ -125,58 +188,11 @@ Your summary should be thorough and include:
    - Information or resources needed
    - Open questions requiring answers
 
-Meeting Transcript:
+{heading}:
 {transcript}
 
 Please provide a well-structured, DETAILED summary with specific examples and quotes where relevant. Make it comprehensive enough that someone who missed the meeting can fully understand what happened:"""
     
-    def _summarize_openai(self, prompt):
-        """Summarize using OpenAI API (official or Euron.one)"""
-        try:
-            response = self.openai_client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are an expert meeting analyst who provides comprehensive, detailed summaries. Always be thorough and include specific details, quotes, and context."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=2500  # Increased for more detailed summaries
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"AI summarization error: {e}")
-            return None
-    
-    def _summarize_anthropic(self, prompt):
-        """Summarize using Claude"""
-        try:
-            response = self.anthropic_client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1500,
-                temperature=0.3,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.content[0].text
-        except Exception as e:
-            print(f"Anthropic summarization error: {e}")
-            return None
-    
-    def _summarize_local(self, prompt):
-        """Summarize using local LLM"""
-        try:
-            response = self.local_model(
-                prompt,
-                max_tokens=1500,
-                temperature=0.3,
-                stop=["User:", "Human:"]
-            )
-            return response['choices'][0]['text']
-        except Exception as e:
-            print(f"Local model summarization error: {e}")
-            return None
-    
     def _fallback_summary(self, transcript):
         """Fallback summary when no AI model is available"""
         words = transcript.split()
@@ -1,11 +1,26 @@
 """
 Transcription Agent
-Transcribes audio using Whisper, Deepgram, or AssemblyAI
+Transcribes audio using Whisper, faster-whisper, Deepgram, or AssemblyAI
 """
+import io
 import os
+import threading
 from pathlib import Path
+import numpy as np
+import soundfile as sf
 from config import Config
 
+from audio_pipeline import CANONICAL_SAMPLE_RATE, to_canonical
+from model_registry import model_registry
+from segmented_transcription import transcribe_segmented
+from transcription_cache import TranscriptionCache, hash_audio_file
+from deepgram_client import DeepgramClient, DeepgramError
+from decode_profiles import decode_options, normalize_language, whisper_kwargs
+from audio_archive import get_mime_type
+
+# Whisper models expect 16 kHz mono float32 input
+WHISPER_SAMPLE_RATE = CANONICAL_SAMPLE_RATE
+
 # Try to import whisper, but make it optional
 try:
     import whisper
@@ -16,6 +31,17 @@ except Exception as e:
     WHISPER_AVAILABLE = False
     whisper = None
 
+# CTranslate2 engine for int8 CPU inference, also optional
+try:
+    import faster_whisper  # noqa: F401
+    FASTER_WHISPER_AVAILABLE = True
+except Exception:
+    FASTER_WHISPER_AVAILABLE = False
+
+
+class FallbackTranscript(dict):
+    """Placeholder result returned when no backend could transcribe"""
+
 
 class TranscriptionAgent:
     """Agent responsible for transcribing audio to text"""
@@ -23,44 +49,264 @@ class TranscriptionAgent:
     def __init__(self):
         self.model_type = Config.TRANSCRIPTION_MODEL
         self.whisper_model = None
+        self.fast_whisper_model = None
+        self.cache = TranscriptionCache() if Config.ENABLE_CACHING else None
+        self.deepgram_client = None
+        self._deepgram_lock = threading.Lock()
+        # Per-meeting language and decode profile, see set_meeting_options
+        self.meeting_options = {}
+        self._options_lock = threading.Lock()
         
         if self.model_type == 'whisper' and WHISPER_AVAILABLE:
-            try:
-                print("Loading Whisper model...")
-                self.whisper_model = whisper.load_model("base")
-                print("OK: Whisper model loaded")
-            except Exception as e:
-                print(f"WARNING: Whisper loading failed: {e}")
-                print("   Will use fallback transcription")
-                self.whisper_model = None
+            # Shared with every other agent; loaded on the first transcription
+            self.whisper_model = model_registry.whisper(Config.WHISPER_MODEL_SIZE)
+            self.fast_whisper_model = model_registry.whisper(Config.WHISPER_FAST_MODEL)
         elif self.model_type == 'whisper' and not WHISPER_AVAILABLE:
             print("WARNING: Whisper requested but not available")
             print("   Using fallback transcription")
+        elif self.model_type == 'faster-whisper' and FASTER_WHISPER_AVAILABLE:
+            self.whisper_model = model_registry.faster_whisper(Config.WHISPER_MODEL_SIZE)
+            self.fast_whisper_model = model_registry.faster_whisper(Config.WHISPER_FAST_MODEL)
+        elif self.model_type == 'faster-whisper':
+            print("WARNING: faster-whisper requested but not installed (pip install faster-whisper)")
+            print("   Using fallback transcription")
     
-    def transcribe(self, audio_file, meeting_id=None):
-        """Transcribe audio file to text"""
-        if not audio_file or not os.path.exists(audio_file):
-            raise ValueError(f"Audio file not found: {audio_file}")
+    def transcribe(self, audio, meeting_id=None, sample_rate=None, fast=False):
+        """Transcribe audio to text
         
-        print(f"Transcribing audio file: {audio_file}")
+        Args:
+            audio: Path to an audio file, a numpy array of float32 samples
+                (frames or frames x channels), or raw 16-bit PCM bytes
+            meeting_id: Optional meeting the audio belongs to
+            sample_rate: Sample rate of in-memory audio (defaults to Config.SAMPLE_RATE)
+            fast: Use the smaller Whisper model and the fast decode profile
+                to catch up under load
+        """
+        options = self._options_for(meeting_id, fast)
+        if isinstance(audio, (np.ndarray, bytes, bytearray, memoryview)):
+            audio = self._to_float_array(audio)
+            sample_rate = sample_rate or Config.SAMPLE_RATE
+            print(f"Transcribing in-memory audio: {len(audio) / sample_rate:.1f}s")
+            result = self._transcribe_with_backend(audio, sample_rate, fast, options)
+        else:
+            if not audio or not os.path.exists(audio):
+                raise ValueError(f"Audio file not found: {audio}")
+            print(f"Transcribing audio file: {audio}")
+            if self.cache:
+                result = self._transcribe_file_cached(audio, fast, options)
+            elif not fast and self._is_long_recording(audio):
+                result = self._transcribe_segmented(audio, options)
+            else:
+                result = self._transcribe_with_backend(audio, sample_rate, fast, options)
         
+        self._pin_detected_language(meeting_id, options, result)
+        return result
+    
+    def set_meeting_options(self, meeting_id, language=None, profile=None):
+        """Choose a meeting's language ('auto' to detect) and decode profile
+        
+        Unset values fall back to TRANSCRIPTION_LANGUAGE and
+        TRANSCRIPTION_PROFILE. Raises ValueError for an unknown profile.
+        """
+        if profile is not None:
+            decode_options(profile=profile)
+        with self._options_lock:
+            self.meeting_options[meeting_id] = {
+                'language': normalize_language(language) if language else None,
+                'profile': profile
+            }
+    
+    def get_meeting_language(self, meeting_id):
+        """The language a meeting is transcribed in, or None while still undetected"""
+        return self._options_for(meeting_id)['language']
+    
+    def forget_meeting(self, meeting_id):
+        """Drop a finished meeting's options"""
+        with self._options_lock:
+            self.meeting_options.pop(meeting_id, None)
+    
+    def _options_for(self, meeting_id, fast=False):
+        """Decode options for a transcription: the meeting's pinned language
+        and profile, else the configured ones; fast always decodes greedily"""
+        with self._options_lock:
+            meeting = dict(self.meeting_options.get(meeting_id) or {})
+        language = meeting.get('language') or Config.TRANSCRIPTION_LANGUAGE
+        return decode_options(language, 'fast' if fast else meeting.get('profile'))
+    
+    def _pin_detected_language(self, meeting_id, options, result):
+        """Keep the language Whisper detected on a meeting's first speech
+        
+        Later chunks and the final pass then skip language detection.
+        """
+        if (meeting_id is None or options['language'] or isinstance(result, FallbackTranscript) or
+                self.model_type not in ('whisper', 'faster-whisper')):
+            return
+        if not result or not result.get('text', '').strip() or not result.get('language'):
+            return
+        with self._options_lock:
+            meeting = self.meeting_options.setdefault(meeting_id, {'language': None, 'profile': None})
+            if not meeting['language']:
+                meeting['language'] = result['language']
+                print(f"Detected language '{result['language']}' for meeting {meeting_id}")
+    
+    def _transcribe_with_backend(self, audio, sample_rate=None, fast=False, options=None):
+        """Dispatch to the configured transcription backend"""
+        options = options or self._options_for(None, fast)
         if self.model_type == 'whisper':
-            return self._transcribe_whisper(audio_file)
+            if fast:
+                return self._transcribe_whisper(audio, sample_rate, model=self.fast_whisper_model,
+                                                options=options)
+            return self._transcribe_whisper(audio, sample_rate, options=options)
+        elif self.model_type == 'faster-whisper':
+            if fast:
+                return self._transcribe_faster_whisper(audio, sample_rate, model=self.fast_whisper_model,
+                                                       options=options)
+            return self._transcribe_faster_whisper(audio, sample_rate, options=options)
         elif self.model_type == 'deepgram':
-            return self._transcribe_deepgram(audio_file)
+            return self._transcribe_deepgram(audio, sample_rate, options=options)
         elif self.model_type == 'assemblyai':
-            return self._transcribe_assemblyai(audio_file)
+            return self._transcribe_assemblyai(audio, sample_rate, options=options)
         else:
             raise ValueError(f"Unknown transcription model: {self.model_type}")
     
-    def _transcribe_whisper(self, audio_file):
-        """Transcribe using Whisper"""
-        if not self.whisper_model:
+    def _transcribe_file_cached(self, audio_file, fast=False, options=None):
+        """Transcribe a file, reusing an earlier transcript of identical audio
+        
+        Live chunks are never cached: they are unique and short-lived.
+        Fallback placeholders are not stored, so a later run can still
+        produce a real transcript.
+        """
+        options = options or self._options_for(None, fast)
+        key = self.cache.make_key(hash_audio_file(audio_file), self.model_type,
+                                  *self._cache_settings(fast, options))
+        cached = self.cache.get(key)
+        if cached is not None:
+            print(f"Transcription cache hit for {audio_file}")
+            return cached
+        
+        if not fast and self._is_long_recording(audio_file):
+            result = self._transcribe_segmented(audio_file, options)
+        else:
+            result = self._transcribe_with_backend(audio_file, fast=fast, options=options)
+        if not isinstance(result, FallbackTranscript):
+            self.cache.set(key, result)
+        return result
+    
+    def _cache_settings(self, fast=False, options=None):
+        """(model, language, options) that change what a backend returns"""
+        options = options or self._options_for(None, fast)
+        language = options['language'] or 'auto'
+        if self.model_type in ('whisper', 'faster-whisper'):
+            model = Config.WHISPER_FAST_MODEL if fast else Config.WHISPER_MODEL_SIZE
+            settings = whisper_kwargs(self.model_type, options)
+            settings.pop('language')
+            if self.model_type == 'faster-whisper':
+                settings['compute_type'] = Config.FASTER_WHISPER_COMPUTE_TYPE
+            return model, language, settings
+        if self.model_type == 'deepgram':
+            return 'nova-2', language, {'smart_format': True}
+        return None, language, {}
+    
+    def remember(self, audio_file, result, meeting_id=None):
+        """Cache a transcript for a file derived from already-transcribed audio
+        
+        Archiving re-encodes a recording, which changes its hash; storing the
+        transcript under the archived file keeps reprocessing a cache hit.
+        """
+        if not self.cache or isinstance(result, FallbackTranscript):
+            return
+        key = self.cache.make_key(hash_audio_file(audio_file), self.model_type,
+                                  *self._cache_settings(options=self._options_for(meeting_id)))
+        self.cache.set(key, result)
+    
+    def get_cache_stats(self):
+        """Transcription cache statistics, or None when caching is disabled"""
+        return self.cache.get_stats() if self.cache else None
+    
+    def _to_float_array(self, audio):
+        """Normalize in-memory audio to a float32 numpy array"""
+        if isinstance(audio, np.ndarray):
+            return audio.astype(np.float32, copy=False)
+        # Raw PCM buffers are little-endian signed 16-bit samples
+        pcm = np.frombuffer(audio, dtype='<i2')
+        pcm = pcm.reshape(-1, Config.CHANNELS) if Config.CHANNELS > 1 else pcm
+        return pcm.astype(np.float32) / 32768.0
+    
+    def _to_whisper_input(self, audio_array, sample_rate):
+        """Downmix and resample an array to Whisper's 16 kHz mono input"""
+        return to_canonical(audio_array, sample_rate or WHISPER_SAMPLE_RATE)
+    
+    def _load_canonical_file(self, audio_file):
+        """Read a 16 kHz mono file directly, skipping Whisper's ffmpeg decode
+        
+        Recordings are already written in the canonical format, so decoding
+        them through ffmpeg would only resample to the same rate. Returns
+        None for anything else so Whisper handles it as before.
+        """
+        try:
+            info = sf.info(audio_file)
+        except Exception:
+            return None
+        if info.samplerate != WHISPER_SAMPLE_RATE or info.channels != 1:
+            return None
+        audio_array, _ = sf.read(audio_file, dtype='float32')
+        return audio_array
+    
+    def _to_pcm16(self, audio_array):
+        """Encode a float array as little-endian 16-bit PCM bytes"""
+        clipped = np.clip(audio_array, -1.0, 1.0)
+        return (clipped * 32767.0).astype('<i2').tobytes()
+    
+    def _describe(self, audio):
+        """Human-readable name for audio in log and fallback messages"""
+        return "live audio chunk" if isinstance(audio, np.ndarray) else audio
+    
+    def _is_long_recording(self, audio_file):
+        """Whether a file is long enough to split across worker processes"""
+        if self.model_type not in ('whisper', 'faster-whisper') or not self.whisper_model:
+            return False
+        # Several processes only pay off on CPU; a GPU is busy with one
+        if self.whisper_model.device != 'cpu' or Config.LONG_AUDIO_WORKERS == 1:
+            return False
+        try:
+            duration = sf.info(audio_file).duration
+        except Exception:
+            return False
+        return duration >= Config.LONG_AUDIO_THRESHOLD_SECONDS
+    
+    def _transcribe_segmented(self, audio_file, options=None):
+        """Transcribe a long recording in parallel, pause-aligned segments"""
+        try:
+            return transcribe_segmented(audio_file, self.model_type, Config.WHISPER_MODEL_SIZE,
+                                        decode_options=options)
+        except Exception as e:
+            print(f"WARNING: Segmented transcription failed ({e}), transcribing in one pass")
+            if self.model_type == 'faster-whisper':
+                return self._transcribe_faster_whisper(audio_file, options=options)
+            return self._transcribe_whisper(audio_file, options=options)
+    
+    def _transcribe_whisper(self, audio_file, sample_rate=None, model=None, options=None):
+        """Transcribe using Whisper
+        
+        Args:
+            model: Registry handle to use instead of the main Whisper model
+            options: Language and decode profile (see decode_profiles)
+        """
+        model = model or self.whisper_model
+        if not model:
             print("WARNING: Whisper model not loaded, using fallback")
             return self._transcribe_fallback(audio_file)
         
         try:
-            result = self.whisper_model.transcribe(audio_file)
+            # Arrays go straight to the model, skipping the ffmpeg decode
+            if isinstance(audio_file, np.ndarray):
+                audio_input = self._to_whisper_input(audio_file, sample_rate)
+            else:
+                audio_input = self._load_canonical_file(audio_file)
+                if audio_input is None:
+                    audio_input = audio_file
+            with model.use() as whisper_model:
+                result = whisper_model.transcribe(audio_input, **whisper_kwargs('whisper', options))
             transcript = result['text']
             
             # Get segments with timestamps
@@ -69,7 +315,9 @@ class TranscriptionAgent:
                 segments.append({
                     'start': segment['start'],
                     'end': segment['end'],
-                    'text': segment['text']
+                    'text': segment['text'],
+                    'avg_logprob': segment.get('avg_logprob'),
+                    'compression_ratio': segment.get('compression_ratio')
                 })
             
             return {
@@ -78,67 +326,111 @@ class TranscriptionAgent:
                 'language': result.get('language', 'en')
             }
         except Exception as e:
+            if model is not self.whisper_model:
+                print(f"WARNING: Whisper {model.name} failed ({e}), using {self.whisper_model.name}")
+                return self._transcribe_whisper(audio_file, sample_rate, options=options)
             print(f"Whisper transcription error: {e}")
             return self._transcribe_fallback(audio_file)
     
+    def _transcribe_faster_whisper(self, audio_file, sample_rate=None, model=None, options=None):
+        """Transcribe using faster-whisper (CTranslate2, int8 on CPU by default)"""
+        model = model or self.whisper_model
+        if not model:
+            print("WARNING: faster-whisper model not loaded, using fallback")
+            return self._transcribe_fallback(audio_file)
+        
+        try:
+            if isinstance(audio_file, np.ndarray):
+                audio_input = self._to_whisper_input(audio_file, sample_rate)
+            else:
+                audio_input = self._load_canonical_file(audio_file)
+                if audio_input is None:
+                    audio_input = str(audio_file)
+            with model.use() as whisper_model:
+                segments_iter, info = whisper_model.transcribe(
+                    audio_input,
+                    **whisper_kwargs('faster-whisper', options)
+                )
+                # Segments are decoded lazily, so consume them while holding the model
+                segments = [
+                    {
+                        'start': segment.start,
+                        'end': segment.end,
+                        'text': segment.text,
+                        'avg_logprob': segment.avg_logprob,
+                        'compression_ratio': segment.compression_ratio
+                    }
+                    for segment in segments_iter
+                ]
+            
+            return {
+                'text': ''.join(segment['text'] for segment in segments),
+                'segments': segments,
+                'language': info.language or 'en'
+            }
+        except Exception as e:
+            if model is not self.whisper_model:
+                print(f"WARNING: faster-whisper {model.name} failed ({e}), using {self.whisper_model.name}")
+                return self._transcribe_faster_whisper(audio_file, sample_rate, options=options)
+            print(f"faster-whisper transcription error: {e}")
+            return self._transcribe_fallback(audio_file)
+    
     def _transcribe_fallback(self, audio_file):
         """Fallback when Whisper is not available"""
-        return {
-            'text': f"[Audio recorded from {audio_file}]\n\nTranscription temporarily unavailable. Please:\n1. Install Visual C++ Redistributables\n2. Or use Deepgram/AssemblyAI API\n3. Or wait for transcription service setup",
+        return FallbackTranscript({
+            'text': f"[Audio recorded from {self._describe(audio_file)}]\n\nTranscription temporarily unavailable. Please:\n1. Install Visual C++ Redistributables\n2. Or use Deepgram/AssemblyAI API\n3. Or wait for transcription service setup",
             'segments': [],
             'language': 'en'
-        }
+        })
+    
+    def _get_deepgram_client(self):
+        """Shared pooled Deepgram client, created on first use"""
+        with self._deepgram_lock:
+            if self.deepgram_client is None:
+                if not Config.DEEPGRAM_API_KEY:
+                    raise ValueError("DEEPGRAM_API_KEY not configured")
+                self.deepgram_client = DeepgramClient(Config.DEEPGRAM_API_KEY)
+            return self.deepgram_client
     
-    def _transcribe_deepgram(self, audio_file):
+    def _transcribe_deepgram(self, audio_file, sample_rate=None, options=None):
         """Transcribe using Deepgram API"""
+        language = options['language'] if options else None
         try:
-            import httpx
-            
-            if not Config.DEEPGRAM_API_KEY:
-                raise ValueError("DEEPGRAM_API_KEY not configured")
+            client = self._get_deepgram_client()
+            print(f"Transcribing with Deepgram: {self._describe(audio_file)}")
             
-            print(f"Transcribing with Deepgram: {audio_file}")
+            params = {'model': 'nova-2', 'smart_format': 'true'}
+            if language:
+                params['language'] = language
+            if isinstance(audio_file, np.ndarray):
+                # Send raw PCM and describe it in the query instead of a container
+                channels = audio_file.shape[1] if audio_file.ndim > 1 else 1
+                params.update(encoding='linear16', sample_rate=sample_rate, channels=channels)
+                result, request_info = client.transcribe_bytes(
+                    self._to_pcm16(audio_file), params, duration=len(audio_file) / sample_rate
+                )
+            else:
+                mime_type = get_mime_type(audio_file)
+                if mime_type == 'application/octet-stream':
+                    mime_type = 'audio/*'
+                result, request_info = client.transcribe_file(audio_file, params, content_type=mime_type)
             
-            # Read audio file
-            with open(audio_file, 'rb') as f:
-                audio_data = f.read()
-            
-            file_size = len(audio_data)
-            print(f"Audio file size: {file_size / 1024:.2f} KB")
-            
-            # Make direct API call to Deepgram with longer timeout
-            url = "https://api.deepgram.com/v1/listen?model=nova-2&smart_format=true"
-            headers = {
-                "Authorization": f"Token {Config.DEEPGRAM_API_KEY}",
-                "Content-Type": "audio/wav"
-            }
-            
-            print("Sending request to Deepgram...")
-            response = httpx.post(url, headers=headers, content=audio_data, timeout=60.0)
-            response.raise_for_status()
-            
-            result = response.json()
             transcript = result["results"]["channels"][0]["alternatives"][0]["transcript"]
             
             if not transcript or transcript.strip() == "":
                 print("Deepgram returned empty transcript (no speech detected)")
                 transcript = ""
             
-            print(f"Deepgram transcription successful: {len(transcript)} characters")
+            print(f"Deepgram transcription successful: {len(transcript)} characters in "
+                  f"{request_info['latency_seconds']}s ({request_info['attempts']} attempt(s))")
             
             return {
                 'text': transcript,
                 'segments': [],
-                'language': 'en'
+                'language': language or 'en'
             }
-        except httpx.TimeoutException as e:
-            print(f"Deepgram timeout error: {e}")
-            print("Audio file may be too long or network is slow. Using fallback.")
-            return self._transcribe_fallback(audio_file)
-        except httpx.HTTPStatusError as e:
-            print(f"Deepgram HTTP error: {e}")
-            print(f"Status code: {e.response.status_code}")
-            print(f"Response: {e.response.text[:200]}")
+        except DeepgramError as e:
+            print(f"ERROR: Deepgram transcription failed: {e}")
             return self._transcribe_fallback(audio_file)
         except Exception as e:
             print(f"Deepgram transcription error: {e}")
@@ -147,8 +439,13 @@ class TranscriptionAgent:
             # Fallback
             return self._transcribe_fallback(audio_file)
     
-    def _transcribe_assemblyai(self, audio_file):
+    def get_deepgram_stats(self):
+        """Deepgram request and latency statistics, or None before first use"""
+        return self.deepgram_client.get_stats() if self.deepgram_client else None
+    
+    def _transcribe_assemblyai(self, audio_file, sample_rate=None, options=None):
         """Transcribe using AssemblyAI API"""
+        language = options['language'] if options else None
         try:
             import assemblyai as aai
             
@@ -156,17 +453,25 @@ class TranscriptionAgent:
                 raise ValueError("ASSEMBLYAI_API_KEY not configured")
             
             aai.settings.api_key = Config.ASSEMBLYAI_API_KEY
-            transcriber = aai.Transcriber()
+            config = aai.TranscriptionConfig(language_code=language) if language else None
+            transcriber = aai.Transcriber(config=config)
             
-            transcript = transcriber.transcribe(audio_file)
+            if isinstance(audio_file, np.ndarray):
+                # The SDK uploads file-like objects as-is; wrap the array in WAV
+                wav_buffer = io.BytesIO()
+                sf.write(wav_buffer, audio_file, sample_rate, format='WAV')
+                wav_buffer.seek(0)
+                transcript = transcriber.transcribe(wav_buffer)
+            else:
+                transcript = transcriber.transcribe(audio_file)
             
             return {
                 'text': transcript.text,
                 'segments': [],
-                'language': 'en'
+                'language': language or 'en'
             }
         except Exception as e:
             print(f"AssemblyAI transcription error: {e}")
             # Fallback to Whisper
-            return self._transcribe_whisper(audio_file)
+            return self._transcribe_whisper(audio_file, sample_rate, options=options)
 
@@ -2,8 +2,8 @@
 API endpoints for health check and system status
 """
 from flask import jsonify
-from backend.config import Config
-from backend.agents.offline_processing import OfflineProcessingAgent
+from config import Config
+from model_registry import model_registry
 import sys
 import os
 
@@ -34,8 +34,8 @@ def register_system_routes(app, offline_agent):
     
     @app.route('/api/system/models', methods=['GET'])
     def model_info():
-        """Get information about loaded AI models"""
+        """Get information about loaded AI models and their memory use"""
         if offline_agent:
             return jsonify(offline_agent.get_model_info())
-        return jsonify({'error': 'Offline agent not initialized'})
+        return jsonify(model_registry.get_info())
 
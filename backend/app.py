@@ -5,31 +5,47 @@ Main application entry point
 # Don't use eventlet on Windows - use threading instead
 import os
 import json
+import shutil
+import threading
+import uuid
+from datetime import datetime, timedelta
 from pathlib import Path
-from flask import Flask, request, jsonify, send_file
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, jsonify, send_file, send_from_directory
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
+from sqlalchemy import insert
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+import soundfile as sf
 from dotenv import load_dotenv
 
 # Load environment variables FIRST - before importing Config
 env_path = Path(__file__).parent.parent / '.env'
-print(f"Loading .env from: {env_path}")
-print(f".env exists: {env_path.exists()}")
 load_dotenv(dotenv_path=str(env_path))
 
 # Now import modules that depend on environment variables
-from database import init_db, get_db_session
-from models import Meeting, ActionItem, Participant
+from database import init_db, get_db_session, close_db_session
+from models import Meeting, ActionItem, Participant, TranscriptSegment, ImportedRecording
 from agents.audio_listener import AudioListenerAgent
+from agents.live_transcription import LiveTranscriptionAgent
 from agents.transcription import TranscriptionAgent
 from agents.summarizer import SummarizerAgent
 from agents.action_item_extractor import ActionItemExtractorAgent
+from agents.meeting_analysis import MeetingAnalysisAgent
 from agents.calendar_sync import CalendarSyncAgent
 from agents.notion_export import NotionExportAgent
 from agents.jira_sync import JiraSyncAgent
 from agents.translation import TranslationAgent
 from agents.task_sync import TaskSyncAgent
+from agents.offline_processing import OfflineProcessingAgent
+from api_routes import register_system_routes
 from config import Config
+from audio_archive import archive_recording, read_time_range, get_mime_type
+from decode_profiles import DECODE_PROFILES
+from diarization import diarize, label_segments
+from llm_cache import get_llm_cache
+from llm_providers import get_llm_provider
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -39,32 +55,80 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 # Use threading mode instead of eventlet for Windows compatibility
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
-# Initialize database
-init_db()
-
-# Initialize agents
-transcription_agent = TranscriptionAgent()
-audio_agent = AudioListenerAgent(socketio, transcription_agent)
-summarizer_agent = SummarizerAgent()
-action_item_agent = ActionItemExtractorAgent()
-task_sync_agent = TaskSyncAgent()
-calendar_sync_agent = CalendarSyncAgent()
-notion_export_agent = NotionExportAgent()
-jira_sync_agent = JiraSyncAgent()
-translation_agent = TranslationAgent()
-
-# Print configuration on startup
-print("\n" + "="*60)
-print("CONFIGURATION CHECK:")
-print("="*60)
-print(f"Transcription Model: {Config.TRANSCRIPTION_MODEL}")
-print(f"Deepgram API Key: {'SET' if Config.DEEPGRAM_API_KEY else 'NOT SET'}")
-print(f"Euron API: {'ENABLED' if Config.USE_EURON_API else 'DISABLED'}")
-print(f"Euron API Key: {'SET' if Config.EURON_API_KEY else 'NOT SET'}")
-print("="*60 + "\n")
+# Agents, executors and shared state are created by init_app(). Transcription
+# worker processes are spawned and import this module as __mp_main__, so
+# nothing expensive may run at import time.
+transcription_agent = None
+live_transcription_agent = None
+audio_agent = None
+summarizer_agent = None
+action_item_agent = None
+meeting_analysis_agent = None
+task_sync_agent = None
+calendar_sync_agent = None
+notion_export_agent = None
+jira_sync_agent = None
+translation_agent = None
+offline_agent = None
 
 # Global state
 active_meetings = {}
+background_executor = None
+processing_executor = None
+ingestion_lock = threading.Lock()
+ingestion_stats = {'queued': 0, 'processing': 0, 'completed': 0, 'failed': 0}
+
+
+def init_app():
+    """Initialize the database, agents and executors; call once before serving"""
+    global transcription_agent, live_transcription_agent, audio_agent, summarizer_agent
+    global action_item_agent, meeting_analysis_agent, task_sync_agent, calendar_sync_agent
+    global notion_export_agent, jira_sync_agent, translation_agent, offline_agent
+    global background_executor, processing_executor
+
+    print(f"Loading .env from: {env_path}")
+    print(f".env exists: {env_path.exists()}")
+
+    # Initialize database
+    init_db()
+
+    # Initialize agents
+    transcription_agent = TranscriptionAgent()
+    live_transcription_agent = LiveTranscriptionAgent(socketio)
+    audio_agent = AudioListenerAgent(socketio, transcription_agent, live_transcription_agent)
+    summarizer_agent = SummarizerAgent()
+    action_item_agent = ActionItemExtractorAgent()
+    meeting_analysis_agent = MeetingAnalysisAgent(summarizer_agent, action_item_agent)
+    task_sync_agent = TaskSyncAgent()
+    calendar_sync_agent = CalendarSyncAgent()
+    notion_export_agent = NotionExportAgent()
+    jira_sync_agent = JiraSyncAgent()
+    translation_agent = TranslationAgent()
+    offline_agent = OfflineProcessingAgent()
+
+    # System status and shared model info (/api/system/*)
+    register_system_routes(app, offline_agent)
+
+    # Print configuration on startup
+    print("\n" + "="*60)
+    print("CONFIGURATION CHECK:")
+    print("="*60)
+    print(f"Transcription Model: {Config.TRANSCRIPTION_MODEL}")
+    print(f"Deepgram API Key: {'SET' if Config.DEEPGRAM_API_KEY else 'NOT SET'}")
+    print(f"Euron API: {'ENABLED' if Config.USE_EURON_API else 'DISABLED'}")
+    print(f"Euron API Key: {'SET' if Config.EURON_API_KEY else 'NOT SET'}")
+    print("="*60 + "\n")
+
+    # Background work that can overlap the LLM calls (e.g. audio archiving)
+    background_executor = ThreadPoolExecutor(max_workers=Config.MAX_CONCURRENT_PROCESSING)
+
+    # Uploaded and imported recordings run the full meeting pipeline here.
+    # Kept separate from background_executor, which the pipeline itself waits on
+    processing_executor = ThreadPoolExecutor(max_workers=Config.MAX_CONCURRENT_PROCESSING)
+
+
+# Audio formats accepted for upload and import (decoded by ffmpeg/libsndfile)
+UPLOAD_EXTENSIONS = {'.wav', '.flac', '.ogg', '.opus', '.mp3', '.m4a', '.mp4', '.webm', '.aac'}
 
 
 @app.route('/health', methods=['GET'])
@@ -75,10 +139,11 @@ def health_check():
 
 @app.route('/api/meetings', methods=['GET'])
 def get_meetings():
-    """Get all meetings"""
+    """Get all meetings (?transcript=false leaves out the transcripts)"""
+    include_transcript = request.args.get('transcript', 'true').lower() != 'false'
     session = get_db_session()
     meetings = session.query(Meeting).order_by(Meeting.start_time.desc()).all()
-    return jsonify([meeting.to_dict() for meeting in meetings])
+    return jsonify([meeting.to_dict(include_transcript) for meeting in meetings])
 
 
 @app.route('/api/meetings/<int:meeting_id>', methods=['GET'])
@@ -91,6 +156,65 @@ def get_meeting(meeting_id):
     return jsonify(meeting.to_dict())
 
 
+@app.route('/api/meetings/<int:meeting_id>/segments', methods=['GET'])
+def get_transcript_segments(meeting_id):
+    """Get a page of a meeting's transcript segments
+    
+    Query parameters: start and end (seconds) return the segments that
+    overlap that window; offset and limit page through them in order.
+    """
+    try:
+        window_start = float(request.args['start']) if 'start' in request.args else None
+        window_end = float(request.args['end']) if 'end' in request.args else None
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(max(1, int(request.args.get('limit', 200))), 1000)
+    except ValueError:
+        return jsonify({"error": "start and end must be numbers, offset and limit integers"}), 400
+    
+    session = get_db_session()
+    meeting = session.query(Meeting).filter_by(id=meeting_id).first()
+    if not meeting:
+        return jsonify({"error": "Meeting not found"}), 404
+    _backfill_transcript_segments(session, meeting)
+    
+    query = session.query(TranscriptSegment).filter(TranscriptSegment.meeting_id == meeting_id)
+    if window_end is not None:
+        query = query.filter(TranscriptSegment.start < window_end)
+    if window_start is not None:
+        query = query.filter(TranscriptSegment.end > window_start)
+    total = query.count()
+    segments = query.order_by(TranscriptSegment.start).offset(offset).limit(limit).all()
+    
+    return jsonify({
+        'meeting_id': meeting_id,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'segments': [segment.to_dict() for segment in segments]
+    })
+
+
+def _store_transcript_segments(session, meeting_id, transcript):
+    """Replace a meeting's segment rows with a transcript's segments in one bulk insert"""
+    session.query(TranscriptSegment).filter_by(meeting_id=meeting_id).delete()
+    rows = TranscriptSegment.rows_from_transcript(meeting_id, transcript)
+    if rows:
+        session.execute(insert(TranscriptSegment), rows)
+
+
+def _backfill_transcript_segments(session, meeting):
+    """Split a transcript stored before segments had their own table"""
+    if not meeting.transcript or meeting.segments.first() is not None:
+        return
+    try:
+        transcript = json.loads(meeting.transcript)
+    except (json.JSONDecodeError, ValueError):
+        return
+    if isinstance(transcript, dict) and transcript.get('segments'):
+        _store_transcript_segments(session, meeting.id, transcript)
+        session.commit()
+
+
 @app.route('/api/meetings/<int:meeting_id>/action-items', methods=['GET'])
 def get_action_items(meeting_id):
     """Get action items for a meeting"""
@@ -132,9 +256,68 @@ def update_meeting_title(meeting_id):
     return jsonify({"success": True, "meeting": meeting.to_dict()})
 
 
+@app.route('/api/audio/devices', methods=['GET'])
+def get_audio_devices():
+    """List input devices that can be recorded from"""
+    try:
+        return jsonify(audio_agent.list_devices())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/audio/sessions', methods=['GET'])
+def get_audio_sessions():
+    """Get capture statistics for every active recording"""
+    return jsonify(audio_agent.get_session_stats())
+
+
+@app.route('/api/transcription/queue', methods=['GET'])
+def transcription_queue_stats():
+    """Get live transcription queue depth and wait-time metrics"""
+    return jsonify(audio_agent.get_queue_stats())
+
+
+@app.route('/api/transcription/cache', methods=['GET'])
+def transcription_cache_stats():
+    """Get transcription cache size and hit rate"""
+    stats = transcription_agent.get_cache_stats()
+    if stats is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **stats})
+
+
+@app.route('/api/llm/cache', methods=['GET'])
+def llm_cache_stats():
+    """Get LLM response cache size and hit rate"""
+    cache = get_llm_cache()
+    if cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **cache.get_stats()})
+
+
+@app.route('/api/llm/provider', methods=['GET'])
+def llm_provider_stats():
+    """Get LLM request counts, queued requests and latency percentiles"""
+    provider = get_llm_provider()
+    if provider is None:
+        return jsonify({'provider': None})
+    return jsonify(provider.get_stats())
+
+
+@app.route('/api/transcription/deepgram', methods=['GET'])
+def deepgram_stats():
+    """Get Deepgram request counts, retries and latency percentiles"""
+    return jsonify(transcription_agent.get_deepgram_stats() or {'requests': 0})
+
+
 @app.route('/data/audio/<path:filename>')
 def serve_audio(filename):
-    """Serve audio files"""
+    """Serve audio files
+    
+    Byte-range requests (Range header) are answered with partial content so
+    players can seek without re-downloading. ?start=<s>&end=<s> decodes just
+    that time window and returns it as WAV.
+    """
     try:
         audio_dir = Config.AUDIO_DIR
         file_path = audio_dir / filename
@@ -142,12 +325,196 @@ def serve_audio(filename):
         if not file_path.exists():
             return jsonify({"error": "Audio file not found"}), 404
         
-        return send_file(str(file_path), mimetype='audio/wav')
+        if 'start' in request.args or 'end' in request.args:
+            try:
+                start = float(request.args.get('start', 0))
+                end = float(request.args['end']) if 'end' in request.args else None
+                window = read_time_range(file_path, start, end)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return send_file(window, mimetype='audio/wav')
+        
+        return send_from_directory(
+            str(audio_dir),
+            filename,
+            mimetype=get_mime_type(filename),
+            conditional=True
+        )
     except Exception as e:
         print(f"Error serving audio file: {e}")
         return jsonify({"error": "Error serving audio file"}), 500
 
 
+# ============ UPLOAD AND IMPORT ENDPOINTS ============
+
+def _audio_duration_seconds(file_path):
+    """Duration of a recording, or None if libsndfile cannot read it"""
+    try:
+        return sf.info(str(file_path)).duration
+    except Exception:
+        return None
+
+
+def _create_ingested_meeting(title, file_path, start_time=None):
+    """Create the Meeting row for an uploaded or imported recording"""
+    session = get_db_session()
+    meeting = Meeting(title=title, start_time=start_time or datetime.utcnow())
+    duration = _audio_duration_seconds(file_path)
+    if duration is not None:
+        meeting.end_time = meeting.start_time + timedelta(seconds=duration)
+    session.add(meeting)
+    session.commit()
+    return meeting.id
+
+
+@app.route('/api/meetings/upload', methods=['POST'])
+def upload_meeting_audio():
+    """Upload a recording and run the meeting pipeline on it
+    
+    Expects multipart/form-data with a 'file' field and optional 'title'
+    and 'participants' fields, plus 'language' ('auto' to detect) and
+    'decode_profile' (fast, balanced or accurate). The file part is streamed straight to disk,
+    never held in memory, and the request is rejected once it exceeds
+    MAX_FILE_SIZE_MB.
+    """
+    upload_path = Config.AUDIO_DIR / f"upload_{uuid.uuid4().hex}.part"
+    upload_handle = {}
+    
+    def stream_to_disk(total_content_length, content_type, filename, content_length=None):
+        # Only one file part is accepted; anything else is an error below
+        if upload_handle:
+            raise ValueError("Only one file can be uploaded per request")
+        upload_handle['name'] = filename
+        upload_handle['file'] = open(upload_path, 'wb+')
+        return upload_handle['file']
+    
+    max_bytes = Config.MAX_FILE_SIZE_MB * 1024 * 1024
+    try:
+        _, form, files = parse_form_data(
+            request.environ,
+            stream_factory=stream_to_disk,
+            max_content_length=max_bytes,
+            silent=False
+        )
+    except RequestEntityTooLarge:
+        upload_path.unlink(missing_ok=True)
+        return jsonify({"error": f"File exceeds {Config.MAX_FILE_SIZE_MB} MB limit"}), 413
+    except ValueError as e:
+        upload_path.unlink(missing_ok=True)
+        return jsonify({"error": str(e)}), 400
+    finally:
+        if 'file' in upload_handle:
+            upload_handle['file'].close()
+    
+    original_name = upload_handle.get('name') or ''
+    extension = Path(original_name).suffix.lower()
+    if 'file' not in files or not upload_path.exists():
+        upload_path.unlink(missing_ok=True)
+        return jsonify({"error": "No file provided"}), 400
+    if extension not in UPLOAD_EXTENSIONS:
+        upload_path.unlink(missing_ok=True)
+        return jsonify({"error": f"Unsupported audio format: {extension or 'unknown'}"}), 400
+    
+    language = form.get('language', '').strip() or None
+    decode_profile = form.get('decode_profile', '').strip() or None
+    if decode_profile and decode_profile not in DECODE_PROFILES:
+        upload_path.unlink(missing_ok=True)
+        return jsonify({"error": f"Unknown decode profile: {decode_profile}"}), 400
+    
+    title = form.get('title', '').strip() or Path(original_name).stem
+    meeting_id = _create_ingested_meeting(title, upload_path)
+    if language or decode_profile:
+        transcription_agent.set_meeting_options(meeting_id, language, decode_profile)
+    
+    session = get_db_session()
+    participant_names = [name.strip() for name in form.get('participants', '').split(',') if name.strip()]
+    for name in participant_names:
+        session.add(Participant(meeting_id=meeting_id, name=name))
+    session.commit()
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    audio_file = Config.AUDIO_DIR / f"meeting_{meeting_id}_{timestamp}{extension}"
+    upload_path.rename(audio_file)
+    
+    _enqueue_meeting_processing(meeting_id, str(audio_file))
+    return jsonify({"success": True, "meeting_id": meeting_id, "status": "queued"}), 202
+
+
+@app.route('/api/meetings/import', methods=['POST'])
+def import_meeting_directory():
+    """Bulk-import archived recordings from a directory on the server
+    
+    Body: {"directory": "...", "recursive": false}. The directory must lie
+    under IMPORT_ROOT (relative paths are taken from there). Each audio file
+    not imported before gets its own Meeting (titled after the file, dated
+    by its modification time) and is queued; the copy into the audio
+    directory happens in the background job, and MAX_CONCURRENT_PROCESSING
+    meetings are processed in parallel.
+    """
+    data = request.get_json() or {}
+    if not data.get('directory'):
+        return jsonify({"error": "Directory not found"}), 400
+    import_root = Config.IMPORT_ROOT.resolve()
+    directory = (import_root / Path(data['directory']).expanduser()).resolve()
+    if not directory.is_relative_to(import_root):
+        return jsonify({"error": f"Directory must be inside {import_root}"}), 403
+    if not directory.is_dir():
+        return jsonify({"error": "Directory not found"}), 400
+    
+    pattern = '**/*' if data.get('recursive') else '*'
+    sources = sorted(
+        path.resolve() for path in directory.glob(pattern)
+        if path.is_file() and path.suffix.lower() in UPLOAD_EXTENSIONS
+    )
+    
+    session = get_db_session()
+    imported = []
+    skipped = []
+    errors = []
+    for source in sources:
+        try:
+            if not source.is_relative_to(import_root):
+                raise ValueError("links outside the import root are not followed")
+            stat = source.stat()
+            record = session.query(ImportedRecording).filter_by(source_path=str(source)).first()
+            if record and record.size == stat.st_size and record.modified_at == stat.st_mtime:
+                skipped.append({"meeting_id": record.meeting_id, "file": str(source)})
+                continue
+            
+            start_time = datetime.utcfromtimestamp(stat.st_mtime)
+            meeting_id = _create_ingested_meeting(source.stem, source, start_time=start_time)
+            if record is None:
+                record = ImportedRecording(source_path=str(source))
+                session.add(record)
+            # A file changed since its last import is imported again
+            record.size = stat.st_size
+            record.modified_at = stat.st_mtime
+            record.meeting_id = meeting_id
+            session.commit()
+            
+            audio_file = Config.AUDIO_DIR / f"meeting_{meeting_id}_import{source.suffix.lower()}"
+            _enqueue_meeting_processing(meeting_id, str(audio_file), source=str(source))
+            imported.append({"meeting_id": meeting_id, "file": str(source)})
+        except Exception as e:
+            session.rollback()
+            errors.append(f"{source}: {str(e)}")
+    
+    return jsonify({
+        "success": True,
+        "queued_count": len(imported),
+        "meetings": imported,
+        "skipped": skipped,
+        "errors": errors
+    }), 202
+
+
+@app.route('/api/meetings/import/status', methods=['GET'])
+def import_status():
+    """Progress of uploaded and imported recordings"""
+    with ingestion_lock:
+        return jsonify(dict(ingestion_stats))
+
+
 # ============ GOOGLE CALENDAR SYNC ENDPOINTS ============
 
 @app.route('/api/google/available', methods=['GET'])
@@ -522,6 +889,10 @@ def start_recording(data):
     print(f"[DEBUG] Received start_recording event with data: {data}")
     meeting_title = data.get('title', 'Untitled Meeting')
     participants_str = data.get('participants', '')
+    decode_profile = data.get('decode_profile') or None
+    if decode_profile and decode_profile not in DECODE_PROFILES:
+        emit('error', {'message': f'Unknown decode profile: {decode_profile}'})
+        return
     
     # Create meeting in database
     session = get_db_session()
@@ -540,6 +911,10 @@ def start_recording(data):
         session.commit()
         print(f"[DEBUG] Added {len(participant_names)} participants to meeting {meeting_id}")
     
+    # Pin the language up front when the client knows it; otherwise it is
+    # detected on the first speech and kept for the rest of the meeting
+    transcription_agent.set_meeting_options(meeting_id, data.get('language'), decode_profile)
+    
     # Store active meeting
     active_meetings[meeting_id] = {
         'meeting': meeting,
@@ -547,8 +922,18 @@ def start_recording(data):
         'transcripts': []
     }
     
-    # Start audio capture
-    audio_agent.start_recording(meeting_id)
+    # Start audio capture on the requested input device (default if omitted)
+    device = data.get('device')
+    if isinstance(device, str) and device.isdigit():
+        device = int(device)
+    try:
+        audio_agent.start_recording(meeting_id, device=device)
+    except Exception as e:
+        print(f"[ERROR] Could not start recording for meeting {meeting_id}: {e}")
+        del active_meetings[meeting_id]
+        transcription_agent.forget_meeting(meeting_id)
+        emit('error', {'message': f'Could not start recording: {e}'})
+        return
     
     emit('recording_started', {'meeting_id': meeting_id, 'title': meeting_title})
 
@@ -567,31 +952,92 @@ def stop_recording(data):
     print(f"[DEBUG] Stopping recording for meeting {meeting_id}")
     # Stop audio capture
     audio_file = audio_agent.stop_recording(meeting_id)
+    live_transcript = audio_agent.take_live_transcript(meeting_id)
     
     # Process the meeting
-    emit('processing_status', {'status': 'transcribing', 'progress': 10})
-    
-    # Transcribe audio
-    transcript = transcription_agent.transcribe(audio_file, meeting_id)
+    transcript, summary, action_items = process_meeting_audio(
+        meeting_id, audio_file, emit, live_transcript=live_transcript
+    )
     active_meetings[meeting_id]['transcripts'].append(transcript)
     
-    emit('processing_status', {'status': 'summarizing', 'progress': 40})
+    # Clean up
+    del active_meetings[meeting_id]
+
+
+def process_meeting_audio(meeting_id, audio_file, notify, live_transcript=None):
+    """Transcribe, summarize and extract action items for a meeting recording
     
-    # Generate summary
-    summary = summarizer_agent.summarize(transcript)
+    Args:
+        meeting_id: Meeting the recording belongs to
+        audio_file: Path to the recording
+        notify: Callable(event, payload) used to report progress to clients
+        live_transcript: LiveTranscript collected while recording; when given,
+            only the regions it could not vouch for are transcribed again
     
-    emit('processing_status', {'status': 'extracting_actions', 'progress': 70})
+    Returns:
+        (transcript, summary, action_items)
+    """
+    notify('processing_status', {'meeting_id': meeting_id, 'status': 'transcribing', 'progress': 10})
     
-    # Extract action items
-    action_items = action_item_agent.extract(transcript, summary)
+    # Find speakers while the audio is transcribed
+    diarization_future = None
+    if Config.ENABLE_SPEAKER_DIARIZATION:
+        diarization_future = background_executor.submit(diarize, audio_file)
     
-    # Save to database
+    # Transcribe audio
+    transcript = None
+    if live_transcript is not None:
+        transcript = live_transcript.finalize(audio_file, transcription_agent)
+    if transcript is None:
+        transcript = transcription_agent.transcribe(audio_file, meeting_id)
+    
+    if diarization_future is not None:
+        try:
+            label_segments(transcript.get('segments'), diarization_future.result())
+        except Exception as e:
+            print(f"WARNING: Speaker diarization failed: {e}")
+    
+    # Compress the recording while the summary is generated
+    archive_future = background_executor.submit(
+        archive_recording, audio_file, Config.AUDIO_ARCHIVE_FORMAT
+    )
+    
+    notify('processing_status', {'meeting_id': meeting_id, 'status': 'summarizing', 'progress': 40})
+    
+    # The summary is streamed to clients as it is written
+    stream_summary = lambda delta: notify('summary_delta', {'meeting_id': meeting_id, 'delta': delta})
     session = get_db_session()
     meeting = session.query(Meeting).filter_by(id=meeting_id).first()
+    
+    if Config.ANALYSIS_MODE == 'combined' and meeting_analysis_agent.is_available():
+        # Summary and action items from one structured call
+        summary, action_items = meeting_analysis_agent.analyze(transcript, on_delta=stream_summary)
+        meeting.summary = summary
+        session.commit()
+    else:
+        summary = summarizer_agent.summarize(transcript, on_delta=stream_summary)
+        
+        # Persist it now so clients that reload during extraction already see it
+        meeting.summary = summary
+        session.commit()
+        
+        notify('processing_status', {'meeting_id': meeting_id, 'status': 'extracting_actions', 'progress': 70})
+        
+        # Extract action items
+        action_items = action_item_agent.extract(transcript, summary)
+    
+    # Save to database
     # Convert transcript dict to JSON string for SQLite storage
     meeting.transcript = json.dumps(transcript) if isinstance(transcript, dict) else transcript
-    meeting.summary = summary
-    meeting.end_meeting()
+    if isinstance(transcript, dict):
+        _store_transcript_segments(session, meeting_id, transcript)
+    archived_file = archive_future.result()
+    if archived_file:
+        meeting.audio_file_path = f"/data/audio/{Path(archived_file).name}"
+        if archived_file != audio_file:
+            transcription_agent.remember(archived_file, transcript, meeting_id)
+    if not meeting.end_time:
+        meeting.end_meeting()
     
     for item_data in action_items:
         action_item = ActionItem(
@@ -604,16 +1050,59 @@ def stop_recording(data):
         session.add(action_item)
     
     session.commit()
+    transcription_agent.forget_meeting(meeting_id)
     
-    emit('processing_status', {'status': 'complete', 'progress': 100})
-    emit('meeting_processed', {
+    notify('processing_status', {'meeting_id': meeting_id, 'status': 'complete', 'progress': 100})
+    notify('meeting_processed', {
         'meeting_id': meeting_id,
         'summary': summary,
         'action_items': action_items
     })
     
-    # Clean up
-    del active_meetings[meeting_id]
+    return transcript, summary, action_items
+
+
+def _process_meeting_in_background(meeting_id, audio_file, source=None):
+    """Run the meeting pipeline on a worker thread, broadcasting progress
+    
+    source is an imported recording, copied to audio_file first; the
+    archiving step replaces audio_file, so the original is left untouched.
+    """
+    with ingestion_lock:
+        ingestion_stats['queued'] -= 1
+        ingestion_stats['processing'] += 1
+    try:
+        if source:
+            try:
+                shutil.copyfile(source, audio_file)
+            except Exception:
+                # Let a later import pick the file up again
+                session = get_db_session()
+                session.query(ImportedRecording).filter_by(source_path=source).delete()
+                session.commit()
+                raise
+        process_meeting_audio(meeting_id, audio_file, socketio.emit)
+        outcome = 'completed'
+    except Exception as e:
+        print(f"[INGEST] Error processing meeting {meeting_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        socketio.emit('error', {'meeting_id': meeting_id, 'message': f'Processing failed: {e}'})
+        outcome = 'failed'
+    finally:
+        transcription_agent.forget_meeting(meeting_id)
+        close_db_session()
+    
+    with ingestion_lock:
+        ingestion_stats['processing'] -= 1
+        ingestion_stats[outcome] += 1
+
+
+def _enqueue_meeting_processing(meeting_id, audio_file, source=None):
+    """Queue an ingested recording for the transcribe/summarize/extract pipeline"""
+    with ingestion_lock:
+        ingestion_stats['queued'] += 1
+    processing_executor.submit(_process_meeting_in_background, meeting_id, audio_file, source)
 
 
 # Handle audio chunks for live transcription
@@ -628,7 +1117,7 @@ def handle_audio_chunk(data):
     try:
         # Transcribe the chunk
         print(f"[LIVE] Starting transcription...")
-        transcript_result = transcription_agent.transcribe(chunk_file)
+        transcript_result = transcription_agent.transcribe(chunk_file, meeting_id)
         
         if transcript_result and transcript_result.get('text'):
             chunk_text = transcript_result['text'].strip()
@@ -675,6 +1164,7 @@ def handle_sync_action_items(data):
 
 
 if __name__ == '__main__':
+    init_app()
     port = int(os.getenv('FLASK_PORT', 5000))
     host = os.getenv('FLASK_HOST', 'localhost')
     
@@ -0,0 +1,94 @@
+"""
+Audio archive
+Compresses finished recordings and decodes time windows for playback
+"""
+import io
+import os
+from pathlib import Path
+import soundfile as sf
+
+# Output settings per archive format: (extension, libsndfile format, subtype)
+ARCHIVE_FORMATS = {
+    'flac': ('flac', 'FLAC', None),
+    'opus': ('ogg', 'OGG', 'OPUS'),
+}
+
+# Sample rates the Opus encoder accepts
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+MIME_TYPES = {
+    '.wav': 'audio/wav',
+    '.flac': 'audio/flac',
+    '.ogg': 'audio/ogg',
+    '.opus': 'audio/ogg',
+}
+
+
+def get_mime_type(filename):
+    """MIME type for an archived recording"""
+    return MIME_TYPES.get(Path(filename).suffix.lower(), 'application/octet-stream')
+
+
+def archive_recording(filepath, archive_format, block_seconds=30):
+    """Re-encode a recording into a compressed archive format.
+
+    The file is converted block by block, so memory stays flat regardless of
+    meeting length. On success the original file is removed and the new path
+    is returned; when the format is 'none', already matches, or encoding
+    fails, the original path is returned unchanged.
+    """
+    archive_format = (archive_format or 'none').lower()
+    if archive_format == 'none' or not filepath:
+        return filepath
+    if archive_format not in ARCHIVE_FORMATS:
+        print(f"WARNING: Unknown audio archive format '{archive_format}', keeping {filepath}")
+        return filepath
+
+    extension, major_format, subtype = ARCHIVE_FORMATS[archive_format]
+    source = Path(filepath)
+    if source.suffix.lower() == f".{extension}":
+        return filepath
+    target = source.with_suffix(f".{extension}")
+
+    try:
+        info = sf.info(str(source))
+        if archive_format == 'opus' and info.samplerate not in OPUS_SAMPLE_RATES:
+            print(f"WARNING: Opus cannot encode {info.samplerate} Hz audio, keeping {filepath}")
+            return filepath
+
+        block_frames = int(info.samplerate * block_seconds)
+        with sf.SoundFile(str(target), mode='w', samplerate=info.samplerate,
+                          channels=info.channels, format=major_format,
+                          subtype=subtype) as archive:
+            for block in sf.blocks(str(source), blocksize=block_frames, dtype='float32'):
+                archive.write(block)
+    except Exception as e:
+        print(f"Error archiving {filepath}: {e}")
+        if target.exists():
+            target.unlink()
+        return filepath
+
+    original_size = source.stat().st_size
+    archived_size = target.stat().st_size
+    os.remove(str(source))
+    print(f"Archived {source.name} -> {target.name} "
+          f"({original_size / (1024 * 1024):.1f} MB -> {archived_size / (1024 * 1024):.1f} MB)")
+    return str(target)
+
+
+def read_time_range(filepath, start=0.0, end=None):
+    """Decode only [start, end) seconds of a recording into WAV bytes"""
+    with sf.SoundFile(str(filepath)) as audio:
+        start_frame = max(0, int(start * audio.samplerate))
+        end_frame = audio.frames if end is None else min(audio.frames, int(end * audio.samplerate))
+        if start_frame >= end_frame:
+            raise ValueError("Requested time range is empty")
+
+        audio.seek(start_frame)
+        window = audio.read(end_frame - start_frame, dtype='float32')
+        samplerate = audio.samplerate
+
+    output = io.BytesIO()
+    sf.write(output, window, samplerate, format='WAV', subtype='PCM_16')
+    output.seek(0)
+    return output
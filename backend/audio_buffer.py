@@ -0,0 +1,127 @@
+"""
+Audio ring buffer
+Fixed-capacity, preallocated sample storage shared by the capture callback
+and its consumers (live transcription, archiver)
+"""
+import threading
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Preallocated float32 ring buffer with independent named read cursors.
+
+    The capture callback is the single writer; every consumer registers a
+    cursor and drains at its own pace. Positions are absolute frame counts,
+    so a reader that falls more than ``capacity`` frames behind is moved
+    forward to the oldest retained frame and the skipped frames are counted
+    in ``dropped_frames``.
+
+    Writes and reads take no lock: the writer copies samples before
+    publishing the new write position, and each cursor is only advanced by
+    its own consumer, so the real-time callback never waits on a reader.
+    The lock only guards registering and removing readers.
+    """
+
+    def __init__(self, capacity_frames, channels=1, dtype=np.float32):
+        if capacity_frames <= 0:
+            raise ValueError("capacity_frames must be positive")
+
+        self.capacity = int(capacity_frames)
+        self.channels = channels
+        self._data = np.zeros((self.capacity, channels), dtype=dtype)
+        self._write_pos = 0
+        self._cursors = {}
+        self._dropped = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """Bytes held by the preallocated storage"""
+        return self._data.nbytes
+
+    @property
+    def frames_written(self):
+        """Total frames written since creation"""
+        return self._write_pos
+
+    def add_reader(self, name):
+        """Register a read cursor starting at the current write position"""
+        with self._lock:
+            self._cursors[name] = self._write_pos
+            self._dropped[name] = 0
+
+    def remove_reader(self, name):
+        """Unregister a read cursor"""
+        with self._lock:
+            self._cursors.pop(name, None)
+            self._dropped.pop(name, None)
+
+    def write(self, frames):
+        """Copy frames into the buffer; called from the audio callback"""
+        frames = frames.reshape(len(frames), self.channels)
+        count = len(frames)
+        if count == 0:
+            return 0
+
+        # Anything larger than the ring only keeps its newest tail
+        if count > self.capacity:
+            frames = frames[-self.capacity:]
+            skipped = count - self.capacity
+        else:
+            skipped = 0
+        n = len(frames)
+
+        start = (self._write_pos + skipped) % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = frames[:first]
+        if first < n:
+            self._data[:n - first] = frames[first:]
+        # Publish only after the samples are in place
+        self._write_pos += count
+
+        return count
+
+    def available(self, name):
+        """Number of unread frames for a reader"""
+        return min(self._write_pos - self._cursors[name], self.capacity)
+
+    def dropped_frames(self, name):
+        """Frames a reader lost because the writer lapped it"""
+        return self._dropped.get(name, 0)
+
+    def read_views(self, name, max_frames=None):
+        """Consume unread frames for a reader without copying.
+
+        Returns up to two array views into the ring (two when the unread
+        region wraps). The views are only valid until the writer laps them,
+        so consume them promptly.
+        """
+        write_pos = self._write_pos
+        cursor = self._cursors[name]
+        lag = write_pos - cursor
+        if lag > self.capacity:
+            self._dropped[name] += lag - self.capacity
+            cursor = write_pos - self.capacity
+            lag = self.capacity
+
+        count = lag if max_frames is None else min(lag, max_frames)
+        self._cursors[name] = cursor + count
+
+        if count == 0:
+            return []
+
+        start = cursor % self.capacity
+        first = min(count, self.capacity - start)
+        views = [self._data[start:start + first]]
+        if first < count:
+            views.append(self._data[:count - first])
+        return views
+
+    def read(self, name, max_frames=None):
+        """Consume unread frames for a reader as one contiguous copy"""
+        views = self.read_views(name, max_frames)
+        if not views:
+            return np.empty((0, self.channels), dtype=self._data.dtype)
+        if len(views) == 1:
+            return views[0].copy()
+        return np.concatenate(views, axis=0)
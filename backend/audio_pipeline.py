@@ -0,0 +1,147 @@
+"""
+Audio pipeline
+Converts captured audio once into the canonical 16 kHz mono float32 stream
+that every consumer (VAD, live chunks, recording file, final transcription) reads
+"""
+import threading
+from math import gcd
+import numpy as np
+
+# Whisper, the VAD and the API backends all work on 16 kHz mono audio
+CANONICAL_SAMPLE_RATE = 16000
+
+
+def downmix(frames):
+    """Average a (frames, channels) array to mono float32"""
+    if frames.ndim == 1:
+        return frames.astype(np.float32, copy=False)
+    if frames.shape[1] == 1:
+        return frames[:, 0].astype(np.float32, copy=False)
+    return frames.mean(axis=1, dtype=np.float32)
+
+
+class PolyphaseResampler:
+    """Streaming rational resampler (windowed-sinc polyphase FIR, numpy only).
+
+    The prototype low-pass filter spans ``zero_crossings`` sinc lobes at
+    the lower of the two rates and is split into ``up`` phases. Each output
+    sample needs one phase dotted with the most recent input samples,
+    computed for a whole block at once with a gather and an einsum. Input history is carried between calls, so
+    feeding a stream in arbitrary block sizes gives the same output as
+    resampling it in one go.
+    """
+
+    def __init__(self, in_rate, out_rate=CANONICAL_SAMPLE_RATE, zero_crossings=16):
+        divisor = gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // divisor
+        self.down = self.in_rate // divisor
+        self.passthrough = self.up == self.down
+        # Enough taps per phase to cover the sinc lobes at the slower rate
+        self.taps = -(-zero_crossings * max(self.up, self.down) // self.up)
+
+        # Low-pass just below the lower of the two Nyquist rates, at the upsampled rate
+        length = self.taps * self.up
+        cutoff = 0.475 / max(self.up, self.down)
+        t = np.arange(length) - (length - 1) / 2.0
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, 6.0)
+        prototype *= self.up / prototype.sum()
+        # phases[p, k] = prototype[p + k * up]
+        self._phases = prototype.reshape(self.taps, self.up).T.astype(np.float32)
+        self._tap_offsets = np.arange(self.taps)
+
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._history_start = -(self.taps - 1)
+        self._next_output = 0
+
+    def process(self, samples):
+        """Resample the next block of a mono stream"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if self.passthrough:
+            return samples
+
+        buffer = np.concatenate([self._history, samples])
+        last_index = self._history_start + len(buffer) - 1
+        last_output = ((last_index + 1) * self.up - 1) // self.down
+
+        if last_output < self._next_output:
+            self._history = buffer
+            return np.empty(0, dtype=np.float32)
+
+        outputs = np.arange(self._next_output, last_output + 1)
+        upsampled = outputs * self.down
+        phase = upsampled % self.up
+        base = upsampled // self.up - self._history_start
+        window = buffer[base[:, None] - self._tap_offsets[None, :]]
+        resampled = np.einsum('nk,nk->n', self._phases[phase], window)
+
+        # Keep just enough input for the next output's filter taps
+        self._next_output = last_output + 1
+        next_base = (self._next_output * self.down) // self.up
+        keep_from = next_base - (self.taps - 1) - self._history_start
+        self._history = buffer[keep_from:]
+        self._history_start += keep_from
+
+        return resampled.astype(np.float32, copy=False)
+
+
+def to_canonical(audio, sample_rate):
+    """One-shot conversion of an in-memory clip to 16 kHz mono float32"""
+    mono = downmix(np.asarray(audio))
+    if sample_rate == CANONICAL_SAMPLE_RATE:
+        return np.ascontiguousarray(mono)
+    return PolyphaseResampler(sample_rate).process(mono)
+
+
+class CanonicalAudioStage:
+    """Background thread that turns native-rate capture into the canonical stream.
+
+    Drains ``reader`` from the capture ring buffer (device rate and channel
+    count), downmixes and resamples each block exactly once, and writes the
+    result into ``output``, the ring buffer all consumers read from. Kept
+    off the PortAudio callback so capture itself stays allocation-free.
+    ``on_audio``, if set, also receives every converted block, e.g. to
+    stream it to a live transcription service.
+    """
+
+    def __init__(self, capture_buffer, reader, capture_rate, output, poll_interval=0.05,
+                 on_audio=None):
+        self.capture_buffer = capture_buffer
+        self.reader = reader
+        self.output = output
+        self.poll_interval = poll_interval
+        self.on_audio = on_audio
+        self.resampler = PolyphaseResampler(capture_rate)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Start converting in the background"""
+        self._thread.start()
+
+    def _convert_pending(self):
+        for view in self.capture_buffer.read_views(self.reader):
+            converted = self.resampler.process(downmix(view))
+            if len(converted):
+                self.output.write(converted)
+                if self.on_audio:
+                    try:
+                        self.on_audio(converted)
+                    except Exception as e:
+                        # A failing consumer must not stop the recording
+                        print(f"Error forwarding converted audio: {e}")
+                        self.on_audio = None
+
+    def _run(self):
+        try:
+            while not self._stop_event.wait(self.poll_interval):
+                self._convert_pending()
+            self._convert_pending()
+        except Exception as e:
+            print(f"Error converting captured audio: {e}")
+
+    def stop(self):
+        """Convert whatever is left and stop the thread"""
+        self._stop_event.set()
+        self._thread.join()
@@ -0,0 +1,88 @@
+"""
+Streaming audio writer
+Drains a capture ring buffer into an open sound file while recording
+"""
+import os
+import threading
+import time
+import soundfile as sf
+
+
+class StreamingAudioWriter:
+    """Background thread that appends captured frames to disk as they arrive.
+
+    The file stays open for the whole recording and is flushed every
+    ``sync_interval`` seconds; libsndfile rewrites the WAV header and syncs
+    the descriptor on flush, so a crash leaves a playable file holding
+    everything up to the last sync. Only WAV is crash-safe: an unfinished
+    FLAC file has no valid length in its header and libsndfile cannot read
+    it back.
+    """
+
+    FORMATS = {'wav': 'WAV', 'flac': 'FLAC'}
+
+    def __init__(self, buffer, reader, filepath, samplerate, channels,
+                 audio_format='wav', sync_interval=5.0, poll_interval=0.25):
+        audio_format = audio_format.lower()
+        if audio_format not in self.FORMATS:
+            raise ValueError(f"Unsupported streaming audio format: {audio_format}")
+        if audio_format != 'wav':
+            print(f"WARNING: Recording to {audio_format.upper()}; a crash during recording "
+                  f"leaves {filepath} unreadable. Use AUDIO_FORMAT=wav for crash-safe recording")
+
+        self.buffer = buffer
+        self.reader = reader
+        self.filepath = str(filepath)
+        self.sync_interval = sync_interval
+        self.poll_interval = poll_interval
+        self.frames_written = 0
+
+        self._file = sf.SoundFile(
+            self.filepath,
+            mode='w',
+            samplerate=samplerate,
+            channels=channels,
+            format=self.FORMATS[audio_format]
+        )
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Start draining the buffer in the background"""
+        self._thread.start()
+
+    def _drain(self):
+        """Append everything the reader has not consumed yet"""
+        for view in self.buffer.read_views(self.reader):
+            self._file.write(view)
+            self.frames_written += len(view)
+
+    def _run(self):
+        last_sync = time.monotonic()
+        try:
+            while not self._stop_event.wait(self.poll_interval):
+                self._drain()
+                if time.monotonic() - last_sync >= self.sync_interval:
+                    self._file.flush()
+                    last_sync = time.monotonic()
+            self._drain()
+        except Exception as e:
+            print(f"Error writing audio to {self.filepath}: {e}")
+        finally:
+            self._file.close()
+
+    def stop(self):
+        """Write the remaining frames, finalize the header and close the file.
+
+        Only the last poll interval of audio is left to write, so this
+        returns in constant time regardless of recording length. Returns the
+        file path, or None (and removes the file) when nothing was captured.
+        """
+        self._stop_event.set()
+        self._thread.join()
+
+        if self.frames_written == 0:
+            if os.path.exists(self.filepath):
+                os.remove(self.filepath)
+            return None
+        return self.filepath
@@ -0,0 +1,330 @@
+"""
+Transcription benchmark
+Runs fixed audio fixtures through each available transcription backend and
+reports real-time factor, per-chunk latency, peak memory and word error rate
+
+Usage (from the backend directory):
+    python benchmark.py
+    python benchmark.py --backends whisper,faster-whisper --whisper-sizes tiny,base
+    python benchmark.py --output ../bench/v1.2.json
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+from config import Config
+from audio_pipeline import CANONICAL_SAMPLE_RATE, to_canonical
+
+FIXTURES_DIR = Path(__file__).parent / 'benchmark_fixtures'
+BACKENDS = ('whisper', 'faster-whisper', 'fallback', 'deepgram', 'assemblyai')
+
+
+def synthesize_fixture(kind, seconds, seed=0):
+    """Deterministic synthetic audio at 16 kHz.
+
+    - ``silence``: near-silent room noise
+    - ``noise``: broadband noise at speech level
+    - ``voiced``: harmonic bursts at syllable rate with pauses, shaped like
+      speech but without words, so any transcript is hallucinated
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * CANONICAL_SAMPLE_RATE)
+    t = np.arange(n) / CANONICAL_SAMPLE_RATE
+    if kind == 'silence':
+        audio = 0.001 * rng.standard_normal(n)
+    elif kind == 'noise':
+        audio = 0.1 * rng.standard_normal(n)
+    elif kind == 'voiced':
+        pitch = 140.0 * (1 + 0.1 * np.sin(2 * np.pi * 0.3 * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / CANONICAL_SAMPLE_RATE
+        harmonics = sum(np.sin(k * phase) / k for k in range(1, 12))
+        syllables = np.sin(2 * np.pi * 4 * t) > -0.2
+        phrases = np.sin(2 * np.pi * 0.15 * t + rng.uniform(0, np.pi)) > -0.5
+        audio = 0.2 * harmonics * syllables * phrases + 0.002 * rng.standard_normal(n)
+    else:
+        raise ValueError(f"Unknown synthetic fixture kind: {kind}")
+    return audio.astype(np.float32)
+
+
+def load_fixtures(work_dir, fixtures_dir=FIXTURES_DIR):
+    """Fixture files and reference texts listed in the manifest.
+
+    Synthetic fixtures are written to ``work_dir``; recorded clips are read
+    from the fixtures directory. Returns a list of
+    {'name', 'file', 'duration', 'reference'}.
+    """
+    with open(fixtures_dir / 'manifest.json') as f:
+        manifest = json.load(f)
+
+    fixtures = []
+    for index, entry in enumerate(manifest.get('synthetic', [])):
+        path = Path(work_dir) / f"{entry['name']}.wav"
+        audio = synthesize_fixture(entry['kind'], entry['seconds'], seed=index)
+        sf.write(str(path), audio, CANONICAL_SAMPLE_RATE, subtype='PCM_16')
+        fixtures.append({'name': entry['name'], 'file': str(path), 'reference': ''})
+    for entry in manifest.get('clips', []):
+        fixtures.append({
+            'name': entry['name'],
+            'file': str(fixtures_dir / entry['file']),
+            'reference': entry.get('reference', '')
+        })
+
+    for fixture in fixtures:
+        fixture['duration'] = round(sf.info(fixture['file']).duration, 3)
+    return fixtures
+
+
+def _words(text):
+    """Lowercase words without punctuation, for scoring"""
+    return re.sub(r"[^\w\s']", ' ', (text or '').lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """(WER, reference word count, hypothesis word count); WER is None without a reference"""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return None, 0, len(hyp)
+    # Levenshtein distance over words, one row at a time
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return round(float(previous[-1]) / len(ref), 4), len(ref), len(hyp)
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 4) if values else None
+
+
+class _PeakRssSampler:
+    """Polls this process's resident memory and keeps the maximum"""
+
+    def __init__(self, interval=0.02):
+        from model_registry import _process_rss_mb
+        self._read = _process_rss_mb
+        self.interval = interval
+        self.baseline_mb = self._read()
+        self.peak_mb = self.baseline_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, self._read())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self._read())
+
+
+def _unavailable_reason(backend, module):
+    if backend == 'whisper' and not module.WHISPER_AVAILABLE:
+        return 'openai-whisper not installed'
+    if backend == 'faster-whisper' and not module.FASTER_WHISPER_AVAILABLE:
+        return 'faster-whisper not installed'
+    if backend == 'deepgram' and not Config.DEEPGRAM_API_KEY:
+        return 'DEEPGRAM_API_KEY not set'
+    if backend == 'assemblyai':
+        if not Config.ASSEMBLYAI_API_KEY:
+            return 'ASSEMBLYAI_API_KEY not set'
+        try:
+            import assemblyai  # noqa: F401
+        except ImportError:
+            return 'assemblyai not installed'
+    return None
+
+
+def run_backend(backend, model_size, fixtures, chunk_seconds):
+    """Benchmark one backend over every fixture; runs in its own process"""
+    # Measure transcription itself: no cache hits, no parallel segmenting
+    Config.TRANSCRIPTION_MODEL = 'whisper' if backend == 'fallback' else backend
+    Config.ENABLE_CACHING = False
+    Config.LONG_AUDIO_WORKERS = 1
+    if model_size:
+        Config.WHISPER_MODEL_SIZE = model_size
+
+    import agents.transcription as transcription
+    reason = _unavailable_reason(backend, transcription)
+    if reason:
+        return {'backend': backend, 'model': model_size, 'skipped': reason}
+
+    with _PeakRssSampler() as memory:
+        agent = transcription.TranscriptionAgent()
+        if backend == 'fallback':
+            # The placeholder path taken when no model can load
+            agent.whisper_model = None
+
+        load_seconds = 0.0
+        if agent.whisper_model is not None:
+            started = time.perf_counter()
+            agent.whisper_model.load()
+            load_seconds = time.perf_counter() - started
+            # First inference pays for kernel and thread pool setup
+            agent.transcribe(np.zeros(CANONICAL_SAMPLE_RATE, dtype=np.float32),
+                             sample_rate=CANONICAL_SAMPLE_RATE)
+
+        results = []
+        for fixture in fixtures:
+            started = time.perf_counter()
+            result = agent.transcribe(fixture['file'])
+            file_seconds = time.perf_counter() - started
+
+            audio, sample_rate = sf.read(fixture['file'], dtype='float32')
+            audio = to_canonical(audio, sample_rate)
+            step = int(chunk_seconds * CANONICAL_SAMPLE_RATE)
+            latencies = []
+            for offset in range(0, len(audio), step):
+                chunk = audio[offset:offset + step]
+                started = time.perf_counter()
+                agent.transcribe(chunk, sample_rate=CANONICAL_SAMPLE_RATE)
+                latencies.append(time.perf_counter() - started)
+
+            wer, reference_words, hypothesis_words = word_error_rate(fixture['reference'],
+                                                                     result.get('text', ''))
+            results.append({
+                'fixture': fixture['name'],
+                'duration': fixture['duration'],
+                'fallback': isinstance(result, transcription.FallbackTranscript),
+                'file_seconds': round(file_seconds, 4),
+                'rtf': round(file_seconds / fixture['duration'], 4),
+                'chunks': len(latencies),
+                'chunk_p50_seconds': _percentile(latencies, 50),
+                'chunk_p95_seconds': _percentile(latencies, 95),
+                'chunk_rtf': round(sum(latencies) / fixture['duration'], 4),
+                'wer': wer,
+                'reference_words': reference_words,
+                'hypothesis_words': hypothesis_words
+            })
+
+    total_duration = sum(r['duration'] for r in results)
+    scored = [r for r in results if r['wer'] is not None]
+    return {
+        'backend': backend,
+        'model': model_size,
+        'load_seconds': round(load_seconds, 3),
+        'baseline_rss_mb': memory.baseline_mb,
+        'peak_rss_mb': memory.peak_mb,
+        'rtf': round(sum(r['file_seconds'] for r in results) / total_duration, 4),
+        'chunk_rtf': round(sum(r['chunk_rtf'] * r['duration'] for r in results) / total_duration, 4),
+        # Weighted by reference length, like a WER over the concatenated clips
+        'wer': (round(sum(r['wer'] * r['reference_words'] for r in scored) /
+                      sum(r['reference_words'] for r in scored), 4) if scored else None),
+        'fixtures': results
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmark(backends, whisper_sizes, chunk_seconds):
+    """Benchmark every requested backend, each in a fresh process"""
+    runs = []
+    for backend in backends:
+        sizes = whisper_sizes if backend in ('whisper', 'faster-whisper') else [None]
+        runs.extend((backend, size) for size in sizes)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        fixtures = load_fixtures(work_dir)
+        results = []
+        for backend, size in runs:
+            label = f"{backend} ({size})" if size else backend
+            print(f"Benchmarking {label} on {len(fixtures)} fixtures...")
+            # A fresh process per run isolates peak memory and loaded models
+            with ProcessPoolExecutor(max_workers=1,
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                try:
+                    results.append(executor.submit(run_backend, backend, size, fixtures,
+                                                   chunk_seconds).result())
+                except Exception as e:
+                    print(f"WARNING: {label} benchmark failed: {e}")
+                    results.append({'backend': backend, 'model': size, 'error': str(e)})
+
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.machine(),
+            'cpu_count': multiprocessing.cpu_count(),
+            'python': platform.python_version()
+        },
+        'settings': {
+            'chunk_seconds': chunk_seconds,
+            'faster_whisper_compute_type': Config.FASTER_WHISPER_COMPUTE_TYPE,
+            'faster_whisper_beam_size': Config.FASTER_WHISPER_BEAM_SIZE,
+            'gpu_acceleration': Config.ENABLE_GPU_ACCELERATION
+        },
+        'fixtures': [{'name': f['name'], 'duration': f['duration']} for f in fixtures],
+        'results': results
+    }
+
+
+def print_report(report):
+    print(f"\n{'backend':<26}{'RTF':>8}{'chunk p50':>11}{'chunk p95':>11}{'peak MB':>9}{'WER':>8}")
+    for run in report['results']:
+        label = f"{run['backend']} ({run['model']})" if run.get('model') else run['backend']
+        if 'skipped' in run or 'error' in run:
+            print(f"{label:<26}  {run.get('skipped') or 'failed: ' + run['error']}")
+            continue
+        p50 = max(r['chunk_p50_seconds'] or 0 for r in run['fixtures'])
+        p95 = max(r['chunk_p95_seconds'] or 0 for r in run['fixtures'])
+        wer = f"{run['wer']:.1%}" if run['wer'] is not None else '-'
+        print(f"{label:<26}{run['rtf']:>8.3f}{p50:>10.2f}s{p95:>10.2f}s{run['peak_rss_mb']:>9.0f}{wer:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the transcription backends")
+    parser.add_argument('--backends', default=','.join(BACKENDS),
+                        help="Comma-separated backends (unavailable ones are skipped)")
+    parser.add_argument('--whisper-sizes', default=Config.WHISPER_MODEL_SIZE,
+                        help="Comma-separated Whisper model sizes, e.g. tiny,base,small")
+    parser.add_argument('--chunk-seconds', type=float, default=Config.LIVE_TRANSCRIPTION_INTERVAL,
+                        help="Chunk length for the live latency measurement")
+    parser.add_argument('--output', default=None,
+                        help="JSON report path (default: data/benchmarks/transcription_<time>.json)")
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"Unknown backends: {', '.join(sorted(unknown))}")
+
+    report = run_benchmark(backends, [s.strip() for s in args.whisper_sizes.split(',')],
+                           args.chunk_seconds)
+    print_report(report)
+
+    output = Path(args.output) if args.output else (
+        Config.DATA_DIR / 'benchmarks' / f"transcription_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        # Stable key order so reports from two releases diff cleanly
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\nReport saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -21,6 +21,11 @@ class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
     DEEPGRAM_API_KEY = os.getenv('DEEPGRAM_API_KEY')
+    DEEPGRAM_API_URL = os.getenv('DEEPGRAM_API_URL', 'https://api.deepgram.com/v1')
+    DEEPGRAM_MAX_RETRIES = int(os.getenv('DEEPGRAM_MAX_RETRIES', '4'))
+    # Request timeout is DEEPGRAM_TIMEOUT_SECONDS plus this much per second of audio
+    DEEPGRAM_TIMEOUT_SECONDS = float(os.getenv('DEEPGRAM_TIMEOUT_SECONDS', '30'))
+    DEEPGRAM_TIMEOUT_PER_AUDIO_SECOND = float(os.getenv('DEEPGRAM_TIMEOUT_PER_AUDIO_SECOND', '0.25'))
     ASSEMBLYAI_API_KEY = os.getenv('ASSEMBLYAI_API_KEY')
     
     # Euron.one API Configuration (Alternative OpenAI-compatible API)
@@ -29,10 +34,41 @@ class Config:
     EURON_MODEL = os.getenv('EURON_MODEL', 'gpt-4.1-mini')
     USE_EURON_API = os.getenv('USE_EURON_API', 'false').lower() == 'true'
     
+    # LLM providers (shared by the summarizer and the action item extractor)
+    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview')
+    ANTHROPIC_MODEL = os.getenv('ANTHROPIC_MODEL', 'claude-3-5-sonnet-20241022')
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '120'))
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+    # Per provider: requests in flight at once, and requests started per
+    # minute (0 = no rate limit)
+    LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv('LLM_MAX_CONCURRENT_REQUESTS', '4'))
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '60'))
+    
     # Model Configuration
     USE_LOCAL_MODEL = os.getenv('USE_LOCAL_MODEL', 'false').lower() == 'true'
     LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH', './models/llama-2-7b-chat.gguf')
+    LOCAL_MODEL_CONTEXT = int(os.getenv('LOCAL_MODEL_CONTEXT', '4096'))
+    LOCAL_MODEL_THREADS = int(os.getenv('LOCAL_MODEL_THREADS', '4'))
+    # whisper, faster-whisper, deepgram or assemblyai
     TRANSCRIPTION_MODEL = os.getenv('TRANSCRIPTION_MODEL', 'whisper')
+    # Whisper size for final transcription: tiny, base, small, medium or large
+    WHISPER_MODEL_SIZE = os.getenv('WHISPER_MODEL_SIZE', 'base')
+    # Unload shared models after this many idle minutes (0 keeps them resident)
+    MODEL_IDLE_EVICTION_MINUTES = float(os.getenv('MODEL_IDLE_EVICTION_MINUTES', '30'))
+    # Copies of a PyTorch Whisper model; more than 1 lets transcriptions run
+    # in parallel at the cost of one model's memory per copy
+    WHISPER_MODEL_REPLICAS = int(os.getenv('WHISPER_MODEL_REPLICAS', '1'))
+    # faster-whisper (CTranslate2) engine: int8, int8_float16, float16 or float32;
+    # 0 threads splits the cores between the transcription workers, beam size 1
+    # is greedy decoding
+    FASTER_WHISPER_COMPUTE_TYPE = os.getenv('FASTER_WHISPER_COMPUTE_TYPE', 'int8')
+    FASTER_WHISPER_CPU_THREADS = int(os.getenv('FASTER_WHISPER_CPU_THREADS', '0'))
+    FASTER_WHISPER_BEAM_SIZE = int(os.getenv('FASTER_WHISPER_BEAM_SIZE', '1'))
+    # Recordings at least this long are split at pauses and transcribed in
+    # LONG_AUDIO_WORKERS processes (0 = half the cores, 1 = disabled)
+    LONG_AUDIO_THRESHOLD_SECONDS = float(os.getenv('LONG_AUDIO_THRESHOLD_SECONDS', '600'))
+    LONG_AUDIO_SEGMENT_SECONDS = float(os.getenv('LONG_AUDIO_SEGMENT_SECONDS', '120'))
+    LONG_AUDIO_WORKERS = int(os.getenv('LONG_AUDIO_WORKERS', '0'))
     
     # Audio settings
     AUDIO_DIR = DATA_DIR / 'audio'
@@ -109,16 +145,72 @@ class Config:
     # Audio Settings
     AUDIO_SAMPLE_RATE = int(os.getenv('AUDIO_SAMPLE_RATE', '16000'))
     AUDIO_CHANNELS = int(os.getenv('AUDIO_CHANNELS', '1'))
+    # Capture at the device's own rate and convert once to 16 kHz mono;
+    # when false, capture at AUDIO_SAMPLE_RATE instead
+    AUDIO_CAPTURE_NATIVE_RATE = os.getenv('AUDIO_CAPTURE_NATIVE_RATE', 'true').lower() == 'true'
     AUDIO_FORMAT = os.getenv('AUDIO_FORMAT', 'wav')
     MAX_AUDIO_DURATION_MINUTES = int(os.getenv('MAX_AUDIO_DURATION_MINUTES', '120'))
+    # Capture ring buffer size; only needs to cover consumer lag since
+    # recordings are streamed to disk as they are captured
+    AUDIO_BUFFER_SECONDS = int(os.getenv('AUDIO_BUFFER_SECONDS', '300'))
+    AUDIO_SYNC_INTERVAL_SECONDS = float(os.getenv('AUDIO_SYNC_INTERVAL_SECONDS', '5'))
+    # Compression applied to recordings after transcription: none, flac or opus
+    AUDIO_ARCHIVE_FORMAT = os.getenv('AUDIO_ARCHIVE_FORMAT', 'flac')
     
     # Transcription Settings
     LIVE_TRANSCRIPTION_INTERVAL = int(os.getenv('LIVE_TRANSCRIPTION_INTERVAL', '10'))
-    TRANSCRIPTION_LANGUAGE = os.getenv('TRANSCRIPTION_LANGUAGE', 'en')
+    # Language code (en, de, ...) or 'auto' to detect it once per meeting,
+    # from the first chunk with speech, and reuse it for every later chunk
+    TRANSCRIPTION_LANGUAGE = os.getenv('TRANSCRIPTION_LANGUAGE', 'auto')
+    # Decode profile: fast (greedy, no temperature fallback), balanced
+    # (each engine's default decoding) or accurate (beam of 5 with fallback)
+    TRANSCRIPTION_PROFILE = os.getenv('TRANSCRIPTION_PROFILE', 'balanced')
+    # Speaker diarization runs alongside transcription and labels segments
+    # with speakers. DIARIZATION_NUM_SPEAKERS=0 picks the count automatically
+    # (up to the max); a higher min silhouette favours a single speaker
     ENABLE_SPEAKER_DIARIZATION = os.getenv('ENABLE_SPEAKER_DIARIZATION', 'false').lower() == 'true'
+    DIARIZATION_NUM_SPEAKERS = int(os.getenv('DIARIZATION_NUM_SPEAKERS', '0'))
+    DIARIZATION_MAX_SPEAKERS = int(os.getenv('DIARIZATION_MAX_SPEAKERS', '8'))
+    DIARIZATION_MIN_SILHOUETTE = float(os.getenv('DIARIZATION_MIN_SILHOUETTE', '0.3'))
+    
+    # Live transcription queue: bounded backlog shared by all recordings.
+    # Backpressure policy when full: drop_oldest, coalesce or degrade
+    LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', '8'))
+    LIVE_BACKPRESSURE_POLICY = os.getenv('LIVE_BACKPRESSURE_POLICY', 'coalesce')
+    WHISPER_FAST_MODEL = os.getenv('WHISPER_FAST_MODEL', 'tiny')
+    
+    # Build the final transcript from the live chunk results, re-transcribing
+    # only low-confidence segments (avg log-probability below the threshold),
+    # chunk cuts (+/- the boundary margin) and failed chunks. Falls back to a
+    # full pass when more than the redo fraction of the meeting needs redoing
+    LIVE_TRANSCRIPT_REUSE = os.getenv('LIVE_TRANSCRIPT_REUSE', 'true').lower() == 'true'
+    LIVE_REUSE_MIN_LOGPROB = float(os.getenv('LIVE_REUSE_MIN_LOGPROB', '-1.0'))
+    LIVE_REUSE_BOUNDARY_SECONDS = float(os.getenv('LIVE_REUSE_BOUNDARY_SECONDS', '1.0'))
+    LIVE_REUSE_MAX_REDO_FRACTION = float(os.getenv('LIVE_REUSE_MAX_REDO_FRACTION', '0.5'))
+    LIVE_REUSE_WAIT_SECONDS = float(os.getenv('LIVE_REUSE_WAIT_SECONDS', '30'))
+    
+    # Stream live captions over Deepgram's websocket API (needs DEEPGRAM_API_KEY);
+    # chunked transcription is used otherwise or if the stream fails
+    LIVE_STREAMING_ENABLED = os.getenv('LIVE_STREAMING_ENABLED', 'false').lower() == 'true'
+    DEEPGRAM_STREAMING_URL = os.getenv('DEEPGRAM_STREAMING_URL', 'wss://api.deepgram.com/v1/listen')
+    
+    # Voice activity detection for live chunks (skips silence, cuts at pauses)
+    VAD_ENABLED = os.getenv('VAD_ENABLED', 'true').lower() == 'true'
+    VAD_MIN_CHUNK_SECONDS = float(os.getenv('VAD_MIN_CHUNK_SECONDS', '3'))
+    VAD_MAX_CHUNK_SECONDS = float(os.getenv('VAD_MAX_CHUNK_SECONDS', '15'))
+    VAD_PAUSE_MS = int(os.getenv('VAD_PAUSE_MS', '500'))
+    VAD_ENERGY_THRESHOLD_DB = float(os.getenv('VAD_ENERGY_THRESHOLD_DB', '-45'))
     
     # AI Processing Settings
     MAX_SUMMARY_LENGTH = int(os.getenv('MAX_SUMMARY_LENGTH', '500'))
+    # combined: summary and action items from one structured LLM call;
+    # separate: a summary call, then an action item call
+    ANALYSIS_MODE = os.getenv('ANALYSIS_MODE', 'combined')
+    # Transcripts longer than this many tokens are summarized in chunks, up to
+    # SUMMARY_MAP_WORKERS at once, and the chunk notes merged in a final pass
+    # (a local model uses whatever fits in LOCAL_MODEL_CONTEXT instead)
+    SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '12000'))
+    SUMMARY_MAP_WORKERS = int(os.getenv('SUMMARY_MAP_WORKERS', '4'))
     MIN_ACTION_ITEM_CONFIDENCE = float(os.getenv('MIN_ACTION_ITEM_CONFIDENCE', '0.7'))
     ENABLE_AUTO_TRANSLATION = os.getenv('ENABLE_AUTO_TRANSLATION', 'false').lower() == 'true'
     DEFAULT_TRANSLATION_LANGUAGE = os.getenv('DEFAULT_TRANSLATION_LANGUAGE', 'en')
@@ -128,10 +220,16 @@ class Config:
     ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY')
     SESSION_TIMEOUT_MINUTES = int(os.getenv('SESSION_TIMEOUT_MINUTES', '60'))
     MAX_FILE_SIZE_MB = int(os.getenv('MAX_FILE_SIZE_MB', '100'))
+    # Bulk imports may only read recordings under this directory
+    IMPORT_ROOT = Path(os.getenv('IMPORT_ROOT', str(DATA_DIR / 'import'))).expanduser()
     
     # Performance Settings
     ENABLE_CACHING = os.getenv('ENABLE_CACHING', 'true').lower() == 'true'
     CACHE_DURATION_HOURS = int(os.getenv('CACHE_DURATION_HOURS', '24'))
+    CACHE_DIR = DATA_DIR / 'cache'
+    TRANSCRIPTION_CACHE_MAX_MB = float(os.getenv('TRANSCRIPTION_CACHE_MAX_MB', '256'))
+    # Summary and action item responses, keyed by provider, model and prompt
+    LLM_CACHE_MAX_MB = float(os.getenv('LLM_CACHE_MAX_MB', '64'))
     MAX_CONCURRENT_PROCESSING = int(os.getenv('MAX_CONCURRENT_PROCESSING', '3'))
     ENABLE_GPU_ACCELERATION = os.getenv('ENABLE_GPU_ACCELERATION', 'false').lower() == 'true'
     
@@ -149,6 +247,8 @@ class Config:
         """Create necessary directories"""
         cls.DATA_DIR.mkdir(exist_ok=True)
         cls.AUDIO_DIR.mkdir(exist_ok=True)
+        cls.CACHE_DIR.mkdir(exist_ok=True)
+        cls.IMPORT_ROOT.mkdir(parents=True, exist_ok=True)
         (cls.BASE_DIR / 'models').mkdir(exist_ok=True)
 
 
@@ -19,7 +19,7 @@ Session = scoped_session(session_factory)
 
 def init_db():
     """Initialize database and create all tables"""
-    from models import Meeting, ActionItem, Participant
+    from models import Meeting, ActionItem, Participant, TranscriptSegment, ImportedRecording
     Base.metadata.create_all(engine)
     print("Database initialized successfully")
 
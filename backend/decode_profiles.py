@@ -0,0 +1,57 @@
+"""
+Decode profiles
+Speed/accuracy presets for Whisper decoding and the per-meeting decode options
+"""
+from config import Config
+
+# Temperatures tried in turn when a decode looks like a failure
+# (repetitive or low log-probability); Whisper's own default schedule
+FALLBACK_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+# beam_size None keeps each engine's configured default
+# (greedy for openai-whisper, FASTER_WHISPER_BEAM_SIZE for faster-whisper)
+DECODE_PROFILES = {
+    'fast': {'beam_size': 1, 'temperature_fallback': False},
+    'balanced': {'beam_size': None, 'temperature_fallback': True},
+    'accurate': {'beam_size': 5, 'temperature_fallback': True},
+}
+
+
+def normalize_language(language):
+    """Language code to pin, or None to detect ('auto' or empty)"""
+    language = (language or '').strip().lower()
+    return None if language in ('', 'auto') else language
+
+
+def decode_options(language=None, profile=None):
+    """Options a transcription runs with: {'language', 'profile'}
+
+    Raises ValueError for an unknown profile.
+    """
+    profile = profile or Config.TRANSCRIPTION_PROFILE
+    if profile not in DECODE_PROFILES:
+        raise ValueError(f"Unknown decode profile: {profile} "
+                         f"(expected one of {', '.join(DECODE_PROFILES)})")
+    return {'language': normalize_language(language), 'profile': profile}
+
+
+def whisper_kwargs(engine, options):
+    """Keyword arguments for ``transcribe`` on an openai-whisper or faster-whisper model"""
+    options = options or decode_options(Config.TRANSCRIPTION_LANGUAGE)
+    profile = DECODE_PROFILES[options['profile']]
+    kwargs = {
+        'language': options['language'],
+        'temperature': FALLBACK_TEMPERATURES if profile['temperature_fallback'] else 0.0
+    }
+
+    beam_size = profile['beam_size']
+    if engine == 'faster-whisper':
+        kwargs['beam_size'] = beam_size or Config.FASTER_WHISPER_BEAM_SIZE
+        if not profile['temperature_fallback']:
+            kwargs['temperature'] = [0.0]
+    elif beam_size and beam_size > 1:
+        # openai-whisper decodes greedily unless given a beam; best_of is
+        # the sample count for the temperatures above zero
+        kwargs['beam_size'] = beam_size
+        kwargs['best_of'] = beam_size
+    return kwargs
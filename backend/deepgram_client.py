@@ -0,0 +1,172 @@
+"""
+Deepgram client
+Pooled HTTP client for Deepgram's pre-recorded API that streams uploads
+from disk and retries rate limits and server errors
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+import httpx
+import soundfile as sf
+from config import Config
+
+UPLOAD_BLOCK_BYTES = 64 * 1024
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class DeepgramError(Exception):
+    """Deepgram request failed after all retries, or was rejected outright"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _file_body(filepath):
+    """Yield a file in blocks so the upload never sits in memory whole"""
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(UPLOAD_BLOCK_BYTES), b''):
+            yield block
+
+
+class DeepgramClient:
+    """Thread-safe client that keeps connections to Deepgram alive between calls.
+
+    Requests that fail with 429 or a 5xx status, or with a connection
+    error, are retried with exponential backoff and full jitter; a
+    ``Retry-After`` header takes precedence over the computed delay. The
+    timeout grows with the audio duration, and every request's latency is
+    kept for monitoring.
+    """
+
+    def __init__(self, api_key, base_url=None, max_retries=None, timeout=None,
+                 timeout_per_audio_second=None, backoff_seconds=0.5, max_backoff_seconds=30.0):
+        self.base_url = (base_url or Config.DEEPGRAM_API_URL).rstrip('/')
+        self.max_retries = Config.DEEPGRAM_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or Config.DEEPGRAM_TIMEOUT_SECONDS
+        self.timeout_per_audio_second = (Config.DEEPGRAM_TIMEOUT_PER_AUDIO_SECOND
+                                         if timeout_per_audio_second is None
+                                         else timeout_per_audio_second)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._client = httpx.Client(
+            headers={'Authorization': f"Token {api_key}"},
+            limits=httpx.Limits(max_connections=Config.MAX_CONCURRENT_PROCESSING + 2,
+                                max_keepalive_connections=Config.MAX_CONCURRENT_PROCESSING)
+        )
+        self._latencies = deque(maxlen=200)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def transcribe_file(self, filepath, params, content_type='audio/wav'):
+        """Upload a recording straight from disk; returns (Deepgram JSON, request info)"""
+        size = os.path.getsize(filepath)
+        try:
+            duration = sf.info(str(filepath)).duration
+        except Exception:
+            # Compressed formats libsndfile cannot read: assume 16 kB/s
+            duration = size / 16000
+        headers = {'Content-Type': content_type, 'Content-Length': str(size)}
+        return self._request(params, headers, lambda: _file_body(filepath), duration)
+
+    def transcribe_bytes(self, data, params, duration, content_type='application/octet-stream'):
+        """Upload in-memory audio; returns (Deepgram JSON, request info)"""
+        headers = {'Content-Type': content_type}
+        return self._request(params, headers, lambda: data, duration)
+
+    def _timeout_for(self, duration):
+        budget = self.timeout + self.timeout_per_audio_second * duration
+        return httpx.Timeout(budget, connect=10.0, pool=budget)
+
+    def _request(self, params, headers, make_body, duration):
+        url = f"{self.base_url}/listen"
+        timeout = self._timeout_for(duration)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            error = None
+            try:
+                # The body is rebuilt for each attempt so a stream starts over
+                response = self._client.post(url, params=params, headers=headers,
+                                             content=make_body(), timeout=timeout)
+            except httpx.TransportError as e:
+                response = None
+                error = DeepgramError(f"Deepgram request failed: {e}")
+
+            if response is not None:
+                if response.status_code < 400:
+                    return response.json(), self._record(started, attempt, response.status_code)
+                error = DeepgramError(
+                    f"Deepgram returned {response.status_code}: {response.text[:200]}",
+                    response.status_code
+                )
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self._record(started, attempt, response.status_code, failed=True)
+                    raise error
+
+            if attempt >= self.max_retries:
+                self._record(started, attempt, error.status_code, failed=True)
+                raise error
+
+            delay = self._retry_delay(attempt, response)
+            print(f"WARNING: {error}; retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 2}/{self.max_retries + 1})")
+            time.sleep(delay)
+            attempt += 1
+            with self._stats_lock:
+                self.retries += 1
+
+    def _retry_delay(self, attempt, response):
+        """Retry-After when the server sends one, else full-jitter backoff"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(0.0, delay), self.max_backoff_seconds)
+        ceiling = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _record(self, started, attempt, status_code, failed=False):
+        """Count a finished request; returns its latency and attempt count"""
+        latency = time.monotonic() - started
+        with self._stats_lock:
+            self.requests += 1
+            if failed:
+                self.failures += 1
+            self._latencies.append(latency)
+        return {
+            'latency_seconds': round(latency, 3),
+            'attempts': attempt + 1,
+            'status_code': status_code
+        }
+
+    def get_stats(self):
+        """Request counts and latency percentiles over recent requests"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures
+            }
+        if latencies:
+            stats['latency_seconds'] = {
+                'p50': round(latencies[len(latencies) // 2], 3),
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                'max': round(latencies[-1], 3)
+            }
+        return stats
+
+    def close(self):
+        self._client.close()
@@ -0,0 +1,261 @@
+"""
+Speaker diarization
+CPU-only speaker labelling: cepstral embeddings over voiced audio, clustered with numpy
+"""
+import numpy as np
+import soundfile as sf
+from config import Config
+from audio_pipeline import CANONICAL_SAMPLE_RATE, PolyphaseResampler, downmix
+from vad import VoiceActivityDetector
+
+# 25 ms analysis frames every 10 ms at 16 kHz
+FRAME_LENGTH = 400
+FRAME_HOP = 160
+N_FFT = 512
+N_MELS = 40
+N_CEPSTRA = 20
+# One embedding per 1.5 s window, every 0.75 s (two hops of 75 frames)
+HOP_FRAMES = 75
+HOP_SECONDS = HOP_FRAMES * FRAME_HOP / CANONICAL_SAMPLE_RATE
+# Windows need at least this share of voiced frames to be clustered
+MIN_VOICED_SHARE = 0.5
+# Most windows used to score the choice of speaker count
+SCORE_SAMPLE = 2000
+
+
+def _mel_filterbank(n_mels=N_MELS, n_fft=N_FFT, sample_rate=CANONICAL_SAMPLE_RATE):
+    """Triangular mel filters as an (n_fft // 2 + 1, n_mels) matrix"""
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    mel_points = np.linspace(to_mel(60.0), to_mel(sample_rate / 2 - 200.0), n_mels + 2)
+    hz_points = 700.0 * (10 ** (mel_points / 2595.0) - 1.0)
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, centre, upper = hz_points[:-2, None], hz_points[1:-1, None], hz_points[2:, None]
+    rising = (bins[None, :] - lower) / (centre - lower)
+    falling = (upper - bins[None, :]) / (upper - centre)
+    return np.maximum(0.0, np.minimum(rising, falling)).T.astype(np.float32)
+
+
+def _dct_matrix(n_in=N_MELS, n_out=N_CEPSTRA):
+    """DCT-II basis mapping log-mel energies to cepstra"""
+    n = np.arange(n_in)
+    return np.cos(np.pi / n_in * (n[:, None] + 0.5) * np.arange(n_out)[None, :]).astype(np.float32)
+
+
+class _HopAccumulator:
+    """Streams canonical audio into per-hop cepstral statistics.
+
+    Frames are cut exactly as if the whole recording were framed at once.
+    For every 0.75 s hop only the voiced frames' cepstral sums, squared
+    sums and count are kept, so a 2-hour meeting needs a few hundred kB.
+    """
+
+    def __init__(self):
+        self.detector = VoiceActivityDetector(
+            CANONICAL_SAMPLE_RATE, frame_ms=FRAME_HOP * 1000 // CANONICAL_SAMPLE_RATE,
+            min_energy_db=Config.VAD_ENERGY_THRESHOLD_DB
+        )
+        self.window = np.hamming(FRAME_LENGTH).astype(np.float32)
+        self.mel = _mel_filterbank()
+        # c0 follows loudness, not the voice
+        self.dct = _dct_matrix()[:, 1:]
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._cepstra = np.zeros((0, N_CEPSTRA - 1), dtype=np.float32)
+        self._voiced = np.zeros(0, dtype=bool)
+        self.sums, self.squares, self.counts = [], [], []
+
+    def feed(self, samples):
+        buffer = np.concatenate([self._samples, samples])
+        n_frames = (len(buffer) - FRAME_LENGTH) // FRAME_HOP + 1 if len(buffer) >= FRAME_LENGTH else 0
+        if n_frames <= 0:
+            self._samples = buffer
+            return
+        self._samples = buffer[n_frames * FRAME_HOP:]
+
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, FRAME_LENGTH)[::FRAME_HOP][:n_frames]
+        power = np.abs(np.fft.rfft(frames * self.window, N_FFT)) ** 2
+        cepstra = np.log(power.astype(np.float32) @ self.mel + 1e-8) @ self.dct
+
+        # The VAD sees the same 10 ms steps, in the half-second blocks it is tuned for
+        steps = buffer[:n_frames * FRAME_HOP].reshape(n_frames, FRAME_HOP)
+        voiced = np.concatenate([self.detector.speech_mask(steps[i:i + 50])
+                                 for i in range(0, n_frames, 50)])
+
+        self._cepstra = np.concatenate([self._cepstra, cepstra])
+        self._voiced = np.concatenate([self._voiced, voiced])
+        n_hops = len(self._voiced) // HOP_FRAMES
+        if n_hops:
+            used = n_hops * HOP_FRAMES
+            hop_cepstra = self._cepstra[:used].reshape(n_hops, HOP_FRAMES, -1).astype(np.float64)
+            weights = self._voiced[:used].reshape(n_hops, HOP_FRAMES, 1)
+            self.sums.append((hop_cepstra * weights).sum(axis=1))
+            self.squares.append((hop_cepstra ** 2 * weights).sum(axis=1))
+            self.counts.append(weights[:, :, 0].sum(axis=1))
+            self._cepstra = self._cepstra[used:]
+            self._voiced = self._voiced[used:]
+
+    def hop_stats(self):
+        if not self.counts:
+            empty = np.zeros((0, N_CEPSTRA - 1))
+            return empty, empty, np.zeros(0)
+        return np.concatenate(self.sums), np.concatenate(self.squares), np.concatenate(self.counts)
+
+
+def extract_embeddings(filepath, block_seconds=30.0):
+    """Speaker embeddings for the voiced windows of a recording.
+
+    Returns (embeddings, window_starts): one L2-normalised row per 1.5 s
+    window with enough speech, and each window's start in seconds.
+    """
+    info = sf.info(str(filepath))
+    resampler = PolyphaseResampler(info.samplerate)
+    accumulator = _HopAccumulator()
+    blocksize = int(block_seconds * info.samplerate)
+    for block in sf.blocks(str(filepath), blocksize=blocksize, dtype='float32', always_2d=True):
+        accumulator.feed(resampler.process(downmix(block)))
+
+    sums, squares, counts = accumulator.hop_stats()
+    if len(counts) < 2:
+        return np.zeros((0, 2 * (N_CEPSTRA - 1))), np.zeros(0)
+
+    # Each window is two consecutive hops
+    window_sums = sums[:-1] + sums[1:]
+    window_squares = squares[:-1] + squares[1:]
+    window_counts = counts[:-1] + counts[1:]
+    keep = window_counts >= MIN_VOICED_SHARE * 2 * HOP_FRAMES
+    if not keep.any():
+        return np.zeros((0, 2 * (N_CEPSTRA - 1))), np.zeros(0)
+
+    n = window_counts[keep, None]
+    means = window_sums[keep] / n
+    stds = np.sqrt(np.maximum(window_squares[keep] / n - means ** 2, 1e-8))
+    embeddings = np.hstack([means, stds])
+    # Standardise each dimension over the meeting, so the channel and room cancel out
+    embeddings = (embeddings - embeddings.mean(axis=0)) / (embeddings.std(axis=0) + 1e-8)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8
+    return embeddings.astype(np.float32), np.flatnonzero(keep) * HOP_SECONDS
+
+
+def _kmeans(embeddings, k, rng, iterations=30):
+    """Spherical k-means with k-means++ seeding; returns (labels, centroids)"""
+    centroids = [embeddings[rng.integers(len(embeddings))]]
+    for _ in range(1, k):
+        distance = np.min(1.0 - embeddings @ np.array(centroids).T, axis=1).clip(0)
+        total = distance.sum()
+        index = rng.choice(len(embeddings), p=distance / total) if total > 0 else rng.integers(len(embeddings))
+        centroids.append(embeddings[index])
+    centroids = np.array(centroids)
+
+    labels = None
+    for _ in range(iterations):
+        new_labels = np.argmax(embeddings @ centroids.T, axis=1)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        for cluster in range(k):
+            members = embeddings[labels == cluster]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[cluster] = centroid / (np.linalg.norm(centroid) + 1e-8)
+    return labels, centroids
+
+
+def _silhouette(embeddings, labels, k):
+    """Mean silhouette score with cosine distance"""
+    distances = 1.0 - embeddings @ embeddings.T
+    one_hot = np.eye(k)[labels]
+    sizes = one_hot.sum(axis=0)
+    per_cluster = distances @ one_hot
+    own = labels[:, None] == np.arange(k)[None, :]
+    # Distance to the other members of the point's own cluster, and to the nearest other cluster
+    a = per_cluster[own] / np.maximum(sizes[labels] - 1, 1)
+    mean_other = np.where(own, np.inf, per_cluster / np.maximum(sizes, 1))
+    b = mean_other.min(axis=1)
+    return float(np.mean((b - a) / np.maximum(np.maximum(a, b), 1e-8)))
+
+
+def cluster_speakers(embeddings, num_speakers=None, max_speakers=None):
+    """Speaker index for each embedding.
+
+    With ``num_speakers`` unset the count is chosen by silhouette score
+    from 2 to ``max_speakers``, falling back to a single speaker when no
+    split separates the voices clearly.
+    """
+    max_speakers = max_speakers or Config.DIARIZATION_MAX_SPEAKERS
+    rng = np.random.default_rng(0)
+    if len(embeddings) < 2:
+        return np.zeros(len(embeddings), dtype=int)
+    if num_speakers:
+        return _kmeans(embeddings, min(num_speakers, len(embeddings)), rng)[0]
+
+    sample = embeddings
+    if len(embeddings) > SCORE_SAMPLE:
+        sample = embeddings[rng.choice(len(embeddings), SCORE_SAMPLE, replace=False)]
+
+    best_labels, best_score = np.zeros(len(embeddings), dtype=int), Config.DIARIZATION_MIN_SILHOUETTE
+    for k in range(2, min(max_speakers, len(embeddings)) + 1):
+        labels, centroids = _kmeans(embeddings, k, rng)
+        if np.bincount(labels, minlength=k).min() < 2:
+            break
+        score = _silhouette(sample, np.argmax(sample @ centroids.T, axis=1), k)
+        if score > best_score:
+            best_labels, best_score = labels, score
+    return best_labels
+
+
+def _smooth(labels, width=5):
+    """Majority vote over neighbouring windows so single windows do not flip speaker"""
+    if len(labels) < width:
+        return labels
+    one_hot = np.eye(labels.max() + 1)[labels]
+    kernel = np.ones(width)
+    votes = np.apply_along_axis(lambda column: np.convolve(column, kernel, mode='same'), 0, one_hot)
+    return np.argmax(votes, axis=1)
+
+
+def diarize(filepath, num_speakers=None):
+    """Speaker turns for a recording: a list of {'start', 'end', 'speaker'}"""
+    embeddings, window_starts = extract_embeddings(filepath)
+    if len(embeddings) == 0:
+        return []
+    labels = _smooth(cluster_speakers(embeddings, num_speakers or Config.DIARIZATION_NUM_SPEAKERS or None))
+
+    # Number speakers in order of first appearance
+    order = {}
+    for label in labels:
+        order.setdefault(label, len(order) + 1)
+
+    # Each window speaks for its middle hop
+    turns = []
+    for start, label in zip(window_starts + HOP_SECONDS / 2, labels):
+        speaker = f"Speaker {order[label]}"
+        if turns and turns[-1]['speaker'] == speaker and start - turns[-1]['end'] < 1e-6 + HOP_SECONDS:
+            turns[-1]['end'] = start + HOP_SECONDS
+        else:
+            turns.append({'start': float(start), 'end': float(start + HOP_SECONDS), 'speaker': speaker})
+    return turns
+
+
+def label_segments(segments, turns):
+    """Set each transcript segment's 'speaker' to the one it overlaps most"""
+    if not segments or not turns:
+        return segments
+    speakers = sorted({turn['speaker'] for turn in turns})
+    turn_starts = np.array([turn['start'] for turn in turns])
+    turn_ends = np.array([turn['end'] for turn in turns])
+    turn_speakers = np.eye(len(speakers))[[speakers.index(turn['speaker']) for turn in turns]]
+
+    for first in range(0, len(segments), 500):
+        batch = segments[first:first + 500]
+        starts = np.array([segment['start'] for segment in batch])[:, None]
+        ends = np.array([segment['end'] for segment in batch])[:, None]
+        overlap = np.clip(np.minimum(ends, turn_ends) - np.maximum(starts, turn_starts), 0, None)
+        per_speaker = overlap @ turn_speakers
+        # Segments in no turn (e.g. said over silence) take the nearest turn's speaker
+        middles = (starts + ends) / 2
+        nearest = np.argmin(np.abs((turn_starts + turn_ends) / 2 - middles), axis=1)
+        for segment, scores, near in zip(batch, per_speaker, nearest):
+            segment['speaker'] = (speakers[int(np.argmax(scores))] if scores.max() > 0
+                                  else turns[near]['speaker'])
+    return segments
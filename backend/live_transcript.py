@@ -0,0 +1,207 @@
+"""
+Live transcript
+Collects live chunk transcripts on the recording timeline and stitches them
+into the final transcript, re-transcribing only the regions that need it
+"""
+import threading
+import soundfile as sf
+from config import Config
+from agents.transcription import FallbackTranscript
+
+
+def _merge_regions(regions, gap=0.0):
+    """Union of (start, end) intervals, joining ones closer than gap"""
+    merged = []
+    for start, end in sorted(regions):
+        if merged and start <= merged[-1][1] + gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(region) for region in merged]
+
+
+class LiveTranscript:
+    """Per-meeting accumulation of live chunk results.
+
+    Every chunk's segments are moved from chunk time to recording time
+    through the chunk's spans. At the end of the meeting the regions that
+    cannot be trusted are re-transcribed from the recording file:
+
+    - segments the model was unsure about (low average log-probability or
+      a repetitive, high compression ratio) and chunks decoded with the fast
+      model under load
+    - cuts where one chunk ended and the next began mid-speech
+    - chunks that were dropped, failed or never finished, and the tail the
+      live path had not read when the recording stopped
+
+    Audio the VAD skipped as silence is never re-transcribed.
+    """
+
+    def __init__(self, meeting_id, sample_rate):
+        self.meeting_id = meeting_id
+        self.sample_rate = sample_rate
+        self.frames_seen = 0
+        self._segments = []
+        self._redo = []
+        self._pending = {}
+        self._chunk_starts = set()
+        self._chunk_ends = set()
+        self._languages = []
+        self._lock = threading.Lock()
+
+    def add_seen(self, frames):
+        """Record that the live path has read this many more stream frames"""
+        with self._lock:
+            self.frames_seen += frames
+
+    def chunk_submitted(self, spans):
+        """A chunk covering these spans was queued for transcription"""
+        with self._lock:
+            for span in spans:
+                self._pending[span[1]] = span
+
+    def chunk_failed(self, spans):
+        """A chunk was dropped or failed; its audio must be transcribed again"""
+        with self._lock:
+            for _, stream_frame, frames in spans:
+                self._pending.pop(stream_frame, None)
+                self._redo.append(self._span_seconds(stream_frame, frames))
+
+    def chunk_transcribed(self, spans, result, fast=False, track_cuts=True):
+        """Place a chunk's transcript on the recording timeline
+
+        ``track_cuts=False`` is for results whose edges are not cuts in the
+        audio, such as streamed finals from a continuous connection.
+        """
+        if not spans:
+            return
+        with self._lock:
+            for _, stream_frame, _ in spans:
+                self._pending.pop(stream_frame, None)
+            if track_cuts:
+                self._chunk_starts.add(spans[0][1])
+                self._chunk_ends.add(spans[-1][1] + spans[-1][2])
+            if result.get('language'):
+                self._languages.append(result['language'])
+
+            if fast:
+                self._redo.extend(self._span_seconds(s, n) for _, s, n in spans)
+                return
+
+            segments = result.get('segments') or []
+            if not segments and result.get('text', '').strip():
+                # Backends without timestamps: the chunk is one segment
+                chunk_seconds = (spans[-1][0] + spans[-1][2]) / self.sample_rate
+                segments = [{'start': 0.0, 'end': chunk_seconds, 'text': result['text']}]
+
+            for segment in segments:
+                if not segment['text'].strip():
+                    continue
+                start = self._to_stream_seconds(spans, segment['start'])
+                end = max(start, self._to_stream_seconds(spans, segment['end']))
+                if self._is_low_confidence(segment):
+                    self._redo.append((start, end))
+                else:
+                    self._segments.append({'start': start, 'end': end, 'text': segment['text']})
+
+    def _span_seconds(self, stream_frame, frames):
+        return (stream_frame / self.sample_rate, (stream_frame + frames) / self.sample_rate)
+
+    def _to_stream_seconds(self, spans, chunk_seconds):
+        """Map a time inside a chunk to a time in the recording"""
+        chunk_frame = chunk_seconds * self.sample_rate
+        for span_chunk, span_stream, span_frames in spans:
+            if chunk_frame < span_chunk + span_frames:
+                offset = max(0.0, chunk_frame - span_chunk)
+                return (span_stream + offset) / self.sample_rate
+        # Timestamps can run past the end of the audio; clamp to the last span
+        last_chunk, last_stream, last_frames = spans[-1]
+        return (last_stream + last_frames) / self.sample_rate
+
+    def _is_low_confidence(self, segment):
+        avg_logprob = segment.get('avg_logprob')
+        compression_ratio = segment.get('compression_ratio')
+        return ((avg_logprob is not None and avg_logprob < Config.LIVE_REUSE_MIN_LOGPROB) or
+                (compression_ratio is not None and compression_ratio > 2.4))
+
+    def plan(self, duration):
+        """Trusted segments and the (start, end) regions to re-transcribe"""
+        with self._lock:
+            regions = list(self._redo)
+            regions.extend(self._span_seconds(s, n) for _, s, n in self._pending.values())
+
+            # Chunks cut back to back split speech; redo around each cut
+            margin = Config.LIVE_REUSE_BOUNDARY_SECONDS
+            for cut in self._chunk_ends & self._chunk_starts:
+                cut_seconds = cut / self.sample_rate
+                regions.append((cut_seconds - margin, cut_seconds + margin))
+
+            seen = self.frames_seen / self.sample_rate
+            if seen < duration:
+                regions.append((seen, duration))
+            segments = sorted(self._segments, key=lambda segment: segment['start'])
+
+        regions = [(max(0.0, start), min(duration, end)) for start, end in regions]
+        regions = _merge_regions([r for r in regions if r[1] > r[0]], gap=0.5)
+
+        # Grow each region over the live segments it touches so no words are cut
+        kept = []
+        grown = []
+        for start, end in regions:
+            for segment in segments:
+                if segment['end'] > start and segment['start'] < end:
+                    start = min(start, segment['start'])
+                    end = max(end, segment['end'])
+            grown.append((start, end))
+        regions = _merge_regions(grown)
+        for segment in segments:
+            if not any(segment['end'] > start and segment['start'] < end for start, end in regions):
+                kept.append(segment)
+        return kept, regions
+
+    def finalize(self, audio_file, transcription_agent):
+        """Final transcript built from the live results, or None to transcribe in full"""
+        try:
+            info = sf.info(str(audio_file))
+        except Exception as e:
+            print(f"WARNING: Cannot read {audio_file} to reuse live transcript: {e}")
+            return None
+        if info.samplerate != self.sample_rate:
+            return None
+
+        segments, regions = self.plan(info.duration)
+        redo_seconds = sum(end - start for start, end in regions)
+        if not segments or redo_seconds > info.duration * Config.LIVE_REUSE_MAX_REDO_FRACTION:
+            print(f"Live transcript covers too little of meeting {self.meeting_id}, "
+                  f"transcribing in full")
+            return None
+
+        print(f"Reusing live transcript for meeting {self.meeting_id}: "
+              f"re-transcribing {redo_seconds:.1f}s of {info.duration:.1f}s in {len(regions)} regions")
+        with sf.SoundFile(str(audio_file)) as audio:
+            for start, end in regions:
+                audio.seek(int(start * self.sample_rate))
+                window = audio.read(int((end - start) * self.sample_rate), dtype='float32')
+                if len(window) == 0:
+                    continue
+                result = transcription_agent.transcribe(window, meeting_id=self.meeting_id,
+                                                        sample_rate=self.sample_rate)
+                if isinstance(result, FallbackTranscript):
+                    return None
+                region_segments = result.get('segments') or []
+                if not region_segments and result.get('text', '').strip():
+                    region_segments = [{'start': 0.0, 'end': end - start, 'text': result['text']}]
+                for segment in region_segments:
+                    segments.append({
+                        'start': start + segment['start'],
+                        'end': min(end, start + segment['end']),
+                        'text': segment['text']
+                    })
+
+        segments.sort(key=lambda segment: segment['start'])
+        languages = self._languages
+        return {
+            'text': ' '.join(segment['text'].strip() for segment in segments),
+            'segments': segments,
+            'language': max(set(languages), key=languages.count) if languages else 'en'
+        }
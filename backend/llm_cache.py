@@ -0,0 +1,52 @@
+"""
+LLM response cache
+Completed LLM responses keyed by provider, model, temperature and prompt, so
+reprocessing the same transcript does not pay for the same prompt again
+"""
+import hashlib
+import json
+import threading
+from cache_store import DiskCache
+from config import Config
+
+
+class LLMResponseCache:
+    """Response text keyed by (provider, model, temperature, prompt hash)"""
+
+    def __init__(self, path=None, ttl_hours=None, max_mb=None):
+        self.store = DiskCache(
+            path or Config.CACHE_DIR / 'llm_responses.db',
+            ttl_seconds=(ttl_hours or Config.CACHE_DURATION_HOURS) * 3600,
+            max_bytes=int((max_mb or Config.LLM_CACHE_MAX_MB) * 1024 * 1024)
+        )
+
+    def make_key(self, provider, model, temperature, prompt, system=None, max_tokens=None):
+        """Stable key for one request; the system prompt and token limit change the response too"""
+        prompt_hash = hashlib.sha256(
+            json.dumps({'system': system, 'prompt': prompt}, sort_keys=True).encode()
+        ).hexdigest()
+        return f"{provider}:{model}:{temperature}:{max_tokens}:{prompt_hash}"
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, response):
+        self.store.set(key, response)
+
+    def get_stats(self):
+        return self.store.get_stats()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """The process-wide response cache, or None when ENABLE_CACHING is off"""
+    global _shared_cache
+    if not Config.ENABLE_CACHING:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache()
+        return _shared_cache
@@ -0,0 +1,296 @@
+"""
+LLM providers
+One shared client per LLM provider for every agent, with pooled connections,
+per-provider concurrency and rate limits, timeouts, retries and response caching
+"""
+import os
+import threading
+import time
+from collections import deque
+from config import Config
+from llm_cache import get_llm_cache
+from model_registry import model_registry
+from summary_chunking import make_token_counter
+
+# Streamed tokens are passed on in batches at most this often
+DELTA_INTERVAL_SECONDS = 0.1
+
+
+def _collect_stream(pieces, on_delta):
+    """Join streamed text pieces, handing them to on_delta as they arrive"""
+    text = []
+    pending = []
+    last_flush = 0.0
+    for piece in pieces:
+        if not piece:
+            continue
+        text.append(piece)
+        pending.append(piece)
+        now = time.monotonic()
+        if on_delta and now - last_flush >= DELTA_INTERVAL_SECONDS:
+            on_delta = _deliver(on_delta, ''.join(pending))
+            pending = []
+            last_flush = now
+    if on_delta and pending:
+        _deliver(on_delta, ''.join(pending))
+    return ''.join(text)
+
+
+def _deliver(on_delta, delta):
+    """Call on_delta; returns it, or None once it has failed so streaming stops quietly"""
+    try:
+        on_delta(delta)
+        return on_delta
+    except Exception as e:
+        print(f"WARNING: Could not forward streamed tokens: {e}")
+        return None
+
+
+class TokenBucket:
+    """Request rate limiter: ``rate_per_minute`` requests, bursts up to ``capacity``"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, rate_per_minute / 6.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate_per_second)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate_per_second
+            time.sleep(wait)
+
+
+class LLMProvider:
+    """A chat/completion model shared by every agent in the process.
+
+    At most ``max_concurrent`` requests run at once and, when
+    ``requests_per_minute`` is set, requests start no faster than that.
+    Responses are cached by prompt (see llm_cache). Subclasses implement
+    ``_request``.
+    """
+
+    kind = None
+    # Context window in tokens when the prompt and completion share a small
+    # one (local models); None for hosted models
+    context_tokens = None
+
+    def __init__(self, name, model, max_concurrent=None, requests_per_minute=None):
+        self.name = name
+        self.model = model
+        self.max_concurrent = max_concurrent or Config.LLM_MAX_CONCURRENT_REQUESTS
+        requests_per_minute = (Config.LLM_REQUESTS_PER_MINUTE if requests_per_minute is None
+                               else requests_per_minute)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrent)
+        self._bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.response_cache = get_llm_cache()
+        self._latencies = deque(maxlen=200)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.waiting = 0
+
+    def complete(self, prompt, max_tokens, temperature, system=None, on_delta=None):
+        """Completion text for a prompt, or None if the request failed
+
+        Streams when on_delta is given; a cached response reaches on_delta
+        as a single delta.
+        """
+        key = None
+        if self.response_cache:
+            key = self.response_cache.make_key(self.name, self.model, temperature, prompt,
+                                               system, max_tokens)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                if on_delta:
+                    _deliver(on_delta, cached)
+                return cached
+
+        with self._stats_lock:
+            self.waiting += 1
+        with self._semaphore:
+            if self._bucket:
+                self._bucket.acquire()
+            with self._stats_lock:
+                self.waiting -= 1
+            started = time.monotonic()
+            try:
+                response = self._request(prompt, max_tokens, temperature, system, on_delta)
+            except Exception as e:
+                print(f"{self.name} request error: {e}")
+                response = None
+            self._record(started, failed=not response)
+
+        if key and response:
+            self.response_cache.set(key, response)
+        return response
+
+    def _request(self, prompt, max_tokens, temperature, system, on_delta):
+        raise NotImplementedError
+
+    def count_tokens(self, text):
+        """Tokens in text for this model (estimated for hosted non-OpenAI models)"""
+        if not hasattr(self, '_token_counter'):
+            self._token_counter = make_token_counter(self.model if self.kind == 'openai' else None)
+        return self._token_counter(text)
+
+    def _record(self, started, failed=False):
+        with self._stats_lock:
+            self.requests += 1
+            if failed:
+                self.failures += 1
+            self._latencies.append(time.monotonic() - started)
+
+    def get_stats(self):
+        """Request counts, queueing and latency percentiles over recent requests"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'provider': self.name,
+                'model': self.model,
+                'requests': self.requests,
+                'failures': self.failures,
+                'waiting': self.waiting,
+                'max_concurrent': self.max_concurrent
+            }
+        if latencies:
+            stats['latency_seconds'] = {
+                'p50': round(latencies[len(latencies) // 2], 3),
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                'max': round(latencies[-1], 3)
+            }
+        return stats
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions, or any OpenAI-compatible API (Euron.one)
+
+    The SDK keeps a pooled HTTP connection and retries rate limits, server
+    errors and dropped connections itself, honouring Retry-After.
+    """
+
+    kind = 'openai'
+
+    def __init__(self, name, model, api_key, base_url=None, **limits):
+        super().__init__(name, model, **limits)
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key, base_url=base_url,
+                             timeout=Config.LLM_TIMEOUT_SECONDS, max_retries=Config.LLM_MAX_RETRIES)
+
+    def _request(self, prompt, max_tokens, temperature, system, on_delta):
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        request = dict(model=self.model, messages=messages, temperature=temperature,
+                       max_tokens=max_tokens)
+        if on_delta:
+            stream = self.client.chat.completions.create(**request, stream=True)
+            return _collect_stream(
+                (chunk.choices[0].delta.content for chunk in stream if chunk.choices), on_delta
+            )
+        response = self.client.chat.completions.create(**request)
+        return response.choices[0].message.content
+
+
+class AnthropicProvider(LLMProvider):
+    """Claude messages API; the SDK pools connections and retries like OpenAI's"""
+
+    kind = 'anthropic'
+
+    def __init__(self, model, api_key, **limits):
+        super().__init__('anthropic', model, **limits)
+        from anthropic import Anthropic
+        self.client = Anthropic(api_key=api_key, timeout=Config.LLM_TIMEOUT_SECONDS,
+                                max_retries=Config.LLM_MAX_RETRIES)
+
+    def _request(self, prompt, max_tokens, temperature, system, on_delta):
+        request = dict(model=self.model, max_tokens=max_tokens, temperature=temperature,
+                       messages=[{"role": "user", "content": prompt}])
+        if system:
+            request['system'] = system
+        if on_delta:
+            with self.client.messages.stream(**request) as stream:
+                return _collect_stream(stream.text_stream, on_delta)
+        response = self.client.messages.create(**request)
+        return response.content[0].text
+
+
+class LocalProvider(LLMProvider):
+    """llama.cpp model from the shared model registry; one request at a time"""
+
+    kind = 'local'
+    stop = ["User:", "Human:"]
+
+    def __init__(self, model_path):
+        super().__init__('local', os.path.basename(model_path), max_concurrent=1, requests_per_minute=0)
+        self.handle = model_registry.llama(model_path)
+        self.context_tokens = Config.LOCAL_MODEL_CONTEXT
+
+    def _request(self, prompt, max_tokens, temperature, system, on_delta):
+        # A raw completion model: the system prompt has no slot of its own
+        with self.handle.use() as llm:
+            if on_delta:
+                chunks = llm(prompt, max_tokens=max_tokens, temperature=temperature,
+                             stop=self.stop, stream=True)
+                return _collect_stream((chunk['choices'][0]['text'] for chunk in chunks), on_delta)
+            response = llm(prompt, max_tokens=max_tokens, temperature=temperature, stop=self.stop)
+        return response['choices'][0]['text']
+
+    def count_tokens(self, text):
+        with self.handle.use() as llm:
+            return len(llm.tokenize(text.encode('utf-8'), add_bos=False))
+
+
+def _create_provider():
+    """The configured provider: local model, Euron.one, OpenAI, then Anthropic"""
+    if Config.USE_LOCAL_MODEL:
+        try:
+            import llama_cpp  # noqa: F401
+            if not os.path.exists(Config.LOCAL_MODEL_PATH):
+                raise FileNotFoundError(f"Local model not found at {Config.LOCAL_MODEL_PATH}")
+            return LocalProvider(Config.LOCAL_MODEL_PATH)
+        except Exception as e:
+            print(f"Error loading local model: {e}")
+            return None
+
+    if Config.USE_EURON_API and Config.EURON_API_KEY:
+        print(f"OK: Using Euron.one API with model: {Config.EURON_MODEL}")
+        return OpenAIProvider('euron', Config.EURON_MODEL, Config.EURON_API_KEY,
+                              base_url=Config.EURON_API_BASE)
+    if Config.OPENAI_API_KEY:
+        print(f"OK: Using official OpenAI API with model: {Config.OPENAI_MODEL}")
+        return OpenAIProvider('openai', Config.OPENAI_MODEL, Config.OPENAI_API_KEY)
+    if Config.ANTHROPIC_API_KEY:
+        try:
+            provider = AnthropicProvider(Config.ANTHROPIC_MODEL, Config.ANTHROPIC_API_KEY)
+        except ImportError:
+            # Optional: only needed when using the Claude API
+            return None
+        print(f"OK: Using Anthropic API with model: {Config.ANTHROPIC_MODEL}")
+        return provider
+    return None
+
+
+_provider = None
+_provider_created = False
+_provider_lock = threading.Lock()
+
+
+def get_llm_provider():
+    """The process-wide LLM provider, or None when no LLM is configured"""
+    global _provider, _provider_created
+    with _provider_lock:
+        if not _provider_created:
+            _provider = _create_provider()
+            _provider_created = True
+        return _provider
@@ -0,0 +1,351 @@
+"""
+Model registry
+Process-wide, lazily loaded Whisper and llama.cpp models shared by all agents
+"""
+import gc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+class ModelHandle:
+    """One shared model: loaded on first use, evictable when idle.
+
+    ``concurrency`` callers may run inference at once. A thread-safe engine
+    (``shared=True``) serves them all from one instance; otherwise each
+    concurrent caller gets its own replica, loaded as demand requires.
+    """
+
+    def __init__(self, kind, name, device, loader, size_estimator=None, concurrency=1,
+                 shared=False):
+        self.kind = kind
+        self.name = name
+        self.device = device
+        self._loader = loader
+        self._size_estimator = size_estimator
+        self.concurrency = max(1, concurrency)
+        self.shared = shared
+        self._models = []
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._lock = threading.RLock()
+        self._in_use = 0
+        self.loaded_at = None
+        self.last_used = None
+        self.load_count = 0
+        self.memory_bytes = 0
+
+    @property
+    def loaded(self):
+        return bool(self._models)
+
+    @property
+    def replicas(self):
+        return len(self._models)
+
+    def load(self):
+        """Load the model if it is not resident yet; returns it"""
+        with self._lock:
+            if not self._models:
+                model = self._load_instance()
+                self._models.append(model)
+                self._idle.append(model)
+            return self._models[0]
+
+    def _load_instance(self):
+        print(f"Loading {self.kind} model ({self.name}) on {self.device}...")
+        started = time.monotonic()
+        rss_before = _process_rss_mb()
+        model = self._loader()
+        size = self._estimate_size(model, rss_before)
+        with self._lock:
+            self.loaded_at = time.time()
+            self.load_count += 1
+            self.memory_bytes += size
+        print(f"OK: {self.kind} model ({self.name}) loaded in "
+              f"{time.monotonic() - started:.1f}s "
+              f"({size / (1024 * 1024):.0f} MB)")
+        return model
+
+    @contextmanager
+    def use(self):
+        """Borrow the model for one inference call.
+
+        Neither PyTorch Whisper nor llama.cpp contexts are safe to run from
+        several threads at once, so those callers each take a replica of
+        their own; CTranslate2 models are shared.
+        """
+        with self._slots:
+            model = self._acquire()
+            try:
+                yield model
+            finally:
+                with self._lock:
+                    self._in_use -= 1
+                    self.last_used = time.time()
+                    if not self.shared and any(m is model for m in self._models):
+                        self._idle.append(model)
+
+    def _acquire(self):
+        with self._lock:
+            if self.shared:
+                model = self.load()
+                self._in_use += 1
+                return model
+            if self._idle:
+                self._in_use += 1
+                return self._idle.pop()
+            # Count the replica being loaded as in use so it is not evicted
+            self._in_use += 1
+        try:
+            model = self._load_instance()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+            raise
+        with self._lock:
+            self._models.append(model)
+        return model
+
+    def evict_if_idle(self, idle_seconds):
+        """Drop the model if nobody used it for idle_seconds; True if evicted"""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if not self._models or self._in_use:
+                return False
+            last_activity = self.last_used or self.loaded_at
+            if time.time() - last_activity < idle_seconds:
+                return False
+            self._models = []
+            self._idle = []
+            self.memory_bytes = 0
+            print(f"Evicted idle {self.kind} model ({self.name})")
+            return True
+        finally:
+            self._lock.release()
+
+    def _estimate_size(self, model, rss_before):
+        if self._size_estimator is None:
+            # Native engines hide their allocations; use the process growth
+            return max(0, int((_process_rss_mb() - rss_before) * 1024 * 1024))
+        try:
+            return int(self._size_estimator(model))
+        except Exception:
+            return 0
+
+    def get_info(self):
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            'device': self.device,
+            'loaded': self.loaded,
+            'replicas': self.replicas,
+            'concurrency': self.concurrency,
+            'memory_mb': round(self.memory_bytes / (1024 * 1024), 1),
+            'load_count': self.load_count,
+            'loaded_at': self.loaded_at,
+            'last_used': self.last_used
+        }
+
+
+def _torch_module_bytes(model):
+    """Parameter and buffer bytes of a torch module"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """Keeps one handle per (kind, name, device) for the whole process"""
+
+    def __init__(self, idle_timeout_minutes=None):
+        if idle_timeout_minutes is None:
+            idle_timeout_minutes = Config.MODEL_IDLE_EVICTION_MINUTES
+        self.idle_timeout_seconds = idle_timeout_minutes * 60
+        self._handles = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def _get_or_create(self, kind, name, device, loader, size_estimator=None, concurrency=1,
+                       shared=False):
+        key = (kind, name, device)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                handle = ModelHandle(kind, name, device, loader, size_estimator, concurrency, shared)
+                self._handles[key] = handle
+                self._start_reaper()
+            return handle
+
+    def whisper(self, size=None, device=None):
+        """Handle for a Whisper model of the given size (tiny, base, small, ...)"""
+        size = size or Config.WHISPER_MODEL_SIZE
+        device = device or self.default_device()
+
+        def load():
+            import whisper
+            return whisper.load_model(size, device=device)
+
+        return self._get_or_create('whisper', size, device, load, _torch_module_bytes,
+                                   concurrency=max(1, Config.WHISPER_MODEL_REPLICAS))
+
+    def faster_whisper(self, size=None, compute_type=None, cpu_threads=None, device=None):
+        """Handle for a CTranslate2 (faster-whisper) model, int8 by default
+
+        CTranslate2 is thread-safe: one instance serves every transcription
+        worker, running up to num_workers transcriptions in parallel.
+        """
+        size = size or Config.WHISPER_MODEL_SIZE
+        compute_type = compute_type or Config.FASTER_WHISPER_COMPUTE_TYPE
+        workers = Config.MAX_CONCURRENT_PROCESSING
+        cpu_threads = (cpu_threads or Config.FASTER_WHISPER_CPU_THREADS
+                       or max(1, (os.cpu_count() or 4) // workers))
+        device = device or self.default_device()
+
+        def load():
+            from faster_whisper import WhisperModel
+            return WhisperModel(size, device=device, compute_type=compute_type,
+                                cpu_threads=cpu_threads, num_workers=workers)
+
+        return self._get_or_create('faster-whisper', f"{size}/{compute_type}", device, load,
+                                   concurrency=workers, shared=True)
+
+    def llama(self, model_path=None, n_ctx=None, n_threads=None):
+        """Handle for a llama.cpp model loaded from a GGUF file"""
+        model_path = model_path or Config.LOCAL_MODEL_PATH
+        n_ctx = n_ctx or Config.LOCAL_MODEL_CONTEXT
+        n_threads = n_threads or Config.LOCAL_MODEL_THREADS
+        device = 'gpu' if Config.ENABLE_GPU_ACCELERATION else 'cpu'
+
+        def load():
+            from llama_cpp import Llama
+            return Llama(
+                model_path=model_path,
+                n_ctx=n_ctx,
+                n_threads=n_threads,
+                n_gpu_layers=-1 if Config.ENABLE_GPU_ACCELERATION else 0
+            )
+
+        # llama.cpp memory-maps the weights, so the file size is what stays resident
+        return self._get_or_create(
+            'llama',
+            f"{os.path.basename(model_path)}@{n_ctx}",
+            device,
+            load,
+            lambda _model: os.path.getsize(model_path)
+        )
+
+    def default_device(self):
+        """cuda when GPU acceleration is enabled and available, else cpu"""
+        if Config.ENABLE_GPU_ACCELERATION:
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    return 'cuda'
+            except ImportError:
+                pass
+        return 'cpu'
+
+    def _start_reaper(self):
+        if self._reaper is not None or self.idle_timeout_seconds <= 0:
+            return
+        self._reaper = threading.Thread(target=self._reap_idle, daemon=True)
+        self._reaper.start()
+
+    def _reap_idle(self):
+        interval = min(60, self.idle_timeout_seconds)
+        while True:
+            time.sleep(interval)
+            self.evict_idle()
+
+    def evict_idle(self):
+        """Unload every model that has been idle longer than the timeout"""
+        with self._lock:
+            handles = list(self._handles.values())
+        evicted = [h for h in handles if h.evict_if_idle(self.idle_timeout_seconds)]
+        if evicted:
+            gc.collect()
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
+        return len(evicted)
+
+    def get_info(self):
+        """Registered models and their resident memory"""
+        with self._lock:
+            handles = list(self._handles.values())
+        models = [h.get_info() for h in handles]
+        return {
+            'models': models,
+            'resident_model_mb': round(sum(m['memory_mb'] for m in models), 1),
+            'process_rss_mb': _process_rss_mb(),
+            'idle_eviction_minutes': self.idle_timeout_seconds / 60
+        }
+
+
+def _process_rss_mb():
+    """Current resident set size of this process (peak RSS on macOS)"""
+    if sys.platform == 'win32':
+        return _windows_working_set_mb()
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes elsewhere
+        divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        return round(peak / divisor, 1)
+
+
+def _windows_working_set_mb():
+    """Working set of this process via GetProcessMemoryInfo, or 0.0 if unavailable"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.WinDLL('kernel32')
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        # K32GetProcessMemoryInfo is the kernel32 export of psapi's GetProcessMemoryInfo
+        get_info = kernel32.K32GetProcessMemoryInfo
+        get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+        get_info.restype = wintypes.BOOL
+        if not get_info(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return 0.0
+        return round(counters.WorkingSetSize / (1024 * 1024), 1)
+    except (OSError, AttributeError):
+        return 0.0
+
+
+# Shared by every agent in the process
+model_registry = ModelRegistry()
@@ -2,8 +2,9 @@
 Database models for the AI Meeting Summarizer
 """
 import json
+import math
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -24,15 +25,23 @@ class Meeting(Base):
     # Relationships
     action_items = relationship('ActionItem', back_populates='meeting', cascade='all, delete-orphan')
     participants = relationship('Participant', back_populates='meeting', cascade='all, delete-orphan')
+    # Queried in pages rather than loaded whole
+    segments = relationship('TranscriptSegment', back_populates='meeting', cascade='all, delete-orphan',
+                            lazy='dynamic', order_by='TranscriptSegment.start')
     
     def end_meeting(self):
         """Mark meeting as ended"""
         self.end_time = datetime.utcnow()
     
-    def to_dict(self):
-        """Convert to dictionary"""
+    def to_dict(self, include_transcript=True):
+        """Convert to dictionary
+        
+        Args:
+            include_transcript: Parse and include the full transcript; lists
+                leave it out and page through the segments instead
+        """
         # Parse transcript from JSON string if needed
-        transcript = self.transcript
+        transcript = self.transcript if include_transcript else None
         if transcript and isinstance(transcript, str):
             try:
                 transcript = json.loads(transcript)
@@ -115,3 +124,66 @@ class Participant(Base):
             'role': self.role
         }
 
+
+
+class TranscriptSegment(Base):
+    """Timed transcript segment, stored per row so long transcripts can be paged"""
+    __tablename__ = 'transcript_segments'
+    __table_args__ = (
+        Index('ix_transcript_segments_meeting_start', 'meeting_id', 'start'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    meeting_id = Column(Integer, ForeignKey('meetings.id'), nullable=False)
+    start = Column(Float, nullable=False)  # seconds from the start of the recording
+    end = Column(Float, nullable=False)
+    text = Column(Text, nullable=False)
+    speaker = Column(String(100), nullable=True)
+    confidence = Column(Float, nullable=True)  # 0-1
+    
+    # Relationships
+    meeting = relationship('Meeting', back_populates='segments')
+    
+    @staticmethod
+    def rows_from_transcript(meeting_id, transcript):
+        """Insert mappings for a transcript dict's timed segments"""
+        rows = []
+        for segment in (transcript or {}).get('segments') or []:
+            text = (segment.get('text') or '').strip()
+            if not text:
+                continue
+            confidence = segment.get('confidence')
+            if confidence is None and segment.get('avg_logprob') is not None:
+                confidence = math.exp(segment['avg_logprob'])
+            rows.append({
+                'meeting_id': meeting_id,
+                'start': float(segment['start']),
+                'end': float(segment['end']),
+                'text': text,
+                'speaker': segment.get('speaker'),
+                'confidence': confidence
+            })
+        return rows
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'start': self.start,
+            'end': self.end,
+            'text': self.text,
+            'speaker': self.speaker,
+            'confidence': self.confidence
+        }
+
+
+class ImportedRecording(Base):
+    """Source file of a bulk-imported meeting, so the same file is not imported twice"""
+    __tablename__ = 'imported_recordings'
+    
+    id = Column(Integer, primary_key=True)
+    source_path = Column(String(1000), nullable=False, unique=True)
+    size = Column(Integer, nullable=False)
+    modified_at = Column(Float, nullable=False)  # st_mtime of the source
+    meeting_id = Column(Integer, ForeignKey('meetings.id'), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,187 @@
+"""
+Recording session
+Per-meeting capture state: input stream, ring buffer, disk writer and stats
+"""
+import time
+from datetime import datetime
+import numpy as np
+import sounddevice as sd
+from config import Config
+from audio_buffer import AudioRingBuffer
+from audio_writer import StreamingAudioWriter
+from audio_pipeline import CANONICAL_SAMPLE_RATE, CanonicalAudioStage
+
+# Native-rate audio waiting for conversion; a few seconds covers any stall
+CAPTURE_BUFFER_SECONDS = 5
+
+
+class RecordingSession:
+    """One meeting being captured from one input device.
+
+    Everything the real-time callback touches lives in slots on this
+    object, so each callback is a couple of attribute reads and a copy into
+    the preallocated capture ring buffer, which doubles as the session's
+    lock-free queue. Audio is captured at the device's native rate and
+    converted once, off the callback thread, into the canonical 16 kHz mono
+    ``buffer`` that the live transcriber and the disk writer each drain
+    through their own cursor. Several sessions can run at once on different
+    devices.
+    """
+
+    __slots__ = (
+        'meeting_id', 'device', 'device_name', 'capture_rate', 'capture_channels',
+        'sample_rate', 'channels', 'capture_buffer', 'pipeline', 'buffer',
+        'writer', 'stream', 'recording', 'started_at',
+        'callbacks', 'frames_captured', 'overflows', 'max_callback_ms'
+    )
+
+    def __init__(self, meeting_id, device=None):
+        self.meeting_id = meeting_id
+        self.device = device
+        device_info = sd.query_devices(device, 'input')
+        self.device_name = device_info['name']
+        if Config.AUDIO_CAPTURE_NATIVE_RATE:
+            self.capture_rate = int(device_info['default_samplerate'])
+        else:
+            self.capture_rate = Config.SAMPLE_RATE
+        self.capture_channels = max(1, min(Config.CHANNELS, device_info['max_input_channels']))
+
+        # Consumers only ever see the canonical stream
+        self.sample_rate = CANONICAL_SAMPLE_RATE
+        self.channels = 1
+        self.stream = None
+        self.recording = False
+        self.started_at = None
+
+        self.callbacks = 0
+        self.frames_captured = 0
+        self.overflows = 0
+        self.max_callback_ms = 0.0
+
+        # Preallocate the capture buffer once; the callback only copies into it.
+        # It only has to absorb the conversion thread's scheduling jitter
+        self.capture_buffer = AudioRingBuffer(
+            CAPTURE_BUFFER_SECONDS * self.capture_rate,
+            channels=self.capture_channels
+        )
+        self.capture_buffer.add_reader('pipeline')
+
+        self.buffer = AudioRingBuffer(
+            Config.AUDIO_BUFFER_SECONDS * self.sample_rate,
+            channels=self.channels
+        )
+        self.pipeline = CanonicalAudioStage(
+            self.capture_buffer,
+            'pipeline',
+            self.capture_rate,
+            self.buffer
+        )
+        self.buffer.add_reader('live')
+        self.buffer.add_reader('archive')
+
+        # Stream the recording to disk while it is captured
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = Config.AUDIO_FORMAT.lower()
+        filepath = Config.AUDIO_DIR / f"meeting_{meeting_id}_{timestamp}.{extension}"
+        self.writer = StreamingAudioWriter(
+            self.buffer,
+            'archive',
+            filepath,
+            self.sample_rate,
+            self.channels,
+            audio_format=extension,
+            sync_interval=Config.AUDIO_SYNC_INTERVAL_SECONDS
+        )
+
+    def audio_callback(self, indata, frames, time_info, status):
+        """sounddevice callback; runs on the PortAudio thread"""
+        started = time.perf_counter()
+        if status:
+            if status.input_overflow:
+                self.overflows += 1
+            print(f"Audio callback status ({self.device_name}): {status}")
+        if self.recording:
+            self.capture_buffer.write(indata)
+            self.frames_captured += frames
+        self.callbacks += 1
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > self.max_callback_ms:
+            self.max_callback_ms = elapsed_ms
+
+    def start(self):
+        """Open the input device and start capturing"""
+        buffer_mb = (self.capture_buffer.nbytes + self.buffer.nbytes) / (1024 * 1024)
+        print(f"Allocated {buffer_mb:.1f} MB of audio buffers for meeting {self.meeting_id} "
+              f"on {self.device_name} ({self.capture_rate} Hz, {self.capture_channels} ch)")
+        self.writer.start()
+        self.pipeline.start()
+        self.recording = True
+        self.started_at = time.time()
+        try:
+            self.stream = sd.InputStream(
+                device=self.device,
+                samplerate=self.capture_rate,
+                channels=self.capture_channels,
+                callback=self.audio_callback,
+                dtype=np.float32
+            )
+            self.stream.start()
+        except Exception:
+            self.recording = False
+            self.pipeline.stop()
+            self.writer.stop()
+            raise
+
+    def stop(self):
+        """Close the stream and finalize the recording file; returns its path"""
+        self.recording = False
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+        # Both stages have kept up all along; only the tail is left
+        self.pipeline.stop()
+        filepath = self.writer.stop()
+        dropped = self.buffer.dropped_frames('archive')
+        if dropped:
+            print(f"WARNING: Audio writer fell behind, {dropped} frames lost")
+        return filepath
+
+    def get_stats(self):
+        """Capture statistics for monitoring"""
+        return {
+            'meeting_id': self.meeting_id,
+            'device': self.device_name,
+            'capture_rate': self.capture_rate,
+            'capture_channels': self.capture_channels,
+            'sample_rate': self.sample_rate,
+            'recording': self.recording,
+            'duration_seconds': self.frames_captured / self.capture_rate,
+            'callbacks': self.callbacks,
+            'overflows': self.overflows,
+            'max_callback_ms': round(self.max_callback_ms, 3),
+            'buffer_mb': round((self.capture_buffer.nbytes + self.buffer.nbytes) / (1024 * 1024), 1),
+            'live_backlog_seconds': self.buffer.available('live') / self.sample_rate,
+            'dropped_frames': {
+                'pipeline': self.capture_buffer.dropped_frames('pipeline'),
+                'live': self.buffer.dropped_frames('live'),
+                'archive': self.buffer.dropped_frames('archive')
+            }
+        }
+
+
+def list_input_devices():
+    """Input devices available for recording"""
+    default_input = sd.default.device[0]
+    devices = []
+    for index, device in enumerate(sd.query_devices()):
+        if device['max_input_channels'] > 0:
+            devices.append({
+                'index': index,
+                'name': device['name'],
+                'channels': device['max_input_channels'],
+                'default_sample_rate': device['default_samplerate'],
+                'is_default': index == default_input
+            })
+    return devices
@@ -0,0 +1,211 @@
+"""
+Segmented transcription
+Splits long recordings at pauses and transcribes the pieces in parallel processes
+"""
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import soundfile as sf
+from config import Config
+from audio_pipeline import downmix, to_canonical
+from decode_profiles import whisper_kwargs
+from vad import VoiceActivityDetector
+
+# Audio read on each side of a cut so words on the boundary are heard whole
+BOUNDARY_OVERLAP_SECONDS = 1.0
+
+# Model loaded once per worker process by _init_worker
+_worker_model = None
+_worker_backend = None
+
+# Worker pool shared by every recording in the server process
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def default_workers():
+    """Half the cores: each worker also runs a few inference threads"""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def plan_segments(filepath, segment_seconds=120.0, block_seconds=0.5):
+    """Pick cut points near every ``segment_seconds`` that fall in silence.
+
+    The file is scanned with the VAD in the same short blocks the live path
+    feeds it, which keeps its noise floor tracking pauses. Around each target
+    position the longest pause within a quarter segment either way is
+    chosen and the cut goes in its middle; during continuous speech the
+    cut falls on the target itself. Returns (start, end) pairs in seconds.
+    """
+    info = sf.info(str(filepath))
+    detector = VoiceActivityDetector(info.samplerate, min_energy_db=Config.VAD_ENERGY_THRESHOLD_DB)
+    frame_length = detector.frame_length
+    frame_seconds = frame_length / info.samplerate
+
+    block_frames = max(1, int(block_seconds * info.samplerate) // frame_length) * frame_length
+    masks = []
+    for block in sf.blocks(str(filepath), blocksize=block_frames, dtype='float32', always_2d=True):
+        mono = downmix(block)
+        n_frames = len(mono) // frame_length
+        if n_frames:
+            masks.append(detector.speech_mask(mono[:n_frames * frame_length].reshape(n_frames, frame_length)))
+    speech = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+
+    duration = info.frames / info.samplerate
+    segment_frames = max(1, int(segment_seconds / frame_seconds))
+    search_frames = segment_frames // 4
+
+    cuts = [0]
+    while len(speech) - cuts[-1] > segment_frames + search_frames:
+        target = cuts[-1] + segment_frames
+        lo, hi = target - search_frames, min(len(speech), target + search_frames)
+        cuts.append(_longest_pause_middle(speech[lo:hi]) + lo if not speech[lo:hi].all() else target)
+
+    bounds = [cut * frame_seconds for cut in cuts] + [duration]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _longest_pause_middle(mask):
+    """Index at the centre of the longest run of silent frames"""
+    silent = np.concatenate(([0], (~mask).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(silent))
+    starts, ends = edges[0::2], edges[1::2]
+    longest = np.argmax(ends - starts)
+    return int((starts[longest] + ends[longest]) // 2)
+
+
+def _init_worker(backend, model_size, threads):
+    """Load this worker's own model; runs once per process"""
+    global _worker_model, _worker_backend
+    _worker_backend = backend
+    if backend == 'faster-whisper':
+        from faster_whisper import WhisperModel
+        _worker_model = WhisperModel(model_size, device='cpu',
+                                     compute_type=Config.FASTER_WHISPER_COMPUTE_TYPE,
+                                     cpu_threads=threads)
+    else:
+        import torch
+        import whisper
+        torch.set_num_threads(threads)
+        _worker_model = whisper.load_model(model_size, device='cpu')
+
+
+def _transcribe_segment(filepath, start, end, duration, decode_options=None):
+    """Transcribe [start, end) plus overlap; returns segments owned by this range"""
+    read_start = max(0.0, start - BOUNDARY_OVERLAP_SECONDS)
+    read_end = min(duration, end + BOUNDARY_OVERLAP_SECONDS)
+    with sf.SoundFile(str(filepath)) as audio:
+        samplerate = audio.samplerate
+        audio.seek(int(read_start * samplerate))
+        window = audio.read(int((read_end - read_start) * samplerate), dtype='float32')
+    audio_input = to_canonical(window, samplerate)
+
+    kwargs = whisper_kwargs(_worker_backend, decode_options)
+    if _worker_backend == 'faster-whisper':
+        segments_iter, info = _worker_model.transcribe(audio_input, **kwargs)
+        raw = [(s.start, s.end, s.text) for s in segments_iter]
+        language = info.language
+    else:
+        result = _worker_model.transcribe(audio_input, **kwargs)
+        raw = [(s['start'], s['end'], s['text']) for s in result.get('segments', [])]
+        language = result.get('language')
+
+    # The overlap is heard twice; each range keeps what is centred inside it
+    segments = []
+    for seg_start, seg_end, text in raw:
+        seg_start += read_start
+        seg_end += read_start
+        if start <= (seg_start + seg_end) / 2 < end:
+            segments.append({'start': seg_start, 'end': seg_end, 'text': text})
+    return {'segments': segments, 'language': language}
+
+
+def _normalize(text):
+    return re.sub(r'[^\w\s]', '', text).lower().split()
+
+
+def merge_results(results):
+    """Join per-range results in order, dropping text repeated across a cut"""
+    segments = []
+    languages = []
+    for result in results:
+        if result['language']:
+            languages.append(result['language'])
+        for segment in result['segments']:
+            if segments and _normalize(segment['text']) == _normalize(segments[-1]['text']):
+                segments[-1]['end'] = max(segments[-1]['end'], segment['end'])
+                continue
+            segments.append(segment)
+
+    language = max(set(languages), key=languages.count) if languages else 'en'
+    return {
+        'text': ''.join(segment['text'] for segment in segments).strip(),
+        'segments': segments,
+        'language': language
+    }
+
+
+def _get_pool(backend, model_size, workers=None):
+    """The process-wide worker pool, created on first use and kept warm
+
+    Workers are spawned rather than forked, so they start clean of the
+    server's threads, and each keeps its own copy of the model loaded
+    between recordings. The pool is rebuilt only when the backend or
+    model changes, or after a worker died.
+    """
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None and _pool_key != (backend, model_size):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            workers = workers or Config.LONG_AUDIO_WORKERS or default_workers()
+            threads = max(1, (os.cpu_count() or 2) // workers)
+            print(f"Starting {workers} transcription processes ({threads} threads each)")
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(backend, model_size, threads)
+            )
+            _pool_key = (backend, model_size)
+        return _pool
+
+
+def _discard_pool(pool):
+    """Forget a broken pool so the next recording starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def transcribe_segmented(filepath, backend, model_size, workers=None, segment_seconds=None,
+                         decode_options=None):
+    """Transcribe a long recording across the shared pool of processes.
+
+    Recordings processed at the same time share the pool's workers;
+    workers only sizes the pool when it is first created.
+    decode_options carries the meeting's language and decode profile.
+    """
+    segment_seconds = segment_seconds or Config.LONG_AUDIO_SEGMENT_SECONDS
+    ranges = plan_segments(filepath, segment_seconds)
+    duration = ranges[-1][1] if ranges else 0.0
+    pool = _get_pool(backend, model_size, workers)
+    print(f"Transcribing {duration / 60:.1f} min in {len(ranges)} segments")
+
+    try:
+        futures = [
+            pool.submit(_transcribe_segment, str(filepath), start, end, duration, decode_options)
+            for start, end in ranges
+        ]
+        return merge_results([future.result() for future in futures])
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
@@ -0,0 +1,92 @@
+"""
+Summary chunking
+Token-aware splitting of long transcripts for map-reduce summarization
+"""
+import re
+
+# tiktoken ships with openai-whisper; without it token counts are estimated
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Conservative characters per token for the estimate (English prose is ~4)
+CHARS_PER_TOKEN = 3.5
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def estimate_tokens(text):
+    """Rough token count when no tokenizer is available"""
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def make_token_counter(model_name=None):
+    """Callable(text) -> tokens for an API model, via tiktoken where possible"""
+    if tiktoken is None:
+        return estimate_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(model_name or '')
+    except KeyError:
+        # Unknown or non-OpenAI model; cl100k is close enough for budgeting
+        encoding = tiktoken.get_encoding('cl100k_base')
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _sentences(text):
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def _split_long(sentence, max_tokens, count_tokens):
+    """Break a sentence longer than max_tokens at word boundaries
+
+    Each word is counted once, with its leading space, and the totals
+    summed, so long unpunctuated ASR output is not re-tokenized per word.
+    """
+    pieces = []
+    words = []
+    total = 0
+    for word in sentence.split():
+        tokens = count_tokens(' ' + word)
+        if words and total + tokens > max_tokens:
+            pieces.append(' '.join(words))
+            words = []
+            total = 0
+        words.append(word)
+        total += tokens
+    if words:
+        pieces.append(' '.join(words))
+    return pieces
+
+
+def pack(texts, max_tokens, count_tokens, separator='\n\n'):
+    """Group consecutive texts so each group stays within max_tokens
+
+    A single text longer than max_tokens gets a group of its own.
+    """
+    separator_tokens = count_tokens(separator)
+    groups = []
+    current = []
+    current_tokens = 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if current and current_tokens + separator_tokens + tokens > max_tokens:
+            groups.append(current)
+            current = []
+            current_tokens = 0
+        current_tokens += tokens + (separator_tokens if current else 0)
+        current.append(text)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def split_transcript(text, max_tokens, count_tokens):
+    """Split a transcript into chunks of at most max_tokens, at sentence boundaries"""
+    sentences = []
+    for sentence in _sentences(text):
+        if count_tokens(sentence) > max_tokens:
+            sentences.extend(_split_long(sentence, max_tokens, count_tokens))
+        else:
+            sentences.append(sentence)
+    return [' '.join(group) for group in pack(sentences, max_tokens, count_tokens, separator=' ')]
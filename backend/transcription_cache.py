@@ -0,0 +1,48 @@
+"""
+Transcription cache
+Content-addressed store of finished transcripts, so the same audio is never
+transcribed twice with the same settings
+"""
+import hashlib
+import json
+from cache_store import DiskCache
+from config import Config
+
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def hash_audio_file(filepath):
+    """SHA-256 of a file's bytes, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """Transcripts keyed by audio content hash, backend, model, language and options"""
+
+    def __init__(self, path=None, ttl_hours=None, max_mb=None):
+        self.store = DiskCache(
+            path or Config.CACHE_DIR / 'transcriptions.db',
+            ttl_seconds=(ttl_hours or Config.CACHE_DURATION_HOURS) * 3600,
+            max_bytes=int((max_mb or Config.TRANSCRIPTION_CACHE_MAX_MB) * 1024 * 1024)
+        )
+
+    def make_key(self, audio_hash, backend, model, language, options=None):
+        """Stable key for one audio file transcribed with one configuration"""
+        settings = json.dumps(
+            {'backend': backend, 'model': model, 'language': language, 'options': options or {}},
+            sort_keys=True
+        )
+        return f"{audio_hash}:{hashlib.sha256(settings.encode()).hexdigest()[:16]}"
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, result):
+        self.store.set(key, result)
+
+    def get_stats(self):
+        return self.store.get_stats()
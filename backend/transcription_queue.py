@@ -0,0 +1,237 @@
+"""
+Transcription work queue
+Bounded queue and shared worker pool that decouple audio capture from transcription
+"""
+import threading
+import time
+from collections import deque
+import numpy as np
+from config import Config
+
+
+class ChunkDropped(Exception):
+    """Passed to a job's callback when backpressure discarded it"""
+
+
+class TranscriptionJob:
+    """One live chunk waiting to be transcribed.
+
+    ``spans`` places the audio on the recording timeline as
+    (chunk_frame, stream_frame, frames) runs.
+    """
+
+    __slots__ = ('meeting_id', 'audio', 'sample_rate', 'callback', 'enqueued_at',
+                 'coalesced', 'fast', 'spans')
+
+    def __init__(self, meeting_id, audio, sample_rate, callback, spans=None):
+        self.meeting_id = meeting_id
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self.callback = callback
+        self.enqueued_at = time.monotonic()
+        self.coalesced = 1
+        self.fast = False
+        self.spans = spans or []
+
+
+class TranscriptionWorkerPool:
+    """Bounded job queue drained by a fixed set of worker threads.
+
+    Jobs for the same meeting are processed one at a time and in order,
+    so live captions never arrive out of sequence; different meetings
+    transcribe in parallel. When the queue is full the backpressure policy
+    decides what gives:
+
+    - ``drop_oldest``: discard the oldest queued chunk
+    - ``coalesce``: merge the new chunk into the meeting's newest queued
+      chunk so one longer transcription replaces two (falls back to
+      dropping the oldest when the meeting has nothing queued)
+    - ``degrade``: like ``drop_oldest`` when full, but while the backlog is
+      at least half the queue size jobs are transcribed with the fast model
+    """
+
+    POLICIES = ('drop_oldest', 'coalesce', 'degrade')
+
+    def __init__(self, transcription_agent, workers=None, max_queue=None, policy=None):
+        self.transcription_agent = transcription_agent
+        self.workers = workers or Config.MAX_CONCURRENT_PROCESSING
+        self.max_queue = max_queue or Config.LIVE_QUEUE_SIZE
+        self.policy = policy or Config.LIVE_BACKPRESSURE_POLICY
+        if self.policy not in self.POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {self.policy}")
+
+        self._jobs = deque()
+        self._busy_meetings = set()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._running = False
+
+        self._waits = deque(maxlen=500)
+        self._stats = {
+            'submitted': 0,
+            'processed': 0,
+            'failed': 0,
+            'dropped': 0,
+            'coalesced': 0,
+            'degraded': 0
+        }
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"transcription-worker-{index}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        """Stop the workers once they finish their current job"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, meeting_id, audio, sample_rate, callback, spans=None):
+        """Queue a chunk for transcription
+        
+        The callback runs on a worker thread as
+        callback(job, result, error, queue_wait=..., processing_time=...).
+        A chunk discarded by backpressure gets error=ChunkDropped instead.
+        """
+        self.start()
+        job = TranscriptionJob(meeting_id, audio, sample_rate, callback, spans)
+        dropped = None
+
+        with self._condition:
+            self._stats['submitted'] += 1
+            if len(self._jobs) >= self.max_queue:
+                absorbed, dropped = self._apply_backpressure(job)
+                if absorbed:
+                    return
+            self._jobs.append(job)
+            self._condition.notify()
+
+        if dropped is not None:
+            try:
+                dropped.callback(dropped, None, ChunkDropped("Transcription queue full"))
+            except Exception as e:
+                print(f"[LIVE] Error in transcription callback: {e}")
+
+    def _apply_backpressure(self, job):
+        """Make room for a job in a full queue.
+        
+        Returns (absorbed, dropped): whether the job was merged into a queued
+        one, and the job evicted to make room, if any.
+        """
+        if self.policy == 'coalesce':
+            for queued in reversed(self._jobs):
+                if queued.meeting_id == job.meeting_id and queued.sample_rate == job.sample_rate:
+                    offset = len(queued.audio)
+                    queued.audio = np.concatenate([queued.audio, job.audio], axis=0)
+                    queued.spans = queued.spans + [
+                        (chunk_frame + offset, stream_frame, frames)
+                        for chunk_frame, stream_frame, frames in job.spans
+                    ]
+                    queued.coalesced += 1
+                    self._stats['coalesced'] += 1
+                    return True, None
+
+        dropped = self._jobs.popleft()
+        self._stats['dropped'] += 1
+        print(f"[LIVE] Transcription queue full, dropped a chunk from meeting {dropped.meeting_id}")
+        return False, dropped
+
+    def wait_for_meeting(self, meeting_id, timeout=None):
+        """Block until a meeting has nothing queued or in progress; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while (meeting_id in self._busy_meetings or
+                   any(job.meeting_id == meeting_id for job in self._jobs)):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _next_job(self):
+        """Oldest job whose meeting is not already being transcribed"""
+        for job in self._jobs:
+            if job.meeting_id not in self._busy_meetings:
+                self._jobs.remove(job)
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                job = self._next_job() if self._running else None
+                while job is None:
+                    if not self._running:
+                        return
+                    self._condition.wait()
+                    job = self._next_job() if self._running else None
+
+                self._busy_meetings.add(job.meeting_id)
+                wait = time.monotonic() - job.enqueued_at
+                self._waits.append(wait)
+                if self.policy == 'degrade' and len(self._jobs) >= self.max_queue // 2:
+                    job.fast = True
+                    self._stats['degraded'] += 1
+
+            result, error = None, None
+            started = time.monotonic()
+            try:
+                result = self.transcription_agent.transcribe(
+                    job.audio,
+                    meeting_id=job.meeting_id,
+                    sample_rate=job.sample_rate,
+                    fast=job.fast
+                )
+            except Exception as e:
+                error = e
+            elapsed = time.monotonic() - started
+
+            print(f"[LIVE] Chunk for meeting {job.meeting_id}: "
+                  f"waited {wait:.2f}s, transcribed in {elapsed:.2f}s")
+            try:
+                job.callback(job, result, error, queue_wait=wait, processing_time=elapsed)
+            except Exception as e:
+                print(f"[LIVE] Error in transcription callback: {e}")
+
+            # Release the meeting only after its callback so results stay ordered
+            with self._condition:
+                self._busy_meetings.discard(job.meeting_id)
+                self._stats['processed' if error is None else 'failed'] += 1
+                self._condition.notify_all()
+
+    def get_stats(self):
+        """Queue depth, counters and queue-wait percentiles in seconds"""
+        with self._condition:
+            waits = sorted(self._waits)
+            stats = dict(self._stats)
+            stats.update({
+                'policy': self.policy,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queued': len(self._jobs),
+                'in_progress': len(self._busy_meetings)
+            })
+
+        if waits:
+            stats['queue_wait'] = {
+                'p50': waits[len(waits) // 2],
+                'p95': waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+                'max': waits[-1]
+            }
+        else:
+            stats['queue_wait'] = {'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+        return stats
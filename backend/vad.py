@@ -0,0 +1,235 @@
+"""
+Voice activity detection
+Numpy-only speech detection and pause-aligned chunking for live transcription
+"""
+from collections import deque
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """Frame-level speech detector based on short-time energy and zero crossings.
+
+    Frames are classified in one vectorized pass. The energy threshold
+    adapts to the room: it sits ``margin_db`` above the noise floor, taken
+    as the quietest frames seen over the last ``floor_window_ms`` (speech
+    always has gaps between words), but never below ``min_energy_db``.
+    Quieter frames with a high zero-crossing rate (fricatives such as "s"
+    and "f") still count as speech.
+    """
+
+    def __init__(self, sample_rate, frame_ms=30, min_energy_db=-45.0,
+                 margin_db=10.0, zcr_threshold=0.25, hangover_ms=200,
+                 floor_window_ms=5000):
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.min_energy_db = min_energy_db
+        self.margin_db = margin_db
+        self.zcr_threshold = zcr_threshold
+        self.hangover_frames = max(0, int(hangover_ms / frame_ms))
+        self.floor_window_frames = max(1, int(floor_window_ms / frame_ms))
+        self.noise_floor_db = None
+        self._floor_history = deque()
+        self._floor_history_frames = 0
+        self._hangover_left = 0
+
+    def frame_features(self, frames):
+        """Energy (dB) and zero-crossing rate for a (n_frames, frame_length) array"""
+        energy = np.mean(frames * frames, axis=1)
+        energy_db = 10.0 * np.log10(energy + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        return energy_db, zcr
+
+    def speech_mask(self, frames):
+        """Classify each frame as speech (True) or silence (False)"""
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool)
+
+        energy_db, zcr = self.frame_features(frames)
+
+        self._update_noise_floor(energy_db)
+        threshold = max(self.min_energy_db, self.noise_floor_db + self.margin_db)
+        mask = (energy_db > threshold) | (
+            (energy_db > threshold - self.margin_db / 2) & (zcr > self.zcr_threshold)
+        )
+
+        return self._apply_hangover(mask)
+
+    def _update_noise_floor(self, energy_db):
+        """Minimum statistics over a sliding window of recent blocks"""
+        self._floor_history.append((len(energy_db), float(np.percentile(energy_db, 5))))
+        self._floor_history_frames += len(energy_db)
+        while (len(self._floor_history) > 1 and
+               self._floor_history_frames - self._floor_history[0][0] >= self.floor_window_frames):
+            self._floor_history_frames -= self._floor_history.popleft()[0]
+        self.noise_floor_db = min(floor for _, floor in self._floor_history)
+
+    def _apply_hangover(self, mask):
+        """Keep a few frames after each voiced frame so word tails are not clipped"""
+        if self.hangover_frames == 0:
+            return mask
+
+        # Carry the hangover from the previous block, then extend every voiced
+        # frame forward by hangover_frames using a running maximum
+        voiced_idx = np.where(mask, np.arange(len(mask)), -1)
+        last_voiced = np.maximum.accumulate(voiced_idx)
+        since_voiced = np.arange(len(mask)) - last_voiced
+        extended = (last_voiced >= 0) & (since_voiced <= self.hangover_frames)
+
+        carry = np.arange(len(mask)) < self._hangover_left
+        extended |= carry
+
+        if last_voiced[-1] >= 0:
+            self._hangover_left = max(0, self.hangover_frames - (len(mask) - 1 - last_voiced[-1]))
+        else:
+            self._hangover_left = max(0, self._hangover_left - len(mask))
+
+        return extended
+
+
+class SpeechChunk:
+    """Chunk samples plus where they came from in the input stream.
+
+    ``spans`` lists (chunk_frame, stream_frame, frames) runs; there is more
+    than one when silence inside the chunk was dropped.
+    """
+
+    __slots__ = ('samples', 'spans')
+
+    def __init__(self, samples, spans):
+        self.samples = samples
+        self.spans = spans
+
+
+class SpeechChunker:
+    """Groups voiced audio into transcription chunks that end on natural pauses.
+
+    Silence outside speech is dropped. Pauses shorter than ``pause_ms`` are
+    kept inside a chunk; a longer pause closes the chunk once it holds at
+    least ``min_chunk_seconds`` of audio, and a chunk is force-closed at
+    ``max_chunk_seconds`` during continuous speech. Chunks are returned as
+    ``SpeechChunk`` objects so their audio can be placed on the recording's
+    timeline.
+    """
+
+    def __init__(self, sample_rate, min_chunk_seconds=3.0, max_chunk_seconds=15.0,
+                 pause_ms=500, detector=None):
+        self.detector = detector or VoiceActivityDetector(sample_rate)
+        self.frame_length = self.detector.frame_length
+        self.min_frames = int(min_chunk_seconds * sample_rate / self.frame_length)
+        self.max_frames = max(1, int(max_chunk_seconds * sample_rate / self.frame_length))
+        self.pause_frames = max(1, int(pause_ms * sample_rate / 1000 / self.frame_length))
+
+        self._pending = None
+        self._chunk = []
+        self._spans = []
+        self._base = 0
+        self.stream_position = 0
+        self._chunk_frames = 0
+        self._voiced_frames = 0
+        self._silence_run = 0
+        self.frames_seen = 0
+        self.frames_dropped = 0
+
+    def feed(self, samples):
+        """Add captured samples; returns the list of SpeechChunks closed by them"""
+        samples = samples.reshape(len(samples), -1)
+        if self._pending is not None and len(self._pending):
+            samples = np.concatenate([self._pending, samples], axis=0)
+
+        n_frames = len(samples) // self.frame_length
+        usable = n_frames * self.frame_length
+        self._pending = samples[usable:]
+        if n_frames == 0:
+            return []
+        # Stream sample index of the first frame in this batch
+        self._base = self.stream_position
+        self.stream_position += usable
+
+        frames = samples[:usable].reshape(n_frames, self.frame_length, -1)
+        mono = frames.mean(axis=2)
+        mask = self.detector.speech_mask(mono)
+        self.frames_seen += n_frames
+
+        completed = []
+        # Walk runs of equal classification rather than individual frames
+        boundaries = np.flatnonzero(np.diff(mask.astype(np.int8))) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [n_frames]))
+
+        for start, end in zip(starts, ends):
+            if mask[start]:
+                self._add_speech(frames, start, end, completed)
+            else:
+                self._add_silence(frames, start, end, completed)
+
+        return completed
+
+    def _add_speech(self, frames, start, end, completed):
+        while start < end:
+            room = self.max_frames - self._chunk_frames
+            if room <= 0:
+                completed.append(self._close())
+                continue
+            take = min(room, end - start)
+            self._append(frames, start, take, voiced=True)
+            start += take
+            if self._chunk_frames >= self.max_frames:
+                completed.append(self._close())
+
+    def _add_silence(self, frames, start, end, completed):
+        if not self._chunk:
+            self.frames_dropped += end - start
+            return
+
+        # Keep short pauses inside the chunk, drop the rest of a long one;
+        # a pause never grows the chunk past max_frames
+        keep = max(0, min(end - start, self.pause_frames - self._silence_run,
+                          self.max_frames - self._chunk_frames))
+        if keep > 0:
+            self._append(frames, start, keep, voiced=False)
+        self.frames_dropped += (end - start) - keep
+
+        if self._chunk_frames >= self.max_frames or (
+                self._silence_run >= self.pause_frames and self._voiced_frames >= self.min_frames):
+            completed.append(self._close())
+
+    def _append(self, frames, start, count, voiced):
+        self._chunk.append(frames[start:start + count].reshape(-1, frames.shape[2]))
+
+        # Extend the current span when this audio directly follows it
+        chunk_frame = self._chunk_frames * self.frame_length
+        stream_frame = self._base + start * self.frame_length
+        length = count * self.frame_length
+        if self._spans and self._spans[-1][1] + self._spans[-1][2] == stream_frame:
+            last_chunk, last_stream, last_length = self._spans[-1]
+            self._spans[-1] = (last_chunk, last_stream, last_length + length)
+        else:
+            self._spans.append((chunk_frame, stream_frame, length))
+
+        self._chunk_frames += count
+        if voiced:
+            self._voiced_frames += count
+            self._silence_run = 0
+        else:
+            self._silence_run += count
+
+    def _close(self):
+        chunk = SpeechChunk(np.concatenate(self._chunk, axis=0), self._spans)
+        self._chunk = []
+        self._spans = []
+        self._chunk_frames = 0
+        self._voiced_frames = 0
+        self._silence_run = 0
+        return chunk
+
+    def flush(self):
+        """Close and return whatever speech is still buffered, or None"""
+        if not self._chunk or self._voiced_frames == 0:
+            self._chunk = []
+            self._spans = []
+            self._chunk_frames = 0
+            self._voiced_frames = 0
+            self._silence_run = 0
+            return None
+        return self._close()
@@ -104,6 +104,18 @@ function connectToBackend() {
     }
   });
   
+  socket.on('live_transcript_interim', (data) => {
+    if (mainWindow) {
+      mainWindow.webContents.send('live-transcript-interim', data);
+    }
+  });
+  
+  socket.on('summary_delta', (data) => {
+    if (mainWindow) {
+      mainWindow.webContents.send('summary-delta', data);
+    }
+  });
+  
   socket.on('error', (data) => {
     if (mainWindow) {
       mainWindow.webContents.send('error', data);
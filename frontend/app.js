@@ -250,7 +250,7 @@ async function showMeetingDetail(meetingId) {
 async function loadActionItems() {
     try {
         console.log('Loading action items...');
-        const response = await axios.get(`${API_BASE_URL}/api/meetings`);
+        const response = await axios.get(`${API_BASE_URL}/api/meetings?transcript=false`);
         const meetings = response.data;
         
         const allActionItems = [];
@@ -398,9 +398,15 @@ function setupIPCListeners() {
     ipcRenderer.on('live-transcript-update', (event, data) => {
         const liveTranscriptEl = document.getElementById('liveTranscript');
         if (liveTranscriptEl) {
+            // A final result replaces the interim text shown for it
+            const interimEl = liveTranscriptEl.querySelector('.live-interim');
+            if (interimEl) {
+                interimEl.remove();
+            }
+            
             // Append new text
             const currentText = liveTranscriptEl.textContent;
-            if (currentText === 'Listening for speech...' || currentText === 'Transcription will appear here...') {
+            if (!currentText || currentText === 'Listening for speech...' || currentText === 'Transcription will appear here...') {
                 liveTranscriptEl.textContent = data.text;
             } else {
                 liveTranscriptEl.textContent = currentText + ' ' + data.text;
@@ -411,6 +417,27 @@ function setupIPCListeners() {
         }
     });
     
+    // Interim (streaming) results: shown after the final text until replaced
+    ipcRenderer.on('live-transcript-interim', (event, data) => {
+        const liveTranscriptEl = document.getElementById('liveTranscript');
+        if (liveTranscriptEl) {
+            let interimEl = liveTranscriptEl.querySelector('.live-interim');
+            if (!interimEl) {
+                const currentText = liveTranscriptEl.textContent;
+                if (currentText === 'Listening for speech...' || currentText === 'Transcription will appear here...') {
+                    liveTranscriptEl.textContent = '';
+                }
+                interimEl = document.createElement('span');
+                interimEl.className = 'live-interim';
+                interimEl.style.color = 'var(--text-secondary)';
+                liveTranscriptEl.appendChild(interimEl);
+            }
+            interimEl.textContent = (interimEl.previousSibling ? ' ' : '') + data.text;
+            
+            liveTranscriptEl.parentElement.scrollTop = liveTranscriptEl.parentElement.scrollHeight;
+        }
+    });
+    
     ipcRenderer.on('recording-started', (event, data) => {
         currentMeetingId = data.meeting_id;
         showNotification('Recording Started', `Recording "${data.title}"`);
@@ -422,6 +449,20 @@ function setupIPCListeners() {
         
         progressFill.style.width = `${data.progress}%`;
         progressText.textContent = data.status.replace(/_/g, ' ').toUpperCase();
+        
+        if (data.status === 'transcribing') {
+            document.getElementById('summaryPreview').textContent = '';
+        }
+    });
+    
+    // Summary text as the model writes it
+    ipcRenderer.on('summary-delta', (event, data) => {
+        if (data.meeting_id !== currentMeetingId) {
+            return;
+        }
+        const summaryPreviewEl = document.getElementById('summaryPreview');
+        summaryPreviewEl.textContent += data.delta;
+        summaryPreviewEl.scrollTop = summaryPreviewEl.scrollHeight;
     });
     
     ipcRenderer.on('meeting-processed', (event, data) => {
@@ -510,7 +551,7 @@ let allMeetings = []; // Store all meetings for filtering
 async function loadMeetings() {
     try {
         console.log('Loading meetings from:', `${API_BASE_URL}/api/meetings`);
-        const response = await axios.get(`${API_BASE_URL}/api/meetings`);
+        const response = await axios.get(`${API_BASE_URL}/api/meetings?transcript=false`);
         allMeetings = response.data; // Store all meetings
         
         console.log('Meetings loaded:', allMeetings.length);